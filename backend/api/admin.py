@@ -1,8 +1,11 @@
 # api/admin.py
+from datetime import timedelta
+
 from django.contrib import admin
+from django.utils import timezone
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin # Переименуем для ясности
 from django.contrib.auth.forms import UserChangeForm, UserCreationForm # Импортируем формы
-from .models import User, Event, Registration, Tag # Импортируем модели
+from .models import User, Event, EventSeries, Registration, Tag, WaitlistEntry # Импортируем модели
 
 # Можно создать кастомные формы, чтобы убедиться, что name используется
 class CustomUserChangeForm(UserChangeForm):
@@ -24,8 +27,10 @@ class TagAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
 
     def event_count(self, obj):
-        return obj.event_set.count()
+        # Денормализованный счетчик (api/signals.py) - без COUNT на каждую строку
+        return obj.usage_count
     event_count.short_description = 'Количество событий'
+    event_count.admin_order_field = 'usage_count'
 
 @admin.register(User)
 class CustomUserAdmin(BaseUserAdmin): # Наследуемся от BaseUserAdmin
@@ -72,22 +77,110 @@ class CustomUserAdmin(BaseUserAdmin): # Наследуемся от BaseUserAdmi
         "user_permissions",
     )
 
+class RecentOrganizerListFilter(admin.SimpleListFilter):
+    """
+    Фильтр по организатору только среди тех, у кого есть мероприятия в ближайшие ±30 дней
+    (а не все пользователи-организаторы в боковой панели). Остальных находит поиск.
+    """
+    title = 'организатор (±30 дней)'
+    parameter_name = 'organizer'
+    window = timedelta(days=30)
+    max_choices = 50
+
+    def lookups(self, request, model_admin):
+        now = timezone.now()
+        organizers = User.objects.filter(
+            organized_events__dt_start__range=(now - self.window, now + self.window)
+        ).distinct().order_by('username').values_list('pk', 'username')[:self.max_choices]
+        return list(organizers)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(organizer_id=self.value())
+        return queryset
+
+
+class PopularTagListFilter(admin.SimpleListFilter):
+    """Фильтр по тегу только среди самых используемых (usage_count денормализован - без COUNT)"""
+    title = 'тег (популярные)'
+    parameter_name = 'tag'
+    max_choices = 30
+
+    def lookups(self, request, model_admin):
+        return list(Tag.objects.order_by('-usage_count', 'name').values_list('pk', 'name')[:self.max_choices])
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(tags=self.value())
+        return queryset
+
+
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ('title', 'organizer', 'dt_start', 'location_text', 'max_participants', 'created_at', 'tag_list')
-    list_filter = ('dt_start', 'organizer', 'tags')
+    list_filter = ('dt_start', RecentOrganizerListFilter, PopularTagListFilter)
     search_fields = ('title', 'description', 'location_text')
     autocomplete_fields = ['organizer']
     filter_horizontal = ('tags',)  # Удобный виджет для выбора тегов
+    list_select_related = ('organizer',)
+    date_hierarchy = 'dt_start'
+
+    def get_queryset(self, request):
+        # Теги всех событий страницы - одним запросом; search_vector списку не нужен
+        return super().get_queryset(request).prefetch_related('tags').defer('search_vector')
 
     def tag_list(self, obj):
         return ", ".join([tag.name for tag in obj.tags.all()])
     tag_list.short_description = 'Теги'
 
+
+@admin.register(EventSeries)
+class EventSeriesAdmin(admin.ModelAdmin):
+    list_display = ('title', 'organizer', 'dt_start', 'frequency', 'interval', 'until', 'count')
+    list_filter = ('frequency', RecentOrganizerListFilter)
+    search_fields = ('title', 'description', 'location_text')
+    autocomplete_fields = ['organizer']
+    filter_horizontal = ('tags',)
+    list_select_related = ('organizer',)
+
+
+class RecentEventListFilter(admin.SimpleListFilter):
+    """
+    Фильтр по мероприятию только среди ближайших по дате (а не все мероприятия в боковой панели).
+    Более старые/дальние ищутся поиском по названию.
+    """
+    title = 'мероприятие (±30 дней)'
+    parameter_name = 'event'
+    window = timedelta(days=30)
+    max_choices = 50
+
+    def lookups(self, request, model_admin):
+        now = timezone.now()
+        events = Event.objects.filter(
+            dt_start__range=(now - self.window, now + self.window)
+        ).order_by('dt_start').values_list('pk', 'title', 'dt_start')[:self.max_choices]
+        return [(pk, f"{title} ({timezone.localtime(dt_start):%d.%m.%Y})") for pk, title, dt_start in events]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(event_id=self.value())
+        return queryset
+
 @admin.register(Registration)
 class RegistrationAdmin(admin.ModelAdmin):
     list_display = ('id', 'student', 'event', 'attended', 'registered_at')
-    list_filter = ('attended', 'event__dt_start', 'event')
+    list_filter = ('attended', 'event__dt_start', RecentEventListFilter)
     search_fields = ('student__username', 'student__email', 'event__title', 'id')
     autocomplete_fields = ['student', 'event']
-    readonly_fields = ('id', 'registered_at')
\ No newline at end of file
+    readonly_fields = ('id', 'registered_at', 'checked_in_at')
+    list_select_related = ('student', 'event')
+    # Без отдельного COUNT(*) по всей таблице регистраций на каждой странице
+    show_full_result_count = False
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ('student', 'event', 'created_at')
+    list_select_related = ('student', 'event')
+    search_fields = ('student__username', 'event__title')
+    autocomplete_fields = ['student', 'event']
+    readonly_fields = ('created_at',)
@@ -0,0 +1,121 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Event, EventDailyStats, Registration
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def rebuild_daily_stats():
+    """
+    Пересчитывает EventDailyStats по таблице регистраций: регистрации - по дню registered_at,
+    отметки - по дню checked_in_at (старые отметки без времени - по дню начала мероприятия).
+    Отмены восстановить не из чего (удаленных регистраций нет), поэтому они сохраняются как были.
+    """
+    tz = timezone.get_current_timezone()
+
+    counters = defaultdict(lambda: {'registrations': 0, 'cancellations': 0, 'check_ins': 0})
+    registered = Registration.objects.annotate(day=TruncDate('registered_at', tzinfo=tz)).values('event_id', 'day')
+    for row in registered.annotate(n=Count('pk')).order_by():
+        counters[row['event_id'], row['day']]['registrations'] = row['n']
+    checked_in = Registration.objects.filter(attended=True).annotate(
+        day=TruncDate(Coalesce('checked_in_at', 'event__dt_start'), tzinfo=tz)
+    ).values('event_id', 'day')
+    for row in checked_in.annotate(n=Count('pk')).order_by():
+        counters[row['event_id'], row['day']]['check_ins'] = row['n']
+
+    with transaction.atomic():
+        kept = EventDailyStats.objects.filter(cancellations__gt=0).values_list('event_id', 'day', 'cancellations')
+        for event_id, day, cancellations in kept:
+            counters[event_id, day]['cancellations'] = cancellations
+        EventDailyStats.objects.all().delete()
+        EventDailyStats.objects.bulk_create(
+            [EventDailyStats(event_id=event_id, day=day, **values) for (event_id, day), values in counters.items()],
+            batch_size=REBUILD_BATCH_SIZE
+        )
+    return len(counters)
+
+
+def organizer_analytics(organizer, date_from, date_to):
+    """Аналитика мероприятий организатора за период [date_from, date_to]; читает только дневную статистику"""
+    events = event_attendance(organizer, date_from, date_to)
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'timeline': organizer_timeline(organizer, date_from, date_to),
+        'events': events,
+        'tags': tag_no_shows(events),
+    }
+
+
+def organizer_timeline(organizer, date_from, date_to):
+    """Регистрации, отмены и отметки по дням (дни без активности - нулями)"""
+    rows = EventDailyStats.objects.filter(event__organizer=organizer, day__range=(date_from, date_to)).values(
+        'day'
+    ).annotate(
+        registrations=Sum('registrations'), cancellations=Sum('cancellations'), check_ins=Sum('check_ins')
+    ).order_by()
+    by_day = {row.pop('day'): row for row in rows}
+    empty = {'registrations': 0, 'cancellations': 0, 'check_ins': 0}
+    return [
+        {'day': day, **by_day.get(day, empty)}
+        for day in (date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1))
+    ]
+
+
+def event_attendance(organizer, date_from, date_to):
+    """
+    Мероприятия организатора, начинающиеся в периоде: записано (денормализованный registered_count),
+    отмечено (сумма дневной статистики) и доля пришедших - только для уже начавшихся.
+    """
+    tz = timezone.get_current_timezone()
+    start = datetime.combine(date_from, time.min, tzinfo=tz)
+    end = datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=tz)
+    now = timezone.now()
+    events = Event.objects.filter(organizer=organizer, dt_start__gte=start, dt_start__lt=end).annotate(
+        check_ins=Coalesce(Sum('daily_stats__check_ins'), 0)
+    ).values('pk', 'title', 'dt_start', 'registered_count', 'check_ins').order_by('dt_start', 'pk')
+    tags = defaultdict(list)
+    for event_id, tag_id, tag_name in Event.tags.through.objects.filter(
+        event__organizer=organizer, event__dt_start__gte=start, event__dt_start__lt=end
+    ).values_list('event_id', 'tag_id', 'tag__name'):
+        tags[event_id].append({'id': tag_id, 'name': tag_name})
+
+    result = []
+    for event in events:
+        started = event['dt_start'] <= now
+        registered = event['registered_count']
+        result.append({
+            'id': event['pk'],
+            'title': event['title'],
+            'dt_start': event['dt_start'],
+            'registered': registered,
+            'checked_in': event['check_ins'],
+            'attendance_rate': _rate(event['check_ins'], registered) if started else None,
+            'tags': tags[event['pk']],
+        })
+    return result
+
+
+def tag_no_shows(events):
+    """Доля неявок по тегам среди уже прошедших мероприятий из event_attendance"""
+    totals = {}
+    for event in events:
+        if event['attendance_rate'] is None:
+            continue
+        for tag in event['tags']:
+            total = totals.setdefault(tag['id'], {'id': tag['id'], 'name': tag['name'], 'registered': 0, 'no_shows': 0})
+            total['registered'] += event['registered']
+            total['no_shows'] += max(event['registered'] - event['checked_in'], 0)
+    for total in totals.values():
+        total['no_show_rate'] = _rate(total['no_shows'], total['registered'])
+    return sorted(totals.values(), key=lambda total: (-total['registered'], total['name']))
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
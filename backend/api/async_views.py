@@ -0,0 +1,153 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import permissions, renderers, serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import seat_updates
+from .models import Event, EventFull, Registration
+from .permissions import IsOrganizer, IsStudent, IsEventOrganizer
+from .serializers import CheckInSerializer, EventRegistrationCreateSerializer, MyRegistrationSerializer
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView с асинхронными обработчиками (async def post/delete/...).
+    Аутентификация и проверка прав - синхронный код DRF, выполняется в потоке;
+    сам обработчик работает в event loop и ходит в базу через асинхронный ORM.
+    Под ASGI (config/asgi.py) ожидающий запрос не занимает поток воркера.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
+
+
+class AsyncEventRegisterView(AsyncAPIView):
+    """Асинхронная регистрация студента на мероприятие (правила как у EventRegistrationCreateSerializer)"""
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+
+    async def post(self, request, event_pk):
+        try:
+            event = await Event.objects.aget(pk=event_pk)
+        except Event.DoesNotExist:
+            raise serializers.ValidationError("Event not found.")
+        EventRegistrationCreateSerializer.check_event(event)
+
+        try:
+            registration = await Registration.objects.acreate(student=request.user, event=event)
+        except (IntegrityError, EventFull) as exc:
+            raise EventRegistrationCreateSerializer.create_error(exc)
+        return Response(MyRegistrationSerializer(registration).data, status=status.HTTP_201_CREATED)
+
+
+class AsyncEventUnregisterView(AsyncAPIView):
+    """Асинхронная отмена регистрации текущего студента"""
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+
+    async def delete(self, request, event_pk):
+        registration = await Registration.objects.select_related('event').filter(
+            student=request.user, event_id=event_pk
+        ).afirst()
+        if registration is None:
+            raise Http404
+        if registration.event.dt_start < timezone.now():
+            raise serializers.ValidationError({"detail": "Нельзя отменить регистрацию на прошедшее событие."})
+        # Транзакции асинхронный ORM не поддерживает - удаление и продвижение очереди идут одним вызовом в потоке
+        await sync_to_async(registration.cancel)()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncCheckInView(AsyncAPIView):
+    """Асинхронная отметка посещения по отсканированному QR (ответ как у EventViewSet.check_in)"""
+    permission_classes = [permissions.IsAuthenticated, IsOrganizer, IsEventOrganizer]
+
+    async def post(self, request, pk):
+        try:
+            event = await Event.objects.aget(pk=pk)
+        except Event.DoesNotExist:
+            raise Http404
+        self.check_object_permissions(request, event)
+
+        serializer = CheckInSerializer(data=request.data, context={'event': event})
+        serializer.is_valid(raise_exception=True)
+        registration_id = serializer.validated_data['registration_id']
+        registrations = Registration.objects.select_related('student')
+
+        # Отметка и дневная статистика - одна транзакция, поэтому в потоке через sync_to_async
+        if not await sync_to_async(Registration.check_in)(registration_id, event.pk):
+            registration = await registrations.filter(pk=registration_id).afirst()
+            raise serializers.ValidationError({'error': CheckInSerializer.rejection_message(registration, event)})
+
+        registration = await registrations.aget(pk=registration_id)
+        return Response({
+            'message': 'Посещение отмечено.',
+            'registration': {
+                'id': registration.id,
+                'student': {'name': registration.student.name, 'username': registration.student.username},
+                'attended': registration.attended,
+            },
+        })
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """text/event-stream для EventSource; ошибки (400/401) уходят кадром event: error"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return seat_updates.sse_frame(data, event='error').encode()
+
+
+class SeatAvailabilityStreamView(AsyncAPIView):
+    """
+    Свободные места мероприятий потоком Server-Sent Events: ?events=1,2,3.
+    Сначала текущие места, затем изменения после каждой регистрации и отмены (api/seat_updates.py) -
+    вместо перезагрузки страницы. Живой поток работает под ASGI; под WSGI отдается только снимок
+    с завершающим кадром end, после которого клиент не переподключается.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [renderers.JSONRenderer, EventStreamRenderer]
+
+    async def get(self, request):
+        try:
+            event_ids = sorted({int(value) for value in request.query_params.get('events', '').split(',') if value.strip()})
+        except ValueError:
+            raise serializers.ValidationError({'events': 'Ожидаются id мероприятий через запятую.'})
+        if not event_ids or len(event_ids) > settings.SEATS_STREAM_MAX_EVENTS:
+            raise serializers.ValidationError({'events': f'Укажите от 1 до {settings.SEATS_STREAM_MAX_EVENTS} мероприятий.'})
+
+        if isinstance(request._request, ASGIRequest):
+            response = StreamingHttpResponse(seat_updates.stream(event_ids), content_type='text/event-stream')
+        else:
+            # Под WSGI бесконечный поток занял бы поток воркера целиком - только снимок
+            frames = await seat_updates.snapshot(event_ids)
+            response = HttpResponse(''.join(frames) + seat_updates.END_FRAME, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx не должен буферизовать поток
+        response['X-Accel-Buffering'] = 'no'
+        return response
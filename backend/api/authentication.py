@@ -0,0 +1,87 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    """
+    Потокобезопасный LRU-кэш пользователей с TTL в пределах одного процесса.
+    Сохранение/удаление пользователя сбрасывает запись (api/signals.py); в других
+    процессах запись устаревает не позже, чем через ttl секунд.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, user = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+        # Копия: запрос может менять request.user, не затрагивая закэшированный объект
+        return copy.copy(user)
+
+    def set(self, key, user):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, copy.copy(user))
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, который не читает api.User из базы на каждый запрос:
+    пользователь берется из user_cache, а при промахе загружается и проверяется
+    стандартным JWTAuthentication.get_user (is_active, отзыв токена по смене пароля).
+    request.user остается полноценным экземпляром User, поэтому permissions и MeView не меняются.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id) if user_id is not None else None
+        if user is not None and self._token_matches_password(validated_token, user):
+            return user
+        user = super().get_user(validated_token)
+        user_cache.set(user_id, user)
+        return user
+
+    @staticmethod
+    def _token_matches_password(validated_token, user):
+        if not api_settings.CHECK_REVOKE_TOKEN:
+            return True
+        return validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) == get_md5_hash_password(user.password)
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Описание схемы аутентификации для drf-spectacular (как у JWTAuthentication)"""
+    target_class = 'api.authentication.CachedJWTAuthentication'
@@ -0,0 +1,109 @@
+import hashlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.utils import timezone
+
+SIGNING_SALT = 'api.calendar_feed'
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+CALENDAR_NAME = 'Мои мероприятия'
+PRODID = '-//Studafishka//Registrations//RU'
+# Те же регистрации, что /api/my-registrations/ (будущие и за последнюю неделю), но граница окна
+# сдвигается раз в сутки: содержимое и валидаторы меняются только вместе с регистрациями и в полночь
+PAST_DAYS = 7
+# Поля мероприятия, попадающие в календарь: их правка меняет календари записанных студентов (api/signals.py)
+EVENT_FIELDS = frozenset({'title', 'description', 'location_text', 'dt_start'})
+# Колонки values_list для stream_calendar
+COLUMNS = ('id', 'registered_at', 'event__title', 'event__description', 'event__location_text', 'event__dt_start')
+# Длина строки iCalendar в октетах без CRLF (RFC 5545, 3.1)
+LINE_LIMIT = 75
+
+
+def make_token(user_id, version):
+    """
+    Токен ссылки на календарь студента: id и User.calendar_token_version, подписанные SECRET_KEY.
+    Смена версии отзывает утекшую ссылку одного студента без смены ключа.
+    """
+    return signing.Signer(salt=SIGNING_SALT).sign(f'{user_id}:{version}')
+
+
+def read_token(token):
+    """(id пользователя, версия) из токена или None, если подпись не сходится"""
+    try:
+        value = signing.Signer(salt=SIGNING_SALT).unsign(token)
+        # Токены, выданные до появления версии, - только id: это версия 0
+        user_id, _, version = value.partition(':')
+        return int(user_id), int(version or 0)
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def window_start(now=None):
+    """Начало окна календаря: полночь PAST_DAYS дней назад по текущему часовому поясу"""
+    today = timezone.localdate(now)
+    return datetime.combine(today - timedelta(days=PAST_DAYS), time.min, tzinfo=timezone.get_current_timezone())
+
+
+def validators(user_id, changed_at, since):
+    """
+    (ETag, Last-Modified) календаря по последнему изменению регистраций и окну since.
+    Сдвиг окна в полночь тоже меняет содержимое, поэтому Last-Modified - не раньше начала текущих суток.
+    """
+    day_start = since + timedelta(days=PAST_DAYS)
+    last_modified = max(changed_at, day_start) if changed_at else day_start
+    version = f'{user_id}:{changed_at.isoformat() if changed_at else ""}:{since.date().isoformat()}'
+    return '"%s"' % hashlib.sha1(version.encode()).hexdigest(), last_modified
+
+
+def stream_calendar(rows):
+    """Потоком отдает VCALENDAR: заголовок, затем по VEVENT на каждую строку COLUMNS из итератора"""
+    yield ''.join(_line(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(CALENDAR_NAME)}',
+    ))
+    for registration_id, registered_at, title, description, location_text, dt_start in rows:
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:{registration_id}@studafishka',
+            f'DTSTAMP:{_format_datetime(registered_at)}',
+            f'DTSTART:{_format_datetime(dt_start)}',
+            f'SUMMARY:{_escape(title)}',
+            f'LOCATION:{_escape(location_text)}',
+        ]
+        if description:
+            lines.append(f'DESCRIPTION:{_escape(description)}')
+        lines.append('END:VEVENT')
+        yield ''.join(_line(line) for line in lines)
+    yield _line('END:VCALENDAR')
+
+
+def _format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _escape(text):
+    return (
+        text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+    )
+
+
+def _line(line):
+    """Строка с CRLF; длиннее LINE_LIMIT октетов - переносится с пробелом в начале продолжения, не разрывая символ UTF-8"""
+    if len(line.encode()) <= LINE_LIMIT:
+        return line + '\r\n'
+    parts, current, size, limit = [], [], 0, LINE_LIMIT
+    for char in line:
+        char_size = len(char.encode())
+        if size + char_size > limit:
+            parts.append(''.join(current))
+            # Пробел продолжения входит в лимит строки
+            current, size, limit = [], 0, LINE_LIMIT - 1
+        current.append(char)
+        size += char_size
+    parts.append(''.join(current))
+    return '\r\n '.join(parts) + '\r\n'
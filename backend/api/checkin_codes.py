@@ -0,0 +1,111 @@
+import base64
+import binascii
+import hashlib
+import math
+import struct
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+# Токен QR-кода: версия, UUID регистрации, id мероприятия, срок действия (unix) + усеченный HMAC.
+# 35 байт -> 47 символов base64url: QR остается небольшим и уверенно читается с экрана телефона
+TOKEN_VERSION = 1
+_PAYLOAD = struct.Struct('>B16sII')
+SIGNATURE_SIZE = 10
+SIGNING_SALT = 'api.checkin_codes'
+
+FORGED = 'forged'
+WRONG_EVENT = 'wrong_event'
+EXPIRED = 'expired'
+MESSAGES = {
+    FORGED: "QR-код недействителен.",
+    WRONG_EVENT: "Этот QR-код от другого мероприятия.",
+    EXPIRED: "Срок действия QR-кода истек.",
+}
+
+
+class InvalidCode(Exception):
+    def __init__(self, reason):
+        super().__init__(MESSAGES[reason])
+        self.reason = reason
+
+
+def _sign(payload):
+    return salted_hmac(SIGNING_SALT, payload, algorithm='sha256').digest()[:SIGNATURE_SIZE]
+
+
+def make_token(registration_id, event_id, expires_at):
+    payload = _PAYLOAD.pack(TOKEN_VERSION, registration_id.bytes, event_id, int(expires_at.timestamp()))
+    return base64.urlsafe_b64encode(payload + _sign(payload)).decode().rstrip('=')
+
+
+def token_for(registration_id, event_id, event_start):
+    """Токен для QR регистрации: действует до конца суток после начала мероприятия (CHECKIN_CODE_TTL_HOURS)"""
+    return make_token(registration_id, event_id, event_start + timedelta(hours=settings.CHECKIN_CODE_TTL_HOURS))
+
+
+def read_token(token):
+    """(registration_id, event_id, expires_at) из токена с проверкой подписи - без обращения к базе"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    except (binascii.Error, ValueError):
+        raise InvalidCode(FORGED)
+    if len(raw) != _PAYLOAD.size + SIGNATURE_SIZE:
+        raise InvalidCode(FORGED)
+    payload, signature = raw[:_PAYLOAD.size], raw[_PAYLOAD.size:]
+    if not constant_time_compare(signature, _sign(payload)):
+        raise InvalidCode(FORGED)
+    version, registration_bytes, event_id, expires = _PAYLOAD.unpack(payload)
+    if version != TOKEN_VERSION:
+        raise InvalidCode(FORGED)
+    return uuid.UUID(bytes=registration_bytes), event_id, datetime.fromtimestamp(expires, tz=dt_timezone.utc)
+
+
+def parse_code(code, event_id):
+    """
+    UUID регистрации из отсканированного кода для мероприятия event_id.
+    Подделанные, чужие и просроченные токены отклоняются без запросов к базе (InvalidCode).
+    Старые QR с голым UUID принимаются, пока включен CHECKIN_ACCEPT_PLAIN_IDS.
+    """
+    code = code.strip()
+    if settings.CHECKIN_ACCEPT_PLAIN_IDS:
+        try:
+            return uuid.UUID(code)
+        except ValueError:
+            pass
+    registration_id, token_event_id, expires_at = read_token(code)
+    if token_event_id != event_id:
+        raise InvalidCode(WRONG_EVENT)
+    if expires_at < timezone.now():
+        raise InvalidCode(EXPIRED)
+    return registration_id
+
+
+# Bloom-фильтр действительных регистраций для полностью офлайн-проверки на устройстве организатора.
+# Позиции: sha256(UUID.bytes) -> h1 = байты 0..7, h2 = байты 8..15 (нечетное), pos_i = (h1 + i * h2) mod m
+
+def bloom_positions(registration_id, size, hash_count):
+    digest = hashlib.sha256(registration_id.bytes).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:16], 'big') | 1
+    return [(h1 + i * h2) % size for i in range(hash_count)]
+
+
+def build_bloom_filter(registration_ids, false_positive_rate):
+    """Биты (младший бит байта - первая позиция), размер m и число хешей k для заданной доли ложных срабатываний"""
+    count = max(len(registration_ids), 1)
+    size = math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2)
+    size += -size % 8
+    hash_count = max(1, round(size / count * math.log(2)))
+    bits = bytearray(size // 8)
+    for registration_id in registration_ids:
+        for position in bloom_positions(registration_id, size, hash_count):
+            bits[position >> 3] |= 1 << (position & 7)
+    return bytes(bits), size, hash_count
+
+
+def bloom_contains(bits, size, hash_count, registration_id):
+    return all(bits[position >> 3] >> (position & 7) & 1 for position in bloom_positions(registration_id, size, hash_count))
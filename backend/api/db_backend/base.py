@@ -0,0 +1,19 @@
+import time
+
+from django.db.backends.postgresql import base
+
+from api import db_metrics
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Стандартный PostgreSQL-бэкенд, который замеряет получение соединения:
+    ожидание свободного соединения в пуле (или установку нового без пула).
+    """
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        try:
+            return super().get_new_connection(conn_params)
+        finally:
+            db_metrics.record_checkout(self.alias, time.perf_counter() - started)
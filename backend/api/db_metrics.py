@@ -0,0 +1,98 @@
+import logging
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+logger = logging.getLogger('api.db')
+
+_current_stats = ContextVar('db_connection_stats', default=None)
+_hooks = []
+
+
+class ConnectionStats:
+    """Статистика соединений с базой за один запрос."""
+    __slots__ = ('checkouts', 'wait_time')
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_time = 0.0
+
+    def as_dict(self):
+        return {'checkouts': self.checkouts, 'wait_ms': round(self.wait_time * 1000, 2)}
+
+
+def record_checkout(alias, seconds):
+    """Вызывается бэкендом (api/db_backend) при каждом получении соединения."""
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.checkouts += 1
+        stats.wait_time += seconds
+
+
+def register_hook(hook):
+    """
+    Подписка на статистику соединений: hook(request, response, stats) вызывается
+    после каждого запроса. Возвращает hook, поэтому подходит как декоратор.
+    """
+    if hook not in _hooks:
+        _hooks.append(hook)
+    return hook
+
+
+def unregister_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def pool_stats(alias='default'):
+    """Накопленная статистика пула psycopg (None, если пул выключен)."""
+    pool = getattr(connections[alias], 'pool', None)
+    return pool.get_stats() if pool is not None else None
+
+
+@register_hook
+def log_connection_stats(request, response, stats):
+    if stats.checkouts:
+        logger.debug(
+            '%s %s: db checkouts=%d wait=%.2fms',
+            request.method, request.path, stats.checkouts, stats.wait_time * 1000,
+        )
+
+
+class DatabaseMetricsMiddleware:
+    """Собирает число выдач соединений и время ожидания пула за запрос и передает их хукам."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = ConnectionStats()
+        token = _current_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.report(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = ConnectionStats()
+        token = _current_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        request.db_connection_stats = stats
+        for hook in list(_hooks):
+            hook(request, response, stats)
+        return response
@@ -0,0 +1,30 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: write() просто возвращает строку, а не накапливает ее"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(columns, rows):
+    """Построчно отдает CSV: заголовок, затем по строке на каждую запись из итератора"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_ndjson(columns, rows):
+    """Построчно отдает NDJSON: один JSON-объект на строку"""
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
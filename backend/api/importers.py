@@ -0,0 +1,115 @@
+import csv
+import io
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Event, User
+from .popular_tags import apply_tag_usage, event_day
+from .search import get_search_engine
+from .seat_updates import notify_seats_changed
+from . import response_cache
+from .serializers import EventSerializer
+
+EventTags = Event.tags.through
+
+MAX_IMPORT_ROWS = 5000
+# Поля, которые обновляются у уже существующего события с тем же external_id
+UPSERT_FIELDS = ['title', 'description', 'dt_start', 'location_text', 'max_participants']
+
+
+def read_csv_rows(uploaded_file):
+    """
+    Читает CSV с заголовком: external_id, title, description, dt_start, location_text,
+    max_participants, tags (названия через ';'). Пустые ячейки считаются отсутствующими.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(uploaded_file, encoding='utf-8-sig'))
+    rows = []
+    for record in reader:
+        row = {key.strip(): value.strip() for key, value in record.items() if key and value and value.strip()}
+        tags = row.pop('tags', '')
+        if tags:
+            row['tag_names'] = [name for name in tags.split(';') if name.strip()]
+        rows.append(row)
+    return rows
+
+
+def duplicate_key_errors(rows):
+    """
+    Один external_id может встречаться в файле только один раз. Проверяются сырые строки,
+    поэтому ключ сравнивается так, как его сохранит сериализатор (без пробелов по краям);
+    не строки и пустые ключи оставлены сериализатору.
+    """
+    errors, seen = [], {}
+    for number, row in enumerate(rows, start=1):
+        key = row.get('external_id') if isinstance(row, dict) else None
+        if not isinstance(key, str) or not key.strip():
+            continue
+        key = key.strip()
+        if key in seen:
+            errors.append({'row': number, 'errors': {'external_id': [f'Повторяет строку {seen[key]}.']}})
+        else:
+            seen[key] = number
+    return errors
+
+
+@transaction.atomic
+def import_events(organizer, rows):
+    """
+    Создает или обновляет (по organizer + external_id) проверенные строки импорта.
+    События пишутся одним bulk_create с ON CONFLICT (пачками по 1000), теги разрешаются пакетно,
+    связи event_tags пересоздаются одним bulk_create - запросов не больше, чем пачек.
+    bulk-операции не вызывают сигналов, поэтому счетчики популярности тегов, кэш ответов,
+    календари участников и поток свободных мест обновляются здесь же.
+    """
+    keys = [row['external_id'] for row in rows if row.get('external_id')]
+    existing_keys = set(Event.objects.filter(
+        organizer=organizer, external_id__in=keys
+    ).values_list('external_id', flat=True))
+    # Старые связи с тегами (с прежней датой начала) запоминаем до обновления событий
+    old_links = EventTags.objects.filter(event__organizer=organizer, event__external_id__in=existing_keys)
+    removed_usage = [(tag_id, event_day(dt_start)) for tag_id, dt_start in old_links.values_list('tag_id', 'event__dt_start')]
+
+    events = [
+        Event(organizer=organizer, **{key: value for key, value in row.items() if key != 'tag_names'})
+        for row in rows
+    ]
+    Event.objects.bulk_create(
+        events, batch_size=1000,
+        update_conflicts=True, unique_fields=['organizer', 'external_id'], update_fields=UPSERT_FIELDS,
+    )
+
+    if existing_keys:
+        old_links.delete()
+        apply_tag_usage(removed_usage, -1)
+        # Обновленное событие могло перенестись: новые ETag календарей .ics его участников (как в signals.touch_calendars)
+        User.objects.filter(
+            registrations__event__organizer=organizer, registrations__event__external_id__in=existing_keys
+        ).update(registrations_changed_at=timezone.now())
+
+    tags = {tag.name.lower(): tag for tag in EventSerializer.resolve_tag_names(
+        [name for row in rows for name in row['tag_names']]
+    )}
+    links = {
+        (event.pk, tags[name.lower().strip()].pk)
+        for event, row in zip(events, rows)
+        for name in row['tag_names'] if name.strip()
+    }
+    EventTags.objects.bulk_create(
+        [EventTags(event_id=event_id, tag_id=tag_id) for event_id, tag_id in links], batch_size=1000
+    )
+    get_search_engine().update_vectors([event.pk for event in events])
+    days = {event.pk: event_day(event.dt_start) for event in events}
+    apply_tag_usage([(tag_id, days[event_id]) for event_id, tag_id in links], +1)
+    # bulk_create не вызывает сигналов, которые сбрасывают кэш ленты и списка тегов
+    response_cache.invalidate(response_cache.FEED, response_cache.TAGS)
+    # ...и публикуют места: у обновленного события мог измениться max_participants
+    for event in events:
+        if event.external_id in existing_keys:
+            notify_seats_changed(event.pk)
+
+    return [
+        {'row': number, 'id': event.pk, 'external_id': event.external_id,
+         'status': 'updated' if event.external_id in existing_keys else 'created'}
+        for number, event in enumerate(events, start=1)
+    ]
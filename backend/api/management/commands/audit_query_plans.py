@@ -0,0 +1,96 @@
+import json
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from rest_framework.request import Request
+
+from api.models import Event, EventDailyStats, EventSeries, Registration, Tag, User, WaitlistEntry
+from api.series import series_in_window, window_end
+from api.views import EventViewSet, MyRegistrationsListView
+
+
+def find_seq_scans(queryset):
+    """
+    Таблицы, которые план запроса читает последовательным сканированием.
+    Seq scan выключен на время EXPLAIN, поэтому даже на небольшой засеянной базе планировщик
+    берет индекс, если тот подходит, - и Seq Scan остается только там, где подходящего индекса нет.
+    """
+    with transaction.atomic(using=queryset.db):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = json.loads(queryset.explain(format='json'))
+    return sorted(set(_seq_scan_relations(plan[0]['Plan'])))
+
+
+def _seq_scan_relations(node):
+    if node['Node Type'] == 'Seq Scan':
+        yield node['Relation Name']
+    for child in node.get('Plans', ()):
+        yield from _seq_scan_relations(child)
+
+
+def _view_queryset(view_class, user, action='list', **params):
+    """Queryset view так, как его строит запрос пользователя user с параметрами params"""
+    http_request = HttpRequest()
+    http_request.GET = QueryDict(mutable=True)
+    http_request.GET.update(params)
+    request = Request(http_request)
+    request.user = user
+    view = view_class(request=request, action=action, kwargs={}, format_kwarg=None)
+    return view.get_queryset()
+
+
+def hot_querysets():
+    """(название, queryset) горячих запросов API. Без данных подставляются несуществующие id - EXPLAIN их не читает"""
+    organizer = User.objects.filter(is_organizer=True).first() or User(pk=0, is_organizer=True, is_student=False)
+    student = User.objects.filter(is_student=True).first() or User(pk=0)
+    event_id = Event.objects.values_list('pk', flat=True).first() or 0
+    tag = Tag.objects.first() or Tag(pk=0, name='audit')
+    series_id = EventSeries.objects.values_list('pk', flat=True).first() or 0
+    registration_id = Registration.objects.order_by('pk').values_list('pk', flat=True).first() or uuid.uuid4()
+
+    return [
+        ('feed', _view_queryset(EventViewSet, student)),
+        ('feed by tag id', _view_queryset(EventViewSet, student, tags=str(tag.pk))),
+        ('feed by tag name', _view_queryset(EventViewSet, student, tag_names=tag.name)),
+        ('organizer feed', _view_queryset(EventViewSet, organizer)),
+        ('organizer events', Event.objects.filter(organizer=organizer).order_by('dt_start')),
+        ('my registrations', _view_queryset(MyRegistrationsListView, student)),
+        ('participants', Registration.objects.filter(event_id=event_id).select_related('student')),
+        ('participants export', Registration.objects.filter(event_id=event_id).order_by('registered_at')),
+        ('attended', Registration.objects.filter(event_id=event_id, attended=True)),
+        ('check-in', Registration.objects.filter(pk=registration_id, event_id=event_id, attended=False)),
+        ('not checked in', Registration.objects.filter(event_id=event_id, attended=False)),
+        ('analytics timeline', EventDailyStats.objects.filter(event__organizer=organizer, day__gte=timezone.localdate())),
+        ('series in feed window', series_in_window(timezone.now(), window_end(timezone.now()))),
+        ('materialized occurrences', Event.objects.filter(
+            series_id=series_id, series_occurrence__range=(timezone.now(), window_end(timezone.now()))
+        )),
+        ('waitlist head', WaitlistEntry.objects.filter(event_id=event_id).order_by('created_at', 'id')),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN горячих запросов API: ошибка, если какой-то из них читает таблицу последовательным сканированием. '
+        'Запускать на засеянной базе (manage.py seed_data).'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Аудит планов работает только на PostgreSQL.')
+
+        failures = []
+        for name, queryset in hot_querysets():
+            relations = find_seq_scans(queryset)
+            if relations:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: Seq Scan по {", ".join(relations)}'))
+            elif options['verbosity'] > 1:
+                self.stdout.write(f'{name}: OK')
+        if failures:
+            raise CommandError(f'Последовательное сканирование в запросах: {", ".join(failures)}.')
+        self.stdout.write(self.style.SUCCESS('Все запросы используют индексы.'))
@@ -0,0 +1,292 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import calendar_feed, response_cache
+from api.checkin_codes import token_for
+from api.models import Event, EventDailyStats, Registration, Tag, User
+
+RESULTS_VERSION = 1
+PERCENTILES = (50, 90, 95, 99)
+# Строк в одном запросе сценария import (семестр студсовета - сотни мероприятий)
+IMPORT_ROWS = 500
+IMPORT_KEY_PREFIX = 'benchmark-import-'
+
+
+def latency_summary(durations):
+    """Перцентили задержки в миллисекундах (не меньше двух замеров)"""
+    values = sorted(duration * 1000 for duration in durations)
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    summary = {f'p{p}': round(cuts[p - 1], 2) for p in PERCENTILES}
+    summary.update(min=round(values[0], 2), max=round(values[-1], 2), mean=round(statistics.fmean(values), 2))
+    return summary
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def daily_stats_keeper(event):
+    """Запоминает дневную статистику мероприятия; возвращает функцию, которая ее восстанавливает"""
+    rows = list(EventDailyStats.objects.filter(event=event))
+
+    def restore():
+        EventDailyStats.objects.filter(event=event).delete()
+        EventDailyStats.objects.bulk_create(rows)
+    return restore
+
+
+class Scenario:
+    """
+    Один замеряемый запрос. prepare() выполняется перед каждым замером и в него не входит
+    (например, сброс кэша или отметки посещения), чтобы каждая итерация начиналась с одного состояния;
+    cleanup() после всех замеров возвращает данные в исходное состояние.
+    items - сколько объектов обрабатывает один запрос: для пакетных сценариев считается пропускная способность.
+    """
+
+    def __init__(self, name, client, method, path, data=None, prepare=None, cleanup=None, expected_status=200,
+                 items=None):
+        self.name = name
+        self.client = client
+        self.method = method
+        self.path = path
+        self.data = data
+        self.prepare = prepare
+        self.cleanup = cleanup
+        self.expected_status = expected_status
+        self.items = items
+
+    def call(self):
+        if self.prepare is not None:
+            self.prepare()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, self.method)(self.path, self.data, format='json')
+            if response.streaming:
+                # Потоковый ответ собирается при чтении - оно тоже входит в замер
+                b''.join(response.streaming_content)
+            duration = time.perf_counter() - started
+        if response.status_code != self.expected_status:
+            raise CommandError(f'{self.name}: {self.method.upper()} {self.path} вернул {response.status_code}, '
+                               f'ожидался {self.expected_status}.')
+        return duration, len(queries)
+
+
+class Command(BaseCommand):
+    help = (
+        'Бенчмарк горячих путей API в процессе (полный стек middleware и DRF): перцентили задержки '
+        'и число SQL-запросов по сценариям. Результат - JSON для сравнения между коммитами (--baseline). '
+        'Данные: manage.py seed_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Замеров на сценарий.')
+        parser.add_argument('--warmup', type=int, default=3, help='Незамеряемых прогонов перед замерами.')
+        parser.add_argument('--scenario', action='append', dest='scenarios', help='Только указанные сценарии.')
+        parser.add_argument('--output', help='Файл для JSON с результатами (по умолчанию stdout).')
+        parser.add_argument('--baseline', help='JSON прошлого прогона: вывести сравнение.')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 2:
+            raise CommandError('Для перцентилей нужно хотя бы два замера (--iterations).')
+        scenarios = self.build_scenarios()
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f'Неизвестные сценарии: {", ".join(sorted(unknown))}.')
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['scenarios']]
+
+        results = {}
+        for scenario in scenarios:
+            durations, query_counts = [], []
+            try:
+                for _ in range(options['warmup']):
+                    scenario.call()
+                for _ in range(options['iterations']):
+                    duration, query_count = scenario.call()
+                    durations.append(duration)
+                    query_counts.append(query_count)
+            finally:
+                if scenario.cleanup is not None:
+                    scenario.cleanup()
+            results[scenario.name] = {
+                'request': f'{scenario.method.upper()} {scenario.path}',
+                'iterations': options['iterations'],
+                'latency_ms': latency_summary(durations),
+                'queries': {'median': statistics.median(query_counts), 'max': max(query_counts)},
+            }
+            if scenario.items:
+                results[scenario.name]['items_per_second'] = round(scenario.items / statistics.median(durations), 1)
+
+        report = {
+            'version': RESULTS_VERSION,
+            'commit': git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'async_views': settings.ASYNC_VIEWS,
+            },
+            'dataset': {
+                'users': User.objects.count(),
+                'events': Event.objects.count(),
+                'tags': Tag.objects.count(),
+                'registrations': Registration.objects.count(),
+            },
+            'scenarios': results,
+        }
+        content = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(content + '\n')
+        else:
+            self.stdout.write(content)
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline:
+                self.print_comparison(json.load(baseline), report)
+
+    def build_scenarios(self):
+        """Сценарии на существующих данных: нужны студент, организатор и будущие мероприятия"""
+        now = timezone.now()
+        student = User.objects.filter(is_student=True).annotate(
+            registrations_total=Count('registrations')
+        ).order_by('-registrations_total', 'pk').first()
+        organizer_event = Event.objects.filter(
+            dt_start__gte=now, registrations__isnull=False
+        ).select_related('organizer').order_by('dt_start', 'pk').first()
+        if student is None or organizer_event is None:
+            raise CommandError('Нет данных для бенчмарка: заполните базу (manage.py seed_data).')
+        # Свободное будущее мероприятие, на которое студент еще не записан - для register/unregister
+        open_event = Event.objects.filter(dt_start__gte=now, max_participants__isnull=True).exclude(
+            registrations__student=student
+        ).order_by('dt_start', 'pk').first()
+        if open_event is None:
+            raise CommandError('Нет будущего мероприятия без ограничения мест для сценария регистрации.')
+        tag = Tag.objects.order_by('-usage_count', 'pk').first()
+        registration = Registration.objects.filter(event=organizer_event).order_by('pk').first()
+
+        student_client = self.client_for(student)
+        organizer_client = self.client_for(organizer_event.organizer)
+        events_url = reverse('event-list')
+        page = '?page_size=20'
+
+        # Замеры регистраций и отметок накручивают дневную статистику - после сценария она восстанавливается
+        open_event_stats = daily_stats_keeper(open_event)
+        organizer_event_stats = daily_stats_keeper(organizer_event)
+
+        def reset_check_in():
+            Registration.objects.filter(pk=registration.pk).update(attended=False)
+
+        def restore_check_in():
+            Registration.objects.filter(pk=registration.pk).update(
+                attended=registration.attended, checked_in_at=registration.checked_in_at
+            )
+            organizer_event_stats()
+
+        def remove_registration():
+            Registration.objects.filter(student=student, event=open_event).delete()
+
+        def cleanup_registration():
+            remove_registration()
+            open_event_stats()
+
+        def reset_feed_cache():
+            response_cache.invalidate(response_cache.FEED)
+
+        # Импорт каждый раз создает мероприятия заново; удаление через ORM возвращает и счетчики тегов
+        def remove_imported():
+            Event.objects.filter(organizer=organizer_event.organizer, external_id__startswith=IMPORT_KEY_PREFIX).delete()
+
+        import_rows = [
+            {
+                'external_id': f'{IMPORT_KEY_PREFIX}{number}', 'title': f'Бенчмарк импорта {number}',
+                'location_text': 'Аудитория 1', 'dt_start': (now + timedelta(days=30, hours=number)).isoformat(),
+                'tag_names': [tag.name] if tag is not None else [],
+            }
+            for number in range(IMPORT_ROWS)
+        ]
+
+        # Календарь .ics доступен по токену; приложения календаря опрашивают его с If-None-Match
+        calendar_token = calendar_feed.make_token(student.pk, student.calendar_token_version)
+        calendar_url = reverse('registrations-calendar', args=[calendar_token])
+        conditional_client = self.client_for(student)
+        conditional_client.credentials(HTTP_IF_NONE_MATCH=student_client.get(calendar_url)['ETag'])
+
+        scenarios = [
+            # Фронтенд запрашивает ленту целиком
+            Scenario('feed', student_client, 'get', events_url),
+            Scenario('feed_page', student_client, 'get', events_url + page),
+            Scenario('feed_page_uncached', student_client, 'get', events_url + page, prepare=reset_feed_cache),
+            Scenario('organizer_feed_page', organizer_client, 'get', events_url + page),
+            Scenario('popular_tags', student_client, 'get', reverse('event-popular-tags')),
+            Scenario('popular_tags_upcoming', student_client, 'get', reverse('event-popular-tags') + '?window=upcoming'),
+            Scenario('my_registrations', student_client, 'get', reverse('my-registrations')),
+            Scenario('calendar', student_client, 'get', calendar_url),
+            Scenario('calendar_not_modified', conditional_client, 'get', calendar_url, expected_status=304),
+            Scenario('organizer_analytics', organizer_client, 'get', reverse('organizer-analytics')),
+            Scenario('register', student_client, 'post', reverse('event-register', args=[open_event.pk]),
+                     prepare=remove_registration, cleanup=cleanup_registration, expected_status=201),
+            Scenario('unregister', student_client, 'delete', reverse('event-unregister', args=[open_event.pk]),
+                     prepare=lambda: Registration.objects.get_or_create(student=student, event=open_event),
+                     cleanup=cleanup_registration, expected_status=204),
+            Scenario('check_in', organizer_client, 'post', reverse('event-check-in', args=[organizer_event.pk]),
+                     data={'registration_id': token_for(registration.pk, organizer_event.pk, organizer_event.dt_start)},
+                     prepare=reset_check_in, cleanup=restore_check_in),
+            Scenario('import', organizer_client, 'post', reverse('event-bulk-import'), data=import_rows,
+                     prepare=remove_imported, cleanup=remove_imported, expected_status=201, items=IMPORT_ROWS),
+        ]
+        if tag is not None:
+            scenarios[2:2] = [
+                Scenario('feed_tag', student_client, 'get', f'{events_url}{page}&tags={tag.pk}'),
+                Scenario('feed_tag_name', student_client, 'get', f'{events_url}{page}&tag_names={tag.name}'),
+            ]
+        return scenarios
+
+    @staticmethod
+    def client_for(user):
+        # Настоящий JWT: аутентификация - часть горячего пути. Хост из ALLOWED_HOSTS вместо testserver
+        host = next((host for host in settings.ALLOWED_HOSTS if host != '*' and not host.startswith('.')), 'localhost')
+        client = APIClient(SERVER_NAME=host)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def print_comparison(self, baseline, report):
+        # Таблица - в stderr, чтобы не смешиваться с JSON в stdout
+        write = self.stderr.write
+        write(f"Сравнение: {baseline.get('commit') or 'baseline'} -> {report['commit'] or 'текущее дерево'}")
+        write(f"{'сценарий':<24}{'p50, мс':>24}{'p95, мс':>24}{'запросов':>12}")
+        for name, current in report['scenarios'].items():
+            previous = baseline.get('scenarios', {}).get(name)
+            if previous is None:
+                write(f'{name:<24}{"(новый сценарий)":>24}')
+                continue
+            p50, p95 = (
+                self.format_change(previous['latency_ms'][key], current['latency_ms'][key]) for key in ('p50', 'p95')
+            )
+            queries = f"{previous['queries']['median']:g} -> {current['queries']['median']:g}"
+            write(f'{name:<24}{p50:>24}{p95:>24}{queries:>12}')
+
+    @staticmethod
+    def format_change(before, after):
+        change = (after - before) / before * 100 if before else 0
+        return f'{before:.1f} -> {after:.1f} ({change:+.0f}%)'
@@ -0,0 +1,209 @@
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.analytics import rebuild_daily_stats
+from api.models import Event, EventSeries, Registration, Tag, TagDailyUsage, User
+from api.popular_tags import event_day, invalidate_popular_tags
+from api.search import get_search_engine
+from api import response_cache
+
+EventTags = Event.tags.through
+
+USERNAME_PREFIX = 'seed_'
+SEED_PASSWORD = 'seed-password'
+TOPICS = (
+    'python', 'django', 'react', 'ml', 'data', 'devops', 'security', 'design', 'product', 'career',
+    'robotics', 'math', 'physics', 'chemistry', 'biology', 'finance', 'music', 'sport', 'chess', 'games',
+)
+TITLES = ('Лекция', 'Семинар', 'Мастер-класс', 'Хакатон', 'Встреча клуба', 'Воркшоп', 'Открытая дискуссия')
+PLACES = ('Главный корпус', 'Библиотека', 'Коворкинг', 'Актовый зал', 'Лаборатория', 'Онлайн')
+# Доля мероприятий без ограничения мест и доля пришедших на прошедшие мероприятия
+UNLIMITED_SHARE = 0.3
+ATTENDANCE_RATE = 0.7
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет пустую базу синтетическими данными для бенчмарков (manage.py benchmark_api): '
+        'организаторы, студенты, теги, мероприятия и регистрации. Одинаковый --seed дает одинаковые данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organizers', type=int, default=50)
+        parser.add_argument('--students', type=int, default=20000)
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=300)
+        parser.add_argument('--series', type=int, default=200, help='Еженедельных серий (клубов).')
+        parser.add_argument('--registrations', type=int, default=2000000, help='Целевое число регистраций.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+            raise CommandError('Синтетические данные уже есть; очистите базу (manage.py flush) и повторите.')
+        if options['organizers'] < 1 or options['students'] < 1 or options['events'] < 1 or options['tags'] < 1:
+            raise CommandError('Нужны хотя бы один организатор, студент, тег и мероприятие.')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # Даты отсчитываются от начала текущего часа: повтор в тот же час дает те же строки
+        self.anchor = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            organizers, students = self.create_users(options['organizers'], options['students'])
+            tags, tag_weights = self.create_tags(options['tags'])
+            events = self.create_events(options['events'], organizers, tags, tag_weights)
+            series = self.create_series(options['series'], organizers, tags, tag_weights)
+            registrations = self.create_registrations(options['registrations'], students, events)
+            rebuild_daily_stats()
+        # bulk-операции не вызывают сигналов, которые сбрасывают кэши ленты и популярных тегов
+        response_cache.invalidate(response_cache.FEED, response_cache.TAGS)
+        invalidate_popular_tags()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: организаторов {len(organizers)}, студентов {len(students)}, тегов {len(tags)}, '
+            f'мероприятий {len(events)}, серий {len(series)}, регистраций {registrations} за {time.perf_counter() - started:.1f} с. '
+            f'Пароль пользователей: {SEED_PASSWORD}'
+        ))
+
+    def uuid4(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def create_users(self, organizer_count, student_count):
+        # Хеширование пароля дорогое, поэтому один хеш на всех
+        password = make_password(SEED_PASSWORD)
+        organizers = [
+            User(username=f'{USERNAME_PREFIX}org_{i}', email=f'{USERNAME_PREFIX}org_{i}@example.com',
+                 name=f'Организатор {i}', password=password, is_organizer=True, is_student=False, is_staff=True)
+            for i in range(organizer_count)
+        ]
+        students = [
+            User(username=f'{USERNAME_PREFIX}student_{i}', email=f'{USERNAME_PREFIX}student_{i}@example.com',
+                 name=f'Студент {i}', password=password, is_student=True)
+            for i in range(student_count)
+        ]
+        User.objects.bulk_create(organizers + students, batch_size=self.batch_size)
+        return organizers, students
+
+    def create_tags(self, count):
+        tags = [
+            Tag(name=f'{TOPICS[i % len(TOPICS)]}-{i}', color=f'#{self.rng.randrange(0x1000000):06x}')
+            for i in range(count)
+        ]
+        # Популярность тегов по закону Ципфа: несколько частых и длинный хвост редких
+        return tags, list(accumulate(1 / rank for rank in range(1, count + 1)))
+
+    def create_events(self, count, organizers, tags, tag_weights):
+        rng = self.rng
+        events, links = [], []
+        for i in range(count):
+            dt_start = self.anchor + timedelta(days=rng.uniform(-365, 365), hours=rng.randrange(9, 20))
+            events.append(Event(
+                title=f'{rng.choice(TITLES)}: {TOPICS[i % len(TOPICS)]} #{i}',
+                description=f'Синтетическое мероприятие {i}. ' * rng.randint(1, 5),
+                dt_start=dt_start,
+                location_text=f'{rng.choice(PLACES)}, ауд. {rng.randint(100, 599)}',
+                organizer=organizers[i % len(organizers)],
+                max_participants=None if rng.random() < UNLIMITED_SHARE else rng.randint(20, 500),
+            ))
+            chosen = set(rng.choices(range(len(tags)), cum_weights=tag_weights, k=rng.randint(1, 4)))
+            links.extend((i, tag_index) for tag_index in chosen)
+
+        # Счетчики популярности тегов считаем заранее: сигналы m2m_changed bulk_create не вызывает
+        usage = Counter(tag_index for _, tag_index in links)
+        for tag_index, tag in enumerate(tags):
+            tag.usage_count = usage[tag_index]
+        Tag.objects.bulk_create(tags, batch_size=self.batch_size)
+        Event.objects.bulk_create(events, batch_size=self.batch_size)
+
+        EventTags.objects.bulk_create(
+            [EventTags(event_id=events[event_index].pk, tag_id=tags[tag_index].pk) for event_index, tag_index in links],
+            batch_size=self.batch_size
+        )
+        daily = Counter((tags[tag_index].pk, event_day(events[event_index].dt_start)) for event_index, tag_index in links)
+        TagDailyUsage.objects.bulk_create(
+            [TagDailyUsage(tag_id=tag_id, day=day, events_count=n) for (tag_id, day), n in daily.items()],
+            batch_size=self.batch_size
+        )
+        event_ids = [event.pk for event in events]
+        for start in range(0, len(event_ids), self.batch_size):
+            get_search_engine().update_vectors(event_ids[start:start + self.batch_size])
+        return events
+
+    def create_series(self, count, organizers, tags, tag_weights):
+        """Еженедельные клубы: начались в прошлом семестре, часть бессрочные, часть - на ограниченное число встреч"""
+        rng = self.rng
+        series, links = [], []
+        for i in range(count):
+            occurrences = None if rng.random() < 0.5 else rng.randint(8, 30)
+            series.append(EventSeries(
+                title=f'Клуб: {TOPICS[i % len(TOPICS)]} #{i}',
+                description=f'Синтетическая серия {i}.',
+                location_text=f'{rng.choice(PLACES)}, ауд. {rng.randint(100, 599)}',
+                organizer=organizers[i % len(organizers)],
+                max_participants=None if rng.random() < UNLIMITED_SHARE else rng.randint(10, 60),
+                dt_start=self.anchor + timedelta(days=rng.uniform(-180, 30), hours=rng.randrange(9, 20)),
+                interval=rng.choice((1, 1, 2)),
+                count=occurrences,
+            ))
+            chosen = set(rng.choices(range(len(tags)), cum_weights=tag_weights, k=rng.randint(1, 3)))
+            links.extend((i, tag_index) for tag_index in chosen)
+        # ends_at считается в save(), bulk_create его не вызывает
+        for item in series:
+            item.ends_at = item.occurrence(item.count - 1) if item.count else None
+        EventSeries.objects.bulk_create(series, batch_size=self.batch_size)
+        SeriesTags = EventSeries.tags.through
+        SeriesTags.objects.bulk_create(
+            [SeriesTags(eventseries_id=series[index].pk, tag_id=tags[tag_index].pk) for index, tag_index in links],
+            batch_size=self.batch_size
+        )
+        return series
+
+    def create_registrations(self, target, students, events):
+        """
+        Каждый студент записывается в среднем на target / students мероприятий; популярность мероприятий
+        неравномерная, заполненные пропускаются. Строки пишутся пачками, в памяти держится одна пачка.
+        """
+        rng = self.rng
+        weights = list(accumulate(rng.paretovariate(1.5) for _ in events))
+        counts = [0] * len(events)
+        per_student = target / len(students)
+        batch, created = [], 0
+        for student in students:
+            wanted = min(len(events), round(rng.uniform(0.5, 1.5) * per_student))
+            # Кандидатов с запасом: повторы и заполненные мероприятия пропускаются
+            chosen = set()
+            for index in rng.choices(range(len(events)), cum_weights=weights, k=wanted * 2):
+                if len(chosen) == wanted:
+                    break
+                event = events[index]
+                if index in chosen or (event.max_participants and counts[index] >= event.max_participants):
+                    continue
+                chosen.add(index)
+                counts[index] += 1
+                attended = event.dt_start < self.anchor and rng.random() < ATTENDANCE_RATE
+                batch.append(Registration(
+                    id=self.uuid4(), student=student, event=event,
+                    attended=attended, checked_in_at=event.dt_start if attended else None,
+                ))
+            if len(batch) >= self.batch_size:
+                Registration.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        Registration.objects.bulk_create(batch)
+        created += len(batch)
+
+        for event, count in zip(events, counts):
+            event.registered_count = count
+        Event.objects.bulk_update(events, ['registered_count'], batch_size=1000)
+        return created
@@ -0,0 +1,257 @@
+import hmac
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from rest_framework import serializers
+
+from . import db_metrics
+
+slow_query_logger = logging.getLogger('api.db.slow')
+
+_current = ContextVar('request_metrics', default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+UNMATCHED_VIEW = '<unmatched>'
+# Заголовок запроса, включающий Server-Timing и X-DB-Query-Count в ответе
+DEBUG_REQUEST_HEADER = 'X-Debug-Metrics'
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{format_labels(labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        # labels -> [счетчики по бакетам..., сумма, количество]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{format_labels(labels + (("le", repr(float(bound))),))} {count}')
+                lines.append(f'{self.name}_bucket{format_labels(labels + (("le", "+Inf"),))} {series[-1]}')
+                lines.append(f'{self.name}_sum{format_labels(labels)} {series[-2]}')
+                lines.append(f'{self.name}_count{format_labels(labels)} {series[-1]}')
+        return lines
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels) + '}'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Значения хранятся в памяти процесса: при нескольких воркерах gunicorn каждый отдает свои
+REQUESTS = Counter('api_requests_total', 'Запросы по view, методу и статусу.')
+REQUEST_DURATION = Histogram('api_request_duration_seconds', 'Полное время обработки запроса.', LATENCY_BUCKETS)
+DB_QUERIES = Histogram('api_db_queries', 'Число SQL-запросов за запрос.', QUERY_COUNT_BUCKETS)
+DB_DURATION = Histogram('api_db_duration_seconds', 'Время выполнения SQL за запрос.', LATENCY_BUCKETS)
+SERIALIZER_DURATION = Histogram('api_serializer_duration_seconds', 'Время сериализации ответа.', LATENCY_BUCKETS)
+CONNECTION_WAIT = Histogram(
+    'api_db_connection_wait_seconds', 'Ожидание соединения из пула за запрос.', LATENCY_BUCKETS
+)
+ALL_METRICS = (REQUESTS, REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZER_DURATION, CONNECTION_WAIT)
+
+
+def render_metrics():
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetrics:
+    """Счетчики одного запроса; живут в contextvar, поэтому видны и из потоков sync_to_async."""
+    __slots__ = ('queries', 'db_time', 'serializer_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else UNMATCHED_VIEW
+
+
+def query_timer(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += duration
+        threshold = settings.SLOW_QUERY_MS
+        if threshold and duration * 1000 >= threshold:
+            # Параметры не пишем - в них могут быть персональные данные
+            slow_query_logger.warning('%.1f ms: %s', duration * 1000, sql[:2000])
+
+
+def install_query_timer(connection):
+    """Вешает query_timer на соединение (один раз на объект соединения потока)."""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+def instrument_serializers():
+    """
+    Замер времени Serializer.data / ListSerializer.data - там DRF строит ответ и случаются N+1.
+    Ставит MetricsMiddleware: без нее сериализаторы не меняются, а вне замеряемого запроса обертка
+    сразу вызывает исходное свойство.
+    """
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        original = serializer_class.data
+        if getattr(original.fget, 'timed', False):
+            continue
+
+        def timed_data(self, _fget=original.fget):
+            stats = _current.get()
+            if stats is None:
+                return _fget(self)
+            started = time.perf_counter()
+            try:
+                return _fget(self)
+            finally:
+                stats.serializer_time += time.perf_counter() - started
+
+        timed_data.timed = True
+        serializer_class.data = property(timed_data)
+
+
+@db_metrics.register_hook
+def observe_connection_stats(request, response, stats):
+    if stats.checkouts:
+        CONNECTION_WAIT.observe((('view', view_name(request)),), stats.wait_time)
+
+
+class MetricsMiddleware:
+    """
+    Per-view метрики запроса: число SQL-запросов, время в базе, время сериализации и полная задержка.
+    Те же числа возвращаются в заголовках Server-Timing и X-DB-Query-Count, если запрос попросил их
+    (см. debug_requested).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        instrument_serializers()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, started)
+
+    def start(self):
+        # Соединения, открытые до запроса, не проходили через connection_created
+        for connection in connections.all(initialized_only=True):
+            install_query_timer(connection)
+        stats = RequestMetrics()
+        return stats, _current.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, started):
+        duration = time.perf_counter() - started
+        labels = (('view', view_name(request)),)
+        REQUESTS.inc(labels + (('method', request.method), ('status', response.status_code)))
+        REQUEST_DURATION.observe(labels, duration)
+        DB_QUERIES.observe(labels, stats.queries)
+        DB_DURATION.observe(labels, stats.db_time)
+        SERIALIZER_DURATION.observe(labels, stats.serializer_time)
+
+        if debug_requested(request):
+            response['Server-Timing'] = (
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                f'serializer;dur={stats.serializer_time * 1000:.1f}, total;dur={duration * 1000:.1f}'
+            )
+            response['X-DB-Query-Count'] = str(stats.queries)
+        return response
+
+
+def debug_requested(request):
+    """
+    Отладочные заголовки - только по запросу: "X-Debug-Metrics: <METRICS_TOKEN>";
+    без токена, как и /metrics, - только при DEBUG (значение заголовка любое).
+    """
+    value = request.headers.get(DEBUG_REQUEST_HEADER)
+    if value is None:
+        return False
+    token = settings.METRICS_TOKEN
+    if not token:
+        return settings.DEBUG
+    return hmac.compare_digest(value, token)
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus.
+    С METRICS_TOKEN нужен заголовок "Authorization: Bearer <token>"; без токена доступно только при DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
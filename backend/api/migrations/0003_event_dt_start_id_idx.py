@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_tag_event_tags'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['dt_start', 'id'], name='event_dt_start_id_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 06:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_registered_count(apps, schema_editor):
+    Event = apps.get_model('api', 'Event')
+    Registration = apps.get_model('api', 'Registration')
+    counts = Registration.objects.filter(
+        event=OuterRef('pk')
+    ).order_by().values('event').annotate(total=Count('pk')).values('total')
+    Event.objects.update(registered_count=Coalesce(Subquery(counts), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_event_dt_start_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='registered_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Зарегистрировано'),
+        ),
+        migrations.RunPython(fill_registered_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-18 06:17
+
+import django.db.models.deletion
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_tag_usage(apps, schema_editor):
+    Tag = apps.get_model('api', 'Tag')
+    TagDailyUsage = apps.get_model('api', 'TagDailyUsage')
+    EventTags = apps.get_model('api', 'Event').tags.through
+    per_tag, per_day = Counter(), Counter()
+    for tag_id, dt_start in EventTags.objects.values_list('tag_id', 'event__dt_start').iterator():
+        per_tag[tag_id] += 1
+        per_day[(tag_id, timezone.localdate(dt_start))] += 1
+    for tag_id, count in per_tag.items():
+        Tag.objects.filter(pk=tag_id).update(usage_count=count)
+    TagDailyUsage.objects.bulk_create(
+        [TagDailyUsage(tag_id=tag_id, day=day, events_count=count) for (tag_id, day), count in per_day.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Использований'),
+        ),
+        migrations.CreateModel(
+            name='TagDailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('events_count', models.PositiveIntegerField(default=0, verbose_name='Мероприятий')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usage', to='api.tag', verbose_name='Тег')),
+            ],
+            options={
+                'verbose_name': 'Использование тега по дням',
+                'verbose_name_plural': 'Использование тегов по дням',
+                'indexes': [models.Index(fields=['day', 'tag'], name='tag_usage_day_idx')],
+                'unique_together': {('tag', 'day')},
+            },
+        ),
+        migrations.RunPython(fill_tag_usage, migrations.RunPython.noop),
+    ]
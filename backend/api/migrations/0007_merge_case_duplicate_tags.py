@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 06:17
+
+from collections import Counter
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+
+def merge_case_duplicates(apps, schema_editor):
+    """Сливает теги, отличающиеся только регистром, в тег с наименьшим id (иначе ограничение не создать)"""
+    Tag = apps.get_model('api', 'Tag')
+    TagDailyUsage = apps.get_model('api', 'TagDailyUsage')
+    EventTags = apps.get_model('api', 'Event').tags.through
+
+    duplicates = Tag.objects.annotate(name_lower=Lower('name')).values('name_lower').annotate(
+        total=Count('id')
+    ).filter(total__gt=1).values_list('name_lower', flat=True)
+    for name_lower in list(duplicates):
+        keeper, *others = Tag.objects.annotate(name_lower=Lower('name')).filter(name_lower=name_lower).order_by('id')
+        linked = set(EventTags.objects.filter(tag_id=keeper.pk).values_list('event_id', flat=True))
+        for tag in others:
+            for link in EventTags.objects.filter(tag_id=tag.pk):
+                if link.event_id not in linked:
+                    EventTags.objects.create(event_id=link.event_id, tag_id=keeper.pk)
+                    linked.add(link.event_id)
+            tag.delete()
+
+        # Пересчитываем счетчики использования объединенного тега
+        days = Counter(
+            timezone.localdate(dt_start)
+            for dt_start in EventTags.objects.filter(tag_id=keeper.pk).values_list('event__dt_start', flat=True)
+        )
+        Tag.objects.filter(pk=keeper.pk).update(usage_count=len(linked))
+        TagDailyUsage.objects.filter(tag_id=keeper.pk).delete()
+        TagDailyUsage.objects.bulk_create(
+            [TagDailyUsage(tag_id=keeper.pk, day=day, events_count=count) for day, count in days.items()]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_tag_usage'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_case_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-18 06:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_tag_name_lower_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Внешний ID'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('organizer', 'external_id'), name='event_organizer_external_id_uniq'),
+        ),
+    ]
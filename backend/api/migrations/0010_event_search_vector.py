@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-18 06:20
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_INDEX = 'event_search_vector_gin'
+
+
+def create_search_index(apps, schema_editor):
+    # GIN и tsvector есть только в PostgreSQL; на SQLite работает запасной поиск (api/search.py)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON api_event USING gin (search_vector)')
+    Event = apps.get_model('api', 'Event')
+    Event.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='russian')
+        + SearchVector('location_text', weight='B', config='russian')
+        + SearchVector('description', weight='C', config='russian')
+    ))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {SEARCH_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_event_external_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
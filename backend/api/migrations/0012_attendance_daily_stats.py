@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 07:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='checked_in_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Время отметки'),
+        ),
+        migrations.CreateModel(
+            name='EventDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('registrations', models.IntegerField(default=0, verbose_name='Регистраций')),
+                ('cancellations', models.IntegerField(default=0, verbose_name='Отмен')),
+                ('check_ins', models.IntegerField(default=0, verbose_name='Отметок')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='api.event', verbose_name='Мероприятие')),
+            ],
+            options={
+                'verbose_name': 'Статистика мероприятия за день',
+                'verbose_name_plural': 'Статистика мероприятий по дням',
+                'unique_together': {('event', 'day')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-18 07:12
+
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+def fill_daily_stats(apps, schema_editor):
+    """
+    Регистрации - по дню registered_at, отметки - по дню checked_in_at (без времени - по дню начала).
+    Таблица только что создана, отмен восстановить не из чего. Логика повторяет
+    api.analytics.rebuild_daily_stats, но не импортирует код приложения: он меняется вместе с моделями.
+    """
+    Registration = apps.get_model('api', 'Registration')
+    EventDailyStats = apps.get_model('api', 'EventDailyStats')
+    tz = timezone.get_current_timezone()
+
+    counters = defaultdict(lambda: {'registrations': 0, 'check_ins': 0})
+    registered = Registration.objects.annotate(day=TruncDate('registered_at', tzinfo=tz)).values('event_id', 'day')
+    for row in registered.annotate(n=Count('pk')).order_by():
+        counters[row['event_id'], row['day']]['registrations'] = row['n']
+    checked_in = Registration.objects.filter(attended=True).annotate(
+        day=TruncDate(Coalesce('checked_in_at', 'event__dt_start'), tzinfo=tz)
+    ).values('event_id', 'day')
+    for row in checked_in.annotate(n=Count('pk')).order_by():
+        counters[row['event_id'], row['day']]['check_ins'] = row['n']
+
+    EventDailyStats.objects.bulk_create(
+        [EventDailyStats(event_id=event_id, day=day, **values) for (event_id, day), values in counters.items()],
+        batch_size=5000,
+    )
+
+
+def clear_daily_stats(apps, schema_editor):
+    apps.get_model('api', 'EventDailyStats').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_attendance_daily_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_daily_stats, clear_daily_stats),
+    ]
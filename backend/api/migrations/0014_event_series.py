@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 07:18
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_fill_attendance_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='series_occurrence',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Занятие серии'),
+        ),
+        migrations.CreateModel(
+            name='EventSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='Название')),
+                ('description', models.TextField(blank=True, verbose_name='Описание')),
+                ('location_text', models.CharField(max_length=255, verbose_name='Место проведения (текст)')),
+                ('max_participants', models.PositiveIntegerField(blank=True, help_text='На каждое занятие; оставьте пустым для неограниченного количества', null=True, verbose_name='Макс. участников')),
+                ('dt_start', models.DateTimeField(verbose_name='Начало первого занятия')),
+                ('frequency', models.CharField(choices=[('daily', 'Ежедневно'), ('weekly', 'Еженедельно')], default='weekly', max_length=10, verbose_name='Повторение')),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Каждые N дней или недель', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Интервал')),
+                ('until', models.DateTimeField(blank=True, null=True, verbose_name='Повторять до')),
+                ('count', models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Число занятий')),
+                ('ends_at', models.DateTimeField(editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('organizer', models.ForeignKey(limit_choices_to={'is_organizer': True}, on_delete=django.db.models.deletion.CASCADE, related_name='event_series', to=settings.AUTH_USER_MODEL, verbose_name='Организатор')),
+                ('tags', models.ManyToManyField(blank=True, related_name='series', to='api.tag', verbose_name='Теги')),
+            ],
+            options={
+                'verbose_name': 'Серия мероприятий',
+                'verbose_name_plural': 'Серии мероприятий',
+                'ordering': ['dt_start'],
+            },
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='api.eventseries', verbose_name='Серия'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('series', 'series_occurrence'), name='event_series_occurrence_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='eventseries',
+            index=models.Index(fields=['dt_start', 'ends_at'], name='event_series_window_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 07:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_event_series'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='registrations_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,6 +1,13 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from datetime import timedelta
+
+from django.core.validators import MinValueValidator
+from django.utils import timezone
 import uuid # Для уникальности QR
 
 class User(AbstractUser):
@@ -10,6 +17,10 @@ class User(AbstractUser):
     name = models.CharField("Полное имя", max_length=150, blank=True)
     is_student = models.BooleanField(default=True)
     is_organizer = models.BooleanField(default=False)
+    # Последнее изменение регистраций студента (запись, отмена, правка мероприятия) - валидатор календаря .ics
+    registrations_changed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Входит в токен ссылки на календарь .ics: увеличение отзывает ранее выданные ссылки (api/calendar_feed.py)
+    calendar_token_version = models.PositiveIntegerField(default=0, editable=False)
 
     def save(self, *args, **kwargs):
          # Гарантируем, что пользователь либо студент, либо организатор (не оба и не ни один)
@@ -25,12 +36,18 @@ class Tag(models.Model):
     name = models.CharField("Название тега", max_length=50, unique=True)
     color = models.CharField("Цвет тега", max_length=7, default="#007bff", 
                            help_text="Цвет в формате HEX (например, #ff0000)")
+    # Число мероприятий с этим тегом; поддерживается сигналами (см. api/signals.py)
+    usage_count = models.PositiveIntegerField("Использований", default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "Тег"
         verbose_name_plural = "Теги"
         ordering = ['name']
+        constraints = [
+            # Регистронезависимая уникальность; индекс по lower(name) обслуживает поиск тегов по имени
+            models.UniqueConstraint(Lower('name'), name='tag_name_lower_uniq'),
+        ]
 
     def __str__(self):
         return self.name
@@ -64,12 +81,37 @@ class Event(models.Model):
         verbose_name="Теги",
         help_text="Выберите теги для категоризации мероприятия"
     )
+    # Ключ строки из внешнего источника (таблица семестра) - по нему массовый импорт обновляет события
+    external_id = models.CharField("Внешний ID", max_length=100, null=True, blank=True)
+    # Денормализованный счетчик регистраций, меняется только атомарным UPDATE (см. Registration.save)
+    registered_count = models.PositiveIntegerField("Зарегистрировано", default=0, editable=False)
+    # Поисковый вектор (PostgreSQL), обновляется после сохранения (api/search.py).
+    # GIN-индекс создается миграцией 0010 только на PostgreSQL, поэтому не описан в Meta.indexes
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Занятие серии (EventSeries) создается при первой записи на него. series_occurrence - плановое
+    # начало по правилу повторения: не меняется при переносе dt_start и не дает создать занятие дважды
+    series = models.ForeignKey(
+        'EventSeries', related_name='occurrences', null=True, blank=True,
+        on_delete=models.SET_NULL, verbose_name="Серия"
+    )
+    series_occurrence = models.DateTimeField("Занятие серии", null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "Мероприятие"
         verbose_name_plural = "Мероприятия"
         ordering = ['dt_start']
+        indexes = [
+            # Ключ keyset-пагинации ленты (EventCursorPagination); им же выбираются будущие события.
+            # Частичный индекс "только будущие" невозможен: условие индекса не может зависеть от now()
+            models.Index(fields=['dt_start', 'id'], name='event_dt_start_id_idx'),
+            # События организатора по дате: лента организатора, аналитика, импорт
+            models.Index(fields=['organizer', 'dt_start'], name='event_organizer_dt_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['organizer', 'external_id'], name='event_organizer_external_id_uniq'),
+            models.UniqueConstraint(fields=['series', 'series_occurrence'], name='event_series_occurrence_uniq'),
+        ]
 
     def __str__(self):
         return self.title
@@ -78,6 +120,155 @@ class Event(models.Model):
         """Возвращает список названий тегов"""
         return [tag.name for tag in self.tags.all()]
 
+    @property
+    def is_full(self):
+        return bool(self.max_participants) and self.registered_count >= self.max_participants
+
+    @classmethod
+    def reserve_seat(cls, event_id):
+        """
+        Занимает место одним условным UPDATE. Проверка вместимости и инкремент выполняются
+        в базе под блокировкой строки, поэтому параллельные запросы не могут переполнить событие.
+        Возвращает False, если мест нет.
+        """
+        has_room = Q(max_participants__isnull=True) | Q(max_participants=0) | Q(registered_count__lt=F('max_participants'))
+        return cls.objects.filter(has_room, pk=event_id).update(registered_count=F('registered_count') + 1) == 1
+
+    @classmethod
+    def release_seat(cls, event_id):
+        cls.objects.filter(pk=event_id, registered_count__gt=0).update(registered_count=F('registered_count') - 1)
+
+class EventSeries(models.Model):
+    """
+    Повторяющееся мероприятие (например, еженедельный клуб). Занятия не хранятся: лента разворачивает
+    их из правила повторения на лету (api/series.py), а строка Event появляется при первой записи на занятие.
+    Время занятий считается по часам текущего часового пояса - переход на летнее время его не сдвигает.
+    """
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    FREQUENCY_CHOICES = [(DAILY, 'Ежедневно'), (WEEKLY, 'Еженедельно')]
+    FREQUENCY_DAYS = {DAILY: 1, WEEKLY: 7}
+
+    title = models.CharField("Название", max_length=200)
+    description = models.TextField("Описание", blank=True)
+    location_text = models.CharField("Место проведения (текст)", max_length=255)
+    organizer = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='event_series',
+        on_delete=models.CASCADE,
+        verbose_name="Организатор",
+        limit_choices_to={'is_organizer': True}
+    )
+    max_participants = models.PositiveIntegerField(
+        "Макс. участников", null=True, blank=True,
+        help_text="На каждое занятие; оставьте пустым для неограниченного количества"
+    )
+    tags = models.ManyToManyField(Tag, blank=True, related_name='series', verbose_name="Теги")
+    dt_start = models.DateTimeField("Начало первого занятия")
+    frequency = models.CharField("Повторение", max_length=10, choices=FREQUENCY_CHOICES, default=WEEKLY)
+    interval = models.PositiveSmallIntegerField(
+        "Интервал", default=1, validators=[MinValueValidator(1)], help_text="Каждые N дней или недель"
+    )
+    until = models.DateTimeField("Повторять до", null=True, blank=True)
+    count = models.PositiveIntegerField("Число занятий", null=True, blank=True, validators=[MinValueValidator(1)])
+    # Не позже последнего занятия (None - серия бесконечна); по нему лента отбирает серии, пересекающие окно
+    ends_at = models.DateTimeField(null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Серия мероприятий"
+        verbose_name_plural = "Серии мероприятий"
+        ordering = ['dt_start']
+        indexes = [
+            models.Index(fields=['dt_start', 'ends_at'], name='event_series_window_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def save(self, *args, **kwargs):
+        ends = [bound for bound in (self.until, self.count and self.occurrence(self.count - 1)) if bound]
+        self.ends_at = min(ends) if ends else None
+        super().save(*args, **kwargs)
+
+    @property
+    def step(self):
+        return timedelta(days=self.FREQUENCY_DAYS[self.frequency] * self.interval)
+
+    def _wall_clock(self):
+        """Часовой пояс, начало первого занятия по его часам и шаг - основа арифметики занятий"""
+        tz = timezone.get_current_timezone()
+        return tz, self.dt_start.astimezone(tz).replace(tzinfo=None), self.step
+
+    def occurrence(self, index):
+        """Начало занятия номер index (с нуля)"""
+        tz, first, step = self._wall_clock()
+        return timezone.make_aware(first + step * index, tz)
+
+    def _is_valid_index(self, index, moment):
+        return index >= 0 and (self.count is None or index < self.count) and (self.until is None or moment <= self.until)
+
+    def occurrences_between(self, start, end):
+        """Лениво перебирает начала занятий в [start, end] по возрастанию"""
+        tz, first, step = self._wall_clock()
+        # Номер занятия не позже start - без перебора предыдущих
+        index = max((start.astimezone(tz).replace(tzinfo=None) - first) // step, 0)
+        while True:
+            moment = timezone.make_aware(first + step * index, tz)
+            if moment > end or not self._is_valid_index(index, moment):
+                return
+            if moment >= start:
+                yield moment
+            index += 1
+
+    def is_occurrence(self, moment):
+        tz, first, step = self._wall_clock()
+        index = (moment.astimezone(tz).replace(tzinfo=None) - first) // step
+        return timezone.make_aware(first + step * index, tz) == moment and self._is_valid_index(index, moment)
+
+    def materialize(self, occurrence_start):
+        """
+        Мероприятие занятия серии: существующее или новое с полями и тегами серии.
+        Параллельная первая запись на то же занятие получает ту же строку (уникальность series + series_occurrence).
+        """
+        occurrences = Event.objects.filter(series=self, series_occurrence=occurrence_start)
+        event = occurrences.first()
+        if event is not None:
+            return event
+        try:
+            with transaction.atomic():
+                event = Event.objects.create(
+                    series=self, series_occurrence=occurrence_start, dt_start=occurrence_start,
+                    title=self.title, description=self.description, location_text=self.location_text,
+                    organizer_id=self.organizer_id, max_participants=self.max_participants,
+                )
+                event.tags.set(self.tags.all())
+        except IntegrityError:
+            return occurrences.get()
+        return event
+
+class EventFull(Exception):
+    """Свободных мест на мероприятии не осталось"""
+
+class TagDailyUsage(models.Model):
+    """
+    Сколько мероприятий с тегом начинается в конкретный день.
+    Позволяет считать популярность в окне дат (например, только будущие события)
+    по небольшой предагрегированной таблице, а не по Event x event_tags.
+    """
+    tag = models.ForeignKey(Tag, related_name='daily_usage', on_delete=models.CASCADE, verbose_name="Тег")
+    day = models.DateField("День")
+    events_count = models.PositiveIntegerField("Мероприятий", default=0)
+
+    class Meta:
+        verbose_name = "Использование тега по дням"
+        verbose_name_plural = "Использование тегов по дням"
+        unique_together = ('tag', 'day')
+        indexes = [models.Index(fields=['day', 'tag'], name='tag_usage_day_idx')]
+
+    def __str__(self):
+        return f"{self.tag.name} {self.day}: {self.events_count}"
+
 class Registration(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False) # Уникальный ID для QR
     student = models.ForeignKey(
@@ -95,6 +286,8 @@ class Registration(models.Model):
     )
     registered_at = models.DateTimeField(auto_now_add=True)
     attended = models.BooleanField("Посетил(а)", default=False)
+    # Когда отмечен на входе - по нему manage.py rebuild_attendance_stats раскладывает отметки по дням
+    checked_in_at = models.DateTimeField("Время отметки", null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Регистрация"
@@ -102,7 +295,132 @@ class Registration(models.Model):
         # Уникальность: один студент на одно мероприятие
         unique_together = ('student', 'event')
         ordering = ['-registered_at']
+        indexes = [
+            # Участники / посетившие по мероприятию (выгрузка, статистика посещаемости)
+            models.Index(fields=['event', 'attended'], name='registration_attended_idx'),
+            # Еще не отмеченные на входе - маленький частичный индекс для check-in
+            models.Index(fields=['event'], condition=Q(attended=False), name='registration_pending_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        # Вставка и резервирование места - одна транзакция: если мест нет, вставка откатывается
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not Event.reserve_seat(self.event_id):
+                raise EventFull()
+
+    @classmethod
+    def check_in(cls, registration_id, event_id):
+        """
+        Отмечает посещение одним условным UPDATE (повторный скан не отметит дважды) и в той же
+        транзакции учитывает отметку в дневной статистике. Возвращает False, если отмечать нечего.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(pk=registration_id, event_id=event_id, attended=False).update(
+                attended=True, checked_in_at=timezone.now()
+            )
+            if updated:
+                EventDailyStats.add(event_id, check_ins=updated)
+        return bool(updated)
+
+    def cancel(self):
+        """Отмена регистрации: освободившееся место в той же транзакции отдается первому из листа ожидания"""
+        with transaction.atomic():
+            self.delete()
+            WaitlistEntry.promote_next(self.event_id)
 
     def __str__(self):
         status = "Посетил" if self.attended else "Зарегистрирован"
-        return f"{self.student.username} на {self.event.title} ({status})"
\ No newline at end of file
+        return f"{self.student.username} на {self.event.title} ({status})"
+
+class WaitlistEntry(models.Model):
+    """Очередь ожидания на заполненное мероприятие (FIFO по времени записи)"""
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='waitlist_entries',
+        on_delete=models.CASCADE,
+        verbose_name="Студент",
+        limit_choices_to={'is_student': True}
+    )
+    event = models.ForeignKey(
+        Event,
+        related_name='waitlist',
+        on_delete=models.CASCADE,
+        verbose_name="Мероприятие"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Запись в листе ожидания"
+        verbose_name_plural = "Лист ожидания"
+        unique_together = ('student', 'event')
+        ordering = ['created_at', 'id']
+        indexes = [
+            # Голова очереди события читается по индексу, без сортировки всей очереди
+            models.Index(fields=['event', 'created_at', 'id'], name='waitlist_event_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} ждет {self.event.title}"
+
+    @classmethod
+    def promote_next(cls, event_id):
+        """
+        Переводит первого в очереди студента в участники. Вызывается в транзакции, освободившей место.
+        select_for_update(skip_locked) позволяет параллельным отменам продвигать разных студентов,
+        не дожидаясь друг друга. Возвращает созданную регистрацию или None.
+        """
+        queue = cls.objects.select_for_update(skip_locked=True).filter(event_id=event_id).order_by('created_at', 'id')
+        while True:
+            entry = queue.first()
+            if entry is None:
+                return None
+            try:
+                with transaction.atomic():
+                    registration = Registration.objects.create(student_id=entry.student_id, event_id=event_id)
+            except EventFull:
+                # Место успели занять - студент остается первым в очереди
+                return None
+            except IntegrityError:
+                # Студент уже зарегистрирован другим путем - запись в очереди устарела
+                entry.delete()
+                continue
+            entry.delete()
+            return registration
+
+class EventDailyStats(models.Model):
+    """
+    Активность по мероприятию за день: новые регистрации, отмены и отметки на входе.
+    Аналитика организатора (api/analytics.py) читает только эти строки, а не Registration.
+    Счетчики меняются инкрементально (сигналы регистраций, Registration.check_in);
+    пересчет с нуля - manage.py rebuild_attendance_stats.
+    """
+    event = models.ForeignKey(Event, related_name='daily_stats', on_delete=models.CASCADE, verbose_name="Мероприятие")
+    day = models.DateField("День")
+    registrations = models.IntegerField("Регистраций", default=0)
+    cancellations = models.IntegerField("Отмен", default=0)
+    # Может уйти в минус за день: снятие старой отметки без checked_in_at вычитается из текущего дня
+    check_ins = models.IntegerField("Отметок", default=0)
+
+    class Meta:
+        verbose_name = "Статистика мероприятия за день"
+        verbose_name_plural = "Статистика мероприятий по дням"
+        unique_together = ('event', 'day')
+
+    def __str__(self):
+        return f"{self.event_id} {self.day}: +{self.registrations} -{self.cancellations} ✓{self.check_ins}"
+
+    @classmethod
+    def add(cls, event_id, day=None, **deltas):
+        """
+        Прибавляет deltas к счетчикам (event, day) атомарным UPDATE с F().
+        Обычно строка дня уже есть и это один запрос; первая активность за день создает ее.
+        """
+        changes = {field: F(field) + delta for field, delta in deltas.items()}
+        rows = cls.objects.filter(event_id=event_id, day=day or timezone.localdate())
+        if rows.update(**changes):
+            return
+        cls.objects.bulk_create([cls(event_id=event_id, day=day or timezone.localdate())], ignore_conflicts=True)
+        rows.update(**changes)
@@ -0,0 +1,111 @@
+import base64
+import heapq
+from itertools import islice
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+from .series import EVENT_KEY, MAX_UNPAGINATED_OCCURRENCES, OCCURRENCE_KEY, Occurrence, attach_series, feed_key
+
+
+class EventCursorPagination(BasePagination):
+    """
+    Keyset-пагинация ленты событий по (dt_start, id).
+    Курсор хранит ключ последнего события страницы, поэтому следующая страница
+    выбирается условием по индексу, а не OFFSET-ом - глубокие страницы стоят столько же, сколько первая.
+    Пагинация включается, только если передан cursor или page_size,
+    иначе список отдается целиком (как раньше ожидает фронтенд).
+
+    Если у view есть series_occurrences(after=..., limit=...), в ленту вперемешку с событиями попадают
+    незанятые занятия серий (api/series.py): из каждого источника берется не больше страницы + 1,
+    порядок и курсор - общий ключ (dt_start, вид, id). Курсор занятия - "дата|s<id серии>".
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        occurrences = getattr(view, 'series_occurrences', None)
+        self.paginated = self.cursor_query_param in params or self.page_size_query_param in params
+        if not self.paginated:
+            if occurrences is None:
+                return None
+            # Лента целиком: события и занятия серий из окна (занятий - не больше MAX_UNPAGINATED_OCCURRENCES)
+            return attach_series(list(heapq.merge(
+                queryset.order_by('dt_start', 'id'), occurrences(limit=MAX_UNPAGINATED_OCCURRENCES), key=feed_key
+            )))
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(params.get(self.cursor_query_param))
+        if cursor is not None:
+            dt_start, kind, pk = cursor
+            after = Q(dt_start__gt=dt_start)
+            if kind == EVENT_KEY:
+                after |= Q(dt_start=dt_start, id__gt=pk)
+            queryset = queryset.filter(after)
+
+        results = list(queryset.order_by('dt_start', 'id')[:self.page_size + 1])
+        if occurrences is not None:
+            results = list(islice(heapq.merge(
+                results, occurrences(after=cursor, limit=self.page_size + 1), key=feed_key
+            ), self.page_size + 1))
+        self.has_next = len(results) > self.page_size
+        self.page = attach_series(results[:self.page_size])
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, item):
+        key = f's{item.series.pk}' if isinstance(item, Occurrence) else item.pk
+        raw = f'{item.dt_start.isoformat()}|{key}'
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, value):
+        if not value:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(value.encode()).decode()
+            dt_value, pk = raw.rsplit('|', 1)
+            dt_start = parse_datetime(dt_value)
+            kind = OCCURRENCE_KEY if pk.startswith('s') else EVENT_KEY
+            pk = int(pk.removeprefix('s'))
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if dt_start is None:
+            raise NotFound(self.invalid_cursor_message)
+        return dt_start, kind, pk
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(self.page[-1])
+        params[self.page_size_query_param] = self.page_size
+        return self.request.build_absolute_uri(self.request.path) + '?' + params.urlencode()
+
+    def get_paginated_response(self, data):
+        if not self.paginated:
+            return Response(data)
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
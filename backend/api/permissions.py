@@ -14,5 +14,5 @@ class IsEventOrganizer(permissions.BasePermission):
     message = "Вы не являетесь организатором этого мероприятия."
     # Проверка на уровне объекта (конкретного события)
     def has_object_permission(self, request, view, obj):
-        # obj здесь это Event
-        return obj.organizer == request.user
+        # obj здесь это Event; сравниваем id, чтобы не загружать организатора отдельным запросом
+        return obj.organizer_id == request.user.pk
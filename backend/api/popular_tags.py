@@ -0,0 +1,94 @@
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Tag, TagDailyUsage
+
+POPULAR_TAGS_LIMIT = 10
+# Окна популярности: all - за все время, upcoming - только мероприятия начиная с сегодняшнего дня
+WINDOWS = ('all', 'upcoming')
+CACHE_KEY = 'popular_tags:{window}'
+# upcoming зависит от текущей даты, поэтому кэш живет ограниченное время даже без изменений
+CACHE_TIMEOUT = 300
+UPDATE_BATCH_SIZE = 500
+
+
+def event_day(dt_start):
+    return timezone.localdate(dt_start)
+
+
+def apply_tag_usage(links, delta):
+    """
+    Изменяет счетчики использования тегов на delta для каждой пары (tag_id, day).
+    Счетчики меняются атомарными UPDATE с F(), поэтому параллельные изменения не теряются;
+    на пачку до UPDATE_BATCH_SIZE тегов/дней приходится один UPDATE с CASE.
+    """
+    links = Counter(links)
+    if not links:
+        return
+
+    per_tag = Counter()
+    for (tag_id, _), count in links.items():
+        per_tag[tag_id] += count
+    for batch in _batches(per_tag.items()):
+        Tag.objects.filter(pk__in=[tag_id for tag_id, _ in batch]).update(
+            usage_count=_shifted('usage_count', [When(pk=tag_id, then=Value(delta * count)) for tag_id, count in batch])
+        )
+
+    # Строки (tag, day) создаем заранее, чтобы инкремент всегда был UPDATE существующей строки
+    TagDailyUsage.objects.bulk_create(
+        [TagDailyUsage(tag_id=tag_id, day=day) for tag_id, day in links],
+        ignore_conflicts=True, batch_size=UPDATE_BATCH_SIZE
+    )
+    for batch in _batches(links.items()):
+        TagDailyUsage.objects.filter(
+            reduce(or_, (Q(tag_id=tag_id, day=day) for (tag_id, day), _ in batch))
+        ).update(
+            events_count=_shifted('events_count', [
+                When(tag_id=tag_id, day=day, then=Value(delta * count)) for (tag_id, day), count in batch
+            ])
+        )
+
+    transaction.on_commit(invalidate_popular_tags)
+
+
+def _shifted(field, whens):
+    """field + CASE ... END, но не ниже нуля"""
+    shift = Case(*whens, default=Value(0), output_field=IntegerField())
+    return Greatest(F(field) + shift, Value(0), output_field=IntegerField())
+
+
+def _batches(items):
+    items = list(items)
+    for start in range(0, len(items), UPDATE_BATCH_SIZE):
+        yield items[start:start + UPDATE_BATCH_SIZE]
+
+
+def invalidate_popular_tags():
+    cache.delete_many([CACHE_KEY.format(window=window) for window in WINDOWS])
+
+
+def popular_tags_queryset(window='all'):
+    if window == 'upcoming':
+        return Tag.objects.filter(
+            daily_usage__day__gte=timezone.localdate()
+        ).annotate(
+            window_usage=Sum('daily_usage__events_count')
+        ).filter(window_usage__gt=0).order_by('-window_usage', 'name')[:POPULAR_TAGS_LIMIT]
+    return Tag.objects.filter(usage_count__gt=0).order_by('-usage_count', 'name')[:POPULAR_TAGS_LIMIT]
+
+
+def get_popular_tags(window, serialize):
+    """Возвращает сериализованный топ тегов из кэша, при промахе - из предагрегированных счетчиков"""
+    key = CACHE_KEY.format(window=window)
+    data = cache.get(key)
+    if data is None:
+        data = serialize(popular_tags_queryset(window))
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,177 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image, ImageDraw
+
+QR_SIZES = (128, 256, 512, 1024)
+DEFAULT_QR_SIZE = 256
+QR_FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+QR_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+# Меняется вместе с рендером: картинки, закэшированные старым кодом, получают другой ключ
+RENDER_VERSION = 2
+# Пакет на один вызов воркера: меньше накладных расходов на передачу между процессами
+RENDER_CHUNK_SIZE = 50
+
+SHEET_PAGE_SIZE = (1240, 1754)  # A4 при 150 dpi
+SHEET_COLUMNS, SHEET_ROWS = 3, 4
+SHEET_QR_SIZE = 256
+
+
+def normalize_size(value):
+    """Ближайший допустимый размер - чтобы число вариантов в кэше было ограничено"""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_QR_SIZE
+    return min(QR_SIZES, key=lambda allowed: abs(allowed - size))
+
+
+def content_key(payload, size, image_format):
+    """Ключ по содержимому: одинаковые данные, размер и формат - одна и та же картинка"""
+    return hashlib.sha256(f'{RENDER_VERSION}:{image_format}:{size}:{payload}'.encode()).hexdigest()
+
+
+def payload_version(payload):
+    """
+    Версия для адреса картинки (?v=): содержимое QR меняется вместе с токеном (перенос мероприятия
+    меняет срок действия), поэтому immutable-кэш браузера допустим только для адреса с версией.
+    """
+    return hashlib.sha256(f'{RENDER_VERSION}:{payload}'.encode()).hexdigest()[:16]
+
+
+def render(payload, size, image_format):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=2)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    if image_format == 'svg':
+        image = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        # По умолчанию размер в мм по числу модулей; задаем запрошенный в пикселях, viewBox масштабирует
+        root = image.get_image()
+        root.set('width', str(size))
+        root.set('height', str(size))
+        return image.to_string(encoding='unicode').encode()
+    image = qr.make_image().get_image().convert('L').resize((size, size), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def _render_chunk(items):
+    # Выполняется в процессе-воркере: только чистый рендер, без базы и кэша
+    return [render(payload, size, image_format) for payload, size, image_format in items]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_pid = None
+
+
+def get_pool():
+    """
+    Пул процессов на процесс приложения (после fork воркера gunicorn создается заново).
+    Воркеры запускаются через forkserver (где его нет - spawn), а не fork: процесс приложения
+    уже многопоточный (пул соединений, потоки запросов), и fork в нем может унаследовать чужую блокировку.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.QR_RENDER_WORKERS, mp_context=multiprocessing.get_context(method)
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def reset_pool(broken):
+    """Забывает сломанный пул (воркер упал - OOM, сбой PIL): следующий get_pool() создаст новый"""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_in_pool(jobs):
+    # Один повтор на новом пуле: сломанный пул иначе ронял бы все последующие запросы до перезапуска воркера
+    for attempt in range(2):
+        pool = get_pool()
+        try:
+            return list(pool.map(_render_chunk, jobs))
+        except BrokenProcessPool:
+            reset_pool(pool)
+            if attempt:
+                raise
+
+
+def get_qr(payload, size, image_format):
+    """Одна картинка: из кэша или рендер (маленькая, рендерится быстрее пересылки в пул)"""
+    key = 'qr:' + content_key(payload, size, image_format)
+    content = cache.get(key)
+    if content is None:
+        content = render(payload, size, image_format)
+        cache.set(key, content, QR_CACHE_TIMEOUT)
+    return content
+
+
+def get_qr_many(payloads, size, image_format='png'):
+    """
+    Картинки для списка данных (в том же порядке). Берет готовые из кэша,
+    недостающие рендерит в пуле процессов пачками и кладет в кэш.
+    """
+    keys = ['qr:' + content_key(payload, size, image_format) for payload in payloads]
+    cached = cache.get_many(keys)
+    missing = [(key, payload) for key, payload in zip(keys, payloads) if key not in cached]
+    if missing:
+        chunks = [missing[i:i + RENDER_CHUNK_SIZE] for i in range(0, len(missing), RENDER_CHUNK_SIZE)]
+        jobs = [[(payload, size, image_format) for _, payload in chunk] for chunk in chunks]
+        rendered = {}
+        for chunk, images in zip(chunks, _render_in_pool(jobs)):
+            rendered.update((key, image) for (key, _), image in zip(chunk, images))
+        cache.set_many(rendered, QR_CACHE_TIMEOUT)
+        cached.update(rendered)
+    return [cached[key] for key in keys]
+
+
+def build_zip(entries):
+    """entries: [(имя файла, PNG-байты)] -> ZIP (PNG уже сжат, поэтому без повторного сжатия)"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, content in entries:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+def build_pdf(entries):
+    """entries: [(подпись, PNG-байты)] -> PDF, сетка SHEET_COLUMNS x SHEET_ROWS на странице A4"""
+    per_page = SHEET_COLUMNS * SHEET_ROWS
+    cell_width = SHEET_PAGE_SIZE[0] // SHEET_COLUMNS
+    cell_height = SHEET_PAGE_SIZE[1] // SHEET_ROWS
+    pages = []
+    for start in range(0, max(len(entries), 1), per_page):
+        # Черно-белая страница: QR двухцветный, а 1-битный PDF в десятки раз меньше серого
+        page = Image.new('1', SHEET_PAGE_SIZE, 1)
+        draw = ImageDraw.Draw(page)
+        for index, (caption, content) in enumerate(entries[start:start + per_page]):
+            column, row = index % SHEET_COLUMNS, index // SHEET_COLUMNS
+            left = column * cell_width + (cell_width - SHEET_QR_SIZE) // 2
+            top = row * cell_height + 40
+            page.paste(Image.open(io.BytesIO(content)), (left, top))
+            draw.text((column * cell_width + 20, top + SHEET_QR_SIZE + 10), caption[:40], fill=0)
+        pages.append(page)
+    buffer = io.BytesIO()
+    pages[0].save(buffer, format='PDF', save_all=True, append_images=pages[1:], resolution=150)
+    return buffer.getvalue()
@@ -0,0 +1,75 @@
+import hashlib
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+FEED = 'feed'
+TAGS = 'tags'
+# Страховка на случай пропущенной инвалидации и для событий, которые начались и выпали из ленты
+RESPONSE_CACHE_TIMEOUT = 60
+VERSION_KEY = 'response_cache:{namespace}:version'
+
+
+def get_version(namespace):
+    return cache.get_or_set(VERSION_KEY.format(namespace=namespace), lambda: uuid.uuid4().hex, None)
+
+
+def invalidate(*namespaces):
+    """
+    Сбрасывает закэшированные ответы сменой версии пространства имен (старые ключи просто истекут).
+    Повторяем после коммита, чтобы ответ, собранный параллельно до коммита, не пережил изменение.
+    Версия живет в кэше Django: при нескольких процессах приложения он должен быть общим (Redis) -
+    LocMemCache сбросит кэш только в текущем процессе, поэтому gunicorn.conf.py без REDIS_URL не запустит
+    больше одного воркера.
+    """
+    def bump():
+        cache.set_many({VERSION_KEY.format(namespace=namespace): uuid.uuid4().hex for namespace in namespaces}, None)
+    bump()
+    transaction.on_commit(bump)
+
+
+class CachedListMixin:
+    """
+    Кэширует сериализованный ответ list() по параметрам запроса и отдает ETag.
+    Если If-None-Match совпадает с текущим ETag, возвращается 304 без запросов к базе и сериализации.
+    Наследник задает cache_namespace и может переопределить use_response_cache / personalize.
+    """
+    cache_namespace = None
+
+    def use_response_cache(self, request):
+        return True
+
+    def personalize(self, request, data):
+        """Подставляет в общий ответ данные текущего пользователя"""
+        return data
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_response_cache(request):
+            return super().list(request, *args, **kwargs)
+
+        version = get_version(self.cache_namespace)
+        params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+        # Временная корзина ограничивает жизнь ключа и ETag: лента зависит от текущего времени
+        time_bucket = int(time.time() // RESPONSE_CACHE_TIMEOUT)
+        signature = repr((self.cache_namespace, version, time_bucket, request.get_host(), request.path, params))
+        key = 'response_cache:' + hashlib.sha1(signature.encode()).hexdigest()
+        # Персонализированные ответы различаются по пользователю - ETag тоже
+        user_id = request.user.pk if request.user.is_authenticated else None
+        etag = '"%s"' % hashlib.sha1(f'{key}:{user_id}'.encode()).hexdigest()
+        headers = {'ETag': etag, 'Vary': 'Authorization', 'Cache-Control': 'private, no-cache'}
+
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        data = cache.get(key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            cache.set(key, response.data, RESPONSE_CACHE_TIMEOUT)
+            data = response.data
+        else:
+            data = self.personalize(request, data)
+        return Response(data, headers=headers)
@@ -0,0 +1,75 @@
+from functools import reduce
+from operator import and_, or_
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import Event
+
+# Конфигурация текстового поиска PostgreSQL (морфология); мероприятия у нас на русском.
+# Та же конфигурация используется при заполнении вектора в миграции 0010
+SEARCH_CONFIG = 'russian'
+# Поиск отдает лучшие совпадения по релевантности, без постраничной навигации
+SEARCH_RESULTS_LIMIT = 50
+
+
+class PostgresSearchEngine:
+    """
+    Полнотекстовый поиск по хранимому Event.search_vector (GIN-индекс event_search_vector_gin).
+    Вес: название (A) > место (B) > описание (C).
+    """
+
+    @staticmethod
+    def document():
+        return (
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('location_text', weight='B', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+        )
+
+    def update_vectors(self, event_ids):
+        Event.objects.filter(pk__in=event_ids).update(search_vector=self.document())
+
+    def search(self, queryset, text):
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', 'dt_start', 'id')
+
+
+class SimpleSearchEngine:
+    """
+    Запасной поиск для SQLite (локальная разработка и тесты): каждое слово запроса должно
+    встречаться в названии, месте или описании; совпадения в названии весят больше.
+    LIKE в SQLite не различает регистр только для ASCII, поэтому кириллические слова
+    ищутся в нескольких написаниях (как введено, строчными, с заглавной, прописными).
+    """
+    WEIGHTS = (('title', 4), ('location_text', 2), ('description', 1))
+
+    def update_vectors(self, event_ids):
+        pass
+
+    @staticmethod
+    def contains(field, term):
+        spellings = {term, term.lower(), term.capitalize(), term.upper()}
+        return reduce(or_, (Q(**{f'{field}__contains': spelling}) for spelling in spellings))
+
+    def search(self, queryset, text):
+        terms = text.split()
+        if not terms:
+            return queryset.none()
+        matches = reduce(and_, (
+            reduce(or_, (self.contains(field, term) for field, _ in self.WEIGHTS)) for term in terms
+        ))
+        rank = reduce(lambda left, right: left + right, (
+            Case(When(self.contains(field, term), then=Value(weight)), default=Value(0), output_field=IntegerField())
+            for term in terms for field, weight in self.WEIGHTS
+        ))
+        return queryset.filter(matches).annotate(rank=rank).order_by('-rank', 'dt_start', 'id')
+
+
+def get_search_engine():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchEngine()
+    return SimpleSearchEngine()
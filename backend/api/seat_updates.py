@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL = 'studafishka:seats'
+# Сколько необработанных сообщений держим на подписчика; медленный клиент теряет старые, а не тормозит остальных
+SUBSCRIBER_QUEUE_SIZE = 100
+# Через сколько клиент переподключается после обрыва (поле retry в SSE)
+RECONNECT_DELAY_MS = 5000
+
+
+def availability(event_id, max_participants, registered_count):
+    """Те же числа, что EventSerializer.spots_left: None - без ограничения мест"""
+    spots_left = None if max_participants is None else max(max_participants - registered_count, 0)
+    return {
+        'event_id': event_id,
+        'max_participants': max_participants,
+        'registered_count': registered_count,
+        'spots_left': spots_left,
+    }
+
+
+def sse_frame(data, event='seats'):
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+# Последний кадр ответа без живого потока (WSGI): клиент показывает снимок и больше не переподключается -
+# иначе каждая открытая страница опрашивала бы сервер раз в RECONNECT_DELAY_MS
+END_FRAME = sse_frame({'live': False}, event='end')
+
+
+class Subscription:
+    """Очередь одного подключения; живет в event loop, в котором создана."""
+
+    def __init__(self, event_ids):
+        self.event_ids = frozenset(event_ids)
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, frame):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(frame)
+
+
+class InProcessBroker:
+    """
+    Раздача изменений подписчикам этого процесса. publish() можно звать из любого потока:
+    на каждый event loop с подписчиками приходится один call_soon_threadsafe,
+    дальше кадр раскладывается по очередям внутри loop - тысячи зрителей не дают тысяч запросов.
+    """
+
+    def __init__(self):
+        # loop -> event_id -> подписки; индекс меняется только в своем loop, читается под замком
+        self._loops = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, event_ids):
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(event_ids)
+        with self._lock:
+            index = self._loops.setdefault(loop, defaultdict(set))
+            for event_id in subscription.event_ids:
+                index[event_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            index = self._loops.get(loop, {})
+            for event_id in subscription.event_ids:
+                subscribers = index.get(event_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del index[event_id]
+            if not index:
+                self._loops.pop(loop, None)
+
+    def has_subscribers(self, event_id):
+        with self._lock:
+            return any(event_id in index for index in self._loops.values())
+
+    def publish(self, data):
+        self.deliver(data['event_id'], sse_frame(data))
+
+    def deliver(self, event_id, frame):
+        with self._lock:
+            loops = [loop for loop, index in self._loops.items() if event_id in index]
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._fan_out, loop, event_id, frame)
+            except RuntimeError:
+                # loop уже закрыт (воркер завершается)
+                pass
+
+    def _fan_out(self, loop, event_id, frame):
+        with self._lock:
+            subscribers = list(self._loops.get(loop, {}).get(event_id, ()))
+        for subscription in subscribers:
+            subscription.put(frame)
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Изменения публикуются в канал Redis одним PUBLISH; каждый процесс держит одну подписку
+    на канал (на свой event loop) и раздает полученное своим подключениям. Нужен пакет redis.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._client = None
+        self._listeners = {}
+
+    def publish(self, data):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(REDIS_CHANNEL, json.dumps(data))
+
+    def subscribe(self, event_ids):
+        subscription = super().subscribe(event_ids)
+        loop = asyncio.get_running_loop()
+        listener = self._listeners.get(loop)
+        if listener is None or listener.done():
+            self._listeners[loop] = loop.create_task(self._listen())
+        return subscription
+
+    async def _listen(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        try:
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(REDIS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] != 'message':
+                        continue
+                    data = json.loads(message['data'])
+                    self.deliver(data['event_id'], sse_frame(data))
+        except Exception:
+            # Следующее подключение к потоку перезапустит подписку
+            logger.exception('Подписка на обновления мест в Redis прервалась')
+        finally:
+            await client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = settings.SEATS_BROKER_URL
+            _broker = RedisBroker(url) if url else InProcessBroker()
+        return _broker
+
+
+def publish_availability(event_id):
+    broker = get_broker()
+    # Без внешнего брокера видно, смотрит ли кто-нибудь событие: если нет - не читаем базу вовсе
+    if not isinstance(broker, RedisBroker) and not broker.has_subscribers(event_id):
+        return
+    row = Event.objects.filter(pk=event_id).values_list('max_participants', 'registered_count').first()
+    if row is None:
+        return
+    try:
+        broker.publish(availability(event_id, *row))
+    except Exception:
+        # Поток мест - вспомогательный канал: его сбой не должен ломать регистрацию
+        logger.exception('Не удалось опубликовать свободные места мероприятия %s', event_id)
+
+
+def notify_seats_changed(event_id):
+    """Публикует актуальные места после коммита (читаем уже записанный registered_count)"""
+    transaction.on_commit(partial(publish_availability, event_id))
+
+
+async def snapshot(event_ids):
+    """Кадры SSE с текущими местами запрошенных событий (неизвестные id пропускаются)"""
+    frames = [f'retry: {RECONNECT_DELAY_MS}\n\n']
+    async for row in Event.objects.filter(pk__in=event_ids).values_list('pk', 'max_participants', 'registered_count'):
+        frames.append(sse_frame(availability(*row)))
+    return frames
+
+
+async def stream(event_ids):
+    """
+    Живой поток SSE: снимок, затем изменения по мере публикации и пинги раз в SEATS_STREAM_HEARTBEAT.
+    Подписка оформляется до снимка, чтобы не потерять изменение между ними.
+    """
+    broker = get_broker()
+    subscription = broker.subscribe(event_ids)
+    try:
+        for frame in await snapshot(event_ids):
+            yield frame
+        # Соединение с базой больше не нужно - не держим его (и место в пуле) все время жизни потока
+        await sync_to_async(connections.close_all)()
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.queue.get(), settings.SEATS_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
@@ -1,9 +1,17 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import make_password
-from django.db import transaction
+from django.db import IntegrityError, models, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.urls import reverse
 from django.utils import timezone
-from .models import Event, Registration, Tag
+from datetime import timedelta
+from .models import Event, EventDailyStats, EventFull, EventSeries, Registration, Tag, WaitlistEntry
+from . import response_cache
+from .checkin_codes import InvalidCode, parse_code, token_for
+from .qr import payload_version
+from .series import Occurrence
 
 User = get_user_model()
 
@@ -16,8 +24,8 @@ class TagSerializer(serializers.ModelSerializer):
 
     def validate_name(self, value):
         name_lower = value.lower().strip()
-        # Проверяем наличие дубликатов с игнорированием регистра
-        existing_tags = Tag.objects.filter(name__iexact=name_lower)
+        # Проверяем наличие дубликатов с игнорированием регистра (по индексу tag_name_lower_uniq)
+        existing_tags = Tag.objects.alias(name_lower=Lower('name')).filter(name_lower=name_lower)
         if existing_tags.exists():
             # Если обновляем существующий тег, исключаем его из проверки
             if self.instance and self.instance.pk == existing_tags.first().pk:
@@ -60,12 +68,45 @@ class RegisterSerializer(serializers.ModelSerializer):
         user.save() # Метод save в модели User обработает is_staff
         return user
 
-class EventSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """Sparse fieldset: ?fields=id,title,dt_start - отдаем только перечисленные поля (только на чтение)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        requested = request.query_params.get('fields')
+        if requested:
+            allowed = {name.strip() for name in requested.split(',')}
+            for field_name in set(self.fields) - allowed:
+                self.fields.pop(field_name)
+
+
+class EventFeedListSerializer(serializers.ListSerializer):
+    """Лента: события вперемешку с незанятыми занятиями серий (api/series.Occurrence)"""
+
+    def to_representation(self, data):
+        items = data.all() if isinstance(data, models.manager.BaseManager) else data
+        occurrence_serializer = None
+        result = []
+        for item in items:
+            if isinstance(item, Occurrence):
+                occurrence_serializer = occurrence_serializer or SeriesOccurrenceSerializer(context=self.context)
+                result.append(occurrence_serializer.to_representation(item))
+            else:
+                result.append(self.child.to_representation(item))
+        return result
+
+
+class EventSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Обновленный сериализатор для мероприятий с поддержкой тегов"""
     organizer = UserSerializer(read_only=True)
     is_registered = serializers.SerializerMethodField(read_only=True)
     spots_left = serializers.SerializerMethodField(read_only=True)
     is_organizer = serializers.SerializerMethodField(read_only=True)
+    # Занятие серии: плановое начало по правилу повторения (None у разовых мероприятий)
+    occurrence_start = serializers.DateTimeField(source='series_occurrence', read_only=True)
     
     # Поля для работы с тегами
     tags = TagSerializer(many=True, read_only=True)  # Для вывода полной информации о тегах
@@ -88,9 +129,11 @@ class EventSerializer(serializers.ModelSerializer):
             'id', 'title', 'description', 'dt_start', 'location_text',
             'organizer', 'max_participants', 'created_at',
             'is_registered', 'spots_left', 'is_organizer',
-            'tags', 'tag_ids', 'tag_names'  # Новые поля для тегов
+            'tags', 'tag_ids', 'tag_names',  # Новые поля для тегов
+            'series', 'occurrence_start',
         )
-        read_only_fields = ('organizer', 'created_at', 'is_registered', 'spots_left', 'is_organizer', 'tags')
+        read_only_fields = ('organizer', 'created_at', 'is_registered', 'spots_left', 'is_organizer', 'tags', 'series')
+        list_serializer_class = EventFeedListSerializer
 
     def create(self, validated_data):
         tag_ids = validated_data.pop('tag_ids', [])
@@ -130,14 +173,7 @@ class EventSerializer(serializers.ModelSerializer):
         
         # Обрабатываем теги по названиям (создаем если не существуют)
         if tag_names:
-            for tag_name in tag_names:
-                tag_name_clean = tag_name.lower().strip()
-                if tag_name_clean:  # Проверяем, что название не пустое
-                    tag, created = Tag.objects.get_or_create(
-                        name=tag_name_clean,
-                        defaults={'color': '#007bff'}  # Цвет по умолчанию
-                    )
-                    tags_to_add.append(tag)
+            tags_to_add.extend(self.resolve_tag_names(tag_names))
         
         # Устанавливаем теги для события
         if tags_to_add:
@@ -146,22 +182,144 @@ class EventSerializer(serializers.ModelSerializer):
             # Если передали пустые списки, очищаем теги
             event.tags.clear()
 
+    @staticmethod
+    def resolve_tag_names(tag_names):
+        """
+        Находит теги по названиям (без учета регистра) и создает недостающие.
+        Не более трех запросов на любое число названий: поиск, bulk_create, дочитывание созданных.
+        """
+        # Приводим к нижнему регистру, убираем пустые и дубликаты с сохранением порядка
+        names = list(dict.fromkeys(name.lower().strip() for name in tag_names if name.strip()))
+        if not names:
+            return []
+
+        def fetch(lookup_names):
+            found = Tag.objects.alias(name_lower=Lower('name')).filter(name_lower__in=lookup_names)
+            return {tag.name.lower(): tag for tag in found}
+
+        tags = fetch(names)
+        missing = [name for name in names if name not in tags]
+        if missing:
+            # ignore_conflicts: тег мог появиться параллельно - тогда просто дочитаем его
+            Tag.objects.bulk_create([Tag(name=name) for name in missing], ignore_conflicts=True)
+            tags.update(fetch(missing))
+            # bulk_create не вызывает post_save - сбрасываем кэш списка тегов сами
+            response_cache.invalidate(response_cache.TAGS)
+        return [tags[name] for name in names]
+
+    # is_registered_flag подставляет EventViewSet.get_queryset одним запросом на всю страницу;
+    # без аннотации (например, после create) проверяем напрямую.
     def get_is_registered(self, obj):
         user = self.context['request'].user
-        if user.is_authenticated and user.is_student:
-            return Registration.objects.filter(event=obj, student=user).exists()
-        return False
+        if not (user.is_authenticated and user.is_student):
+            return False
+        if hasattr(obj, 'is_registered_flag'):
+            return obj.is_registered_flag
+        return Registration.objects.filter(event=obj, student=user).exists()
 
     def get_spots_left(self, obj):
         if obj.max_participants is None:
             return None
-        count = Registration.objects.filter(event=obj).count()
-        left = obj.max_participants - count
+        left = obj.max_participants - obj.registered_count
         return left if left >= 0 else 0
 
     def get_is_organizer(self, obj):
         user = self.context['request'].user
-        return user.is_authenticated and obj.organizer == user
+        return user.is_authenticated and obj.organizer_id == user.pk
+
+
+class SeriesOccurrenceSerializer(SparseFieldsetMixin, serializers.Serializer):
+    """
+    Незанятое занятие серии в ленте - в том же виде, что EventSerializer. id нет, пока никто не записался:
+    запись идет через POST /api/series/{series}/register/ с occurrence_start.
+    """
+    id = serializers.ReadOnlyField(default=None)
+    title = serializers.CharField(source='series.title')
+    description = serializers.CharField(source='series.description')
+    dt_start = serializers.DateTimeField()
+    location_text = serializers.CharField(source='series.location_text')
+    organizer = UserSerializer(source='series.organizer')
+    max_participants = serializers.IntegerField(source='series.max_participants')
+    created_at = serializers.DateTimeField(source='series.created_at')
+    is_registered = serializers.ReadOnlyField(default=False)
+    # Записей на занятие еще нет - свободны все места
+    spots_left = serializers.IntegerField(source='series.max_participants')
+    is_organizer = serializers.SerializerMethodField()
+    tags = TagSerializer(source='series.tags.all', many=True)
+    series = serializers.IntegerField(source='series.pk')
+    occurrence_start = serializers.DateTimeField(source='dt_start')
+
+    def get_is_organizer(self, obj):
+        user = self.context['request'].user
+        return user.is_authenticated and obj.series.organizer_id == user.pk
+
+
+class EventSeriesSerializer(EventSerializer):
+    """Серия мероприятий с правилом повторения; теги - как у EventSerializer (tag_ids / tag_names)"""
+    is_registered = None
+    spots_left = None
+    occurrence_start = None
+
+    class Meta:
+        model = EventSeries
+        fields = (
+            'id', 'title', 'description', 'location_text', 'organizer', 'max_participants',
+            'dt_start', 'frequency', 'interval', 'until', 'count', 'created_at',
+            'is_organizer', 'tags', 'tag_ids', 'tag_names',
+        )
+        read_only_fields = ('organizer', 'created_at', 'is_organizer', 'tags')
+
+    def validate(self, attrs):
+        dt_start = attrs.get('dt_start', getattr(self.instance, 'dt_start', None))
+        until = attrs.get('until', getattr(self.instance, 'until', None))
+        if until is not None and until < dt_start:
+            raise serializers.ValidationError({'until': "Конец повторения раньше первого занятия."})
+        return attrs
+
+    def create(self, validated_data):
+        tag_ids = validated_data.pop('tag_ids', [])
+        tag_names = validated_data.pop('tag_names', [])
+        series = EventSeries.objects.create(organizer=self.context['request'].user, **validated_data)
+        self._handle_tags(series, tag_ids, tag_names)
+        return series
+
+
+class SeriesOccurrenceRegisterSerializer(serializers.Serializer):
+    """Запись студента на занятие серии: строка Event занятия создается при первой записи"""
+    occurrence_start = serializers.DateTimeField(help_text="Начало занятия из ленты (поле occurrence_start)")
+
+    def validate_occurrence_start(self, value):
+        if not self.context['series'].is_occurrence(value):
+            raise serializers.ValidationError("В серии нет занятия с таким началом.")
+        if value <= timezone.now():
+            raise serializers.ValidationError("Cannot register for past events.")
+        return value
+
+    def create(self, validated_data):
+        event = self.context['series'].materialize(validated_data['occurrence_start'])
+        EventRegistrationCreateSerializer.check_event(event)
+        try:
+            return Registration.objects.create(student=self.context['request'].user, event=event)
+        except (IntegrityError, EventFull) as exc:
+            raise EventRegistrationCreateSerializer.create_error(exc)
+
+
+class EventImportRowSerializer(serializers.ModelSerializer):
+    """Строка массового импорта мероприятий (проверка без обращений к базе)"""
+    tag_names = serializers.ListField(
+        child=serializers.CharField(max_length=50),
+        required=False,
+        default=list,
+        help_text="Названия тегов (будут созданы автоматически, если не существуют)"
+    )
+
+    class Meta:
+        model = Event
+        fields = ('external_id', 'title', 'description', 'dt_start', 'location_text', 'max_participants', 'tag_names')
+
+    def validate_external_id(self, value):
+        # Пустой ключ - строка без ключа: '' уникальное ограничение (organizer, external_id) считает значением
+        return value or None
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
@@ -176,18 +334,26 @@ class RegistrationSerializer(serializers.ModelSerializer):
 
 class MyRegistrationSerializer(serializers.ModelSerializer):
      """Для ЛК студента - краткая информация о событии + QR"""
+     event_id = serializers.IntegerField(read_only=True)
      event_title = serializers.CharField(source='event.title', read_only=True)
      event_dt_start = serializers.DateTimeField(source='event.dt_start', read_only=True)
      event_location = serializers.CharField(source='event.location_text', read_only=True)
      qr_code_data = serializers.SerializerMethodField()
+     qr_code_url = serializers.SerializerMethodField()
 
      class Meta:
          model = Registration
-         fields = ('id', 'event_title', 'event_dt_start', 'event_location', 'attended', 'qr_code_data')
+         fields = ('id', 'event_id', 'event_title', 'event_dt_start', 'event_location', 'attended', 'qr_code_data', 'qr_code_url')
 
      def get_qr_code_data(self, obj):
-         # Данные для QR-кода - просто UUID регистрации
-         return str(obj.id)
+         # Подписанный токен (регистрация, мероприятие, срок действия): сканер проверяет его без базы
+         return token_for(obj.id, obj.event_id, obj.event.dt_start)
+
+     def get_qr_code_url(self, obj):
+         # Готовая картинка с сервера (RegistrationQRView) - клиенту не нужно рендерить QR самому.
+         # Версия в адресе: после переноса мероприятия адрес меняется и браузер не покажет старый QR
+         version = payload_version(token_for(obj.id, obj.event_id, obj.event.dt_start))
+         return f"{reverse('registration-qr', args=[obj.id])}?v={version}"
 
 
 class EventRegistrationCreateSerializer(serializers.Serializer):
@@ -204,44 +370,198 @@ class EventRegistrationCreateSerializer(serializers.Serializer):
         except Event.DoesNotExist:
             raise serializers.ValidationError("Event not found.")
         
-        user = self.context['request'].user
-        
-        # Check if already registered
-        if Registration.objects.filter(student=user, event=event).exists():
-            raise serializers.ValidationError("You are already registered for this event.")
-        
-        # Check capacity
-        if event.max_participants and event.registrations.count() >= event.max_participants:
+        self.check_event(event)
+        # Store event in context for the view to use
+        self.context['event'] = event
+        return attrs
+
+    def create(self, validated_data):
+        # INSERT + conditional UPDATE of registered_count in one transaction:
+        # the unique (student, event) constraint catches duplicates, the UPDATE catches overbooking
+        try:
+            return Registration.objects.create(student=self.context['request'].user, event=self.context['event'])
+        except (IntegrityError, EventFull) as exc:
+            raise self.create_error(exc)
+
+    # Правила ниже общие с асинхронной регистрацией (api/async_views.py)
+
+    @staticmethod
+    def check_event(event):
+        # Cheap early rejection using the denormalized counter; the authoritative
+        # capacity and duplicate checks happen atomically in create()
+        if event.is_full:
             raise serializers.ValidationError("Event is full.")
         
         # Check if event is in the future
         if event.dt_start <= timezone.now():
             raise serializers.ValidationError("Cannot register for past events.")
-        
-        # Store event in context for the view to use
+
+    @staticmethod
+    def create_error(exc):
+        if isinstance(exc, EventFull):
+            return serializers.ValidationError("Event is full.")
+        return serializers.ValidationError("You are already registered for this event.")
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    """Запись студента в листе ожидания с текущей позицией в очереди"""
+    event_title = serializers.CharField(source='event.title', read_only=True)
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ('id', 'event', 'event_title', 'created_at', 'position')
+        read_only_fields = fields
+
+    def get_position(self, obj):
+        # Позиция считается с 1; индекс (event, created_at, id) покрывает этот подсчет
+        return WaitlistEntry.objects.filter(event_id=obj.event_id).filter(
+            Q(created_at__lt=obj.created_at) | Q(created_at=obj.created_at, id__lt=obj.id)
+        ).count() + 1
+
+
+class EventWaitlistCreateSerializer(serializers.Serializer):
+    """Постановка текущего студента в очередь на заполненное мероприятие (event_pk из URL)"""
+
+    def validate(self, attrs):
+        event_pk = self.context['view'].kwargs.get('event_pk')
+        try:
+            event = Event.objects.get(pk=event_pk)
+        except Event.DoesNotExist:
+            raise serializers.ValidationError("Event not found.")
+
+        if event.dt_start <= timezone.now():
+            raise serializers.ValidationError("Cannot join the waitlist for past events.")
+
+        if not event.is_full:
+            raise serializers.ValidationError("Event has free spots, register directly.")
+
+        if Registration.objects.filter(student=self.context['request'].user, event=event).exists():
+            raise serializers.ValidationError("You are already registered for this event.")
+
         self.context['event'] = event
         return attrs
 
+    def create(self, validated_data):
+        try:
+            return WaitlistEntry.objects.create(student=self.context['request'].user, event=self.context['event'])
+        except IntegrityError:
+            raise serializers.ValidationError("You are already on the waitlist for this event.")
+
+
 class CheckInSerializer(serializers.Serializer):
-    """Сериализатор для отметки посещения (принимает registration_id)"""
-    registration_id = serializers.UUIDField(required=True)
+    """Сериализатор для отметки посещения (принимает содержимое QR в registration_id)"""
+    registration_id = serializers.CharField(
+        required=True, max_length=128,
+        help_text="Содержимое QR-кода: подписанный токен (или UUID регистрации для старых кодов)"
+    )
 
-    def validate_registration_id(self, registration_id):
-        # Получаем событие из URL (должно быть передано во view)
-        event = self.context['event']
+    def validate(self, attrs):
+        # Подпись, мероприятие и срок проверяются без базы - чужие и поддельные коды сразу отклоняются
         try:
-            registration = Registration.objects.get(pk=registration_id)
-        except Registration.DoesNotExist:
-            raise serializers.ValidationError("Регистрация с таким ID не найдена.")
+            attrs['registration_id'] = parse_code(attrs['registration_id'], self.context['event'].pk)
+        except InvalidCode as exc:
+            raise serializers.ValidationError({'error': str(exc)})
+        return attrs
+
+    def create(self, validated_data):
+        # Событие из URL передается во view через контекст
+        event = self.context['event']
+        registration_id = validated_data['registration_id']
+        # Один условный UPDATE вместо get-compare-save: повторный скан не может отметить дважды
+        if not Registration.check_in(registration_id, event.pk):
+            raise serializers.ValidationError({'error': self.rejection_reason(registration_id, event)})
+        return Registration.objects.select_related('student').get(pk=registration_id)
 
+    @staticmethod
+    def rejection_reason(registration_id, event):
+        """Объясняет, почему UPDATE не затронул строку (редкий путь, отдельный запрос)"""
+        registration = Registration.objects.select_related('student').filter(pk=registration_id).first()
+        return CheckInSerializer.rejection_message(registration, event)
+
+    @staticmethod
+    def rejection_message(registration, event):
+        if registration is None:
+            return "Регистрация с таким ID не найдена."
         # Проверяем, относится ли регистрация к ТЕКУЩЕМУ событию
-        if registration.event != event:
-            raise serializers.ValidationError("Этот QR-код от другого мероприятия.")
+        if registration.event_id != event.pk:
+            return "Этот QR-код от другого мероприятия."
+        return f"Студент {registration.student.name or registration.student.username} уже отмечен."
+
 
-        # Проверяем, не был ли студент уже отмечен
-        if registration.attended:
-            raise serializers.ValidationError(f"Студент {registration.student.name or registration.student.username} уже отмечен.")
+class CheckInBatchSerializer(serializers.Serializer):
+    """Пакетная отметка посещения: список registration_id, отсканированных офлайн"""
+    CHECKED_IN = 'checked_in'
+    ALREADY_CHECKED_IN = 'already_checked_in'
+    WRONG_EVENT = 'wrong_event'
+    NOT_FOUND = 'not_found'
+    INVALID = 'invalid'
+    EXPIRED = 'expired'
+    # Причины отказа checkin_codes.parse_code -> результат элемента пакета
+    CODE_ERRORS = {'forged': INVALID, 'wrong_event': WRONG_EVENT, 'expired': EXPIRED}
+
+    registration_ids = serializers.ListField(
+        child=serializers.CharField(max_length=128),
+        allow_empty=False,
+        max_length=1000,
+        help_text="Список отсканированных QR-кодов: токены или UUID регистраций (до 1000 за запрос)"
+    )
+
+    def create(self, validated_data):
+        """
+        Отмечает весь пакет за фиксированное число запросов независимо от его размера.
+        Возвращает результат для каждого элемента в исходном порядке.
+        """
+        event = self.context['event']
+        parsed = []
+        for raw in validated_data['registration_ids']:
+            try:
+                parsed.append((raw, parse_code(raw, event.pk), None))
+            except InvalidCode as exc:
+                parsed.append((raw, None, self.CODE_ERRORS[exc.reason]))
+        ids = {pk for _, pk, _ in parsed if pk is not None}
 
-        # Сохраняем объект регистрации для использования во view
-        self.context['registration'] = registration
-        return registration_id
\ No newline at end of file
+        with transaction.atomic():
+            # Блокируем строки, чтобы параллельный сканер не отметил их между SELECT и UPDATE
+            to_mark = set(Registration.objects.select_for_update().filter(
+                pk__in=ids, event=event, attended=False
+            ).values_list('pk', flat=True))
+            if to_mark:
+                Registration.objects.filter(pk__in=to_mark).update(attended=True, checked_in_at=timezone.now())
+                EventDailyStats.add(event.pk, check_ins=len(to_mark))
+        others = dict(Registration.objects.filter(pk__in=ids - to_mark).values_list('pk', 'event_id'))
+
+        results, seen = [], set()
+        for raw, pk, code_error in parsed:
+            if pk is None:
+                result = code_error
+            elif pk in to_mark and pk not in seen:
+                result = self.CHECKED_IN
+            elif pk in to_mark:
+                result = self.ALREADY_CHECKED_IN  # Дубликат внутри пакета
+            elif pk not in others:
+                result = self.NOT_FOUND
+            elif others[pk] != event.pk:
+                result = self.WRONG_EVENT
+            else:
+                result = self.ALREADY_CHECKED_IN
+            seen.add(pk)
+            results.append({'registration_id': raw, 'result': result})
+        return results
+
+
+class AnalyticsPeriodSerializer(serializers.Serializer):
+    """Период аналитики организатора (?date_from=&date_to=); по умолчанию - последние DEFAULT_DAYS дней"""
+    DEFAULT_DAYS = 90
+    MAX_DAYS = 366
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        date_to = attrs.get('date_to') or timezone.localdate()
+        date_from = attrs.get('date_from') or date_to - timedelta(days=self.DEFAULT_DAYS - 1)
+        if date_from > date_to:
+            raise serializers.ValidationError({'date_from': "Начало периода позже его конца."})
+        if (date_to - date_from).days >= self.MAX_DAYS:
+            raise serializers.ValidationError({'date_from': f"Период не длиннее {self.MAX_DAYS} дней."})
+        return {'date_from': date_from, 'date_to': date_to}
@@ -0,0 +1,107 @@
+import heapq
+from datetime import timedelta
+from itertools import islice
+
+from django.db.models import Q
+
+from .models import Event, EventSeries
+
+# Окно ленты, в котором разворачиваются занятия серий: по умолчанию и максимально допустимое (?until=)
+SERIES_WINDOW_DAYS = 90
+SERIES_MAX_WINDOW_DAYS = 366
+# Сколько занятий серий попадает в ленту без пагинации
+MAX_UNPAGINATED_OCCURRENCES = 500
+# Сколько кандидатов (не больше) проверяется одним запросом на уже созданные занятия
+MATERIALIZED_CHECK_CHUNK = 128
+
+# Вторая часть ключа ленты: при одинаковом dt_start события идут раньше занятий серий
+EVENT_KEY, OCCURRENCE_KEY = 0, 1
+
+
+class Occurrence:
+    """Занятие серии, на которое еще никто не записан, поэтому строки Event у него нет"""
+    __slots__ = ('series', 'dt_start')
+
+    def __init__(self, series, dt_start):
+        self.series = series
+        self.dt_start = dt_start
+
+    @property
+    def feed_key(self):
+        return self.dt_start, OCCURRENCE_KEY, self.series.pk
+
+
+def feed_key(item):
+    """Ключ порядка ленты (dt_start, вид, id) - общий для событий и занятий, его же хранит курсор"""
+    if isinstance(item, Occurrence):
+        return item.feed_key
+    return item.dt_start, EVENT_KEY, item.pk
+
+
+# Полей правила повторения достаточно, чтобы развернуть занятия; остальное подгружает attach_series
+RULE_FIELDS = ('pk', 'dt_start', 'frequency', 'interval', 'until', 'count')
+
+
+def series_in_window(start, end):
+    """Серии, у которых могут быть занятия в [start, end] (только поля правила повторения)"""
+    return EventSeries.objects.filter(dt_start__lte=end).filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gte=start)
+    ).only(*RULE_FIELDS)
+
+
+def attach_series(items):
+    """
+    Подгружает серии целиком (с организатором и тегами) только для занятий, попавших на страницу:
+    разворачиваются все серии окна, а показывается обычно несколько.
+    """
+    occurrences = [item for item in items if isinstance(item, Occurrence)]
+    if occurrences:
+        series = EventSeries.objects.select_related('organizer').prefetch_related('tags').in_bulk(
+            {occurrence.series.pk for occurrence in occurrences}
+        )
+        for occurrence in occurrences:
+            occurrence.series = series[occurrence.series.pk]
+    return items
+
+
+def upcoming_occurrences(series, start, end, after=None, limit=None):
+    """
+    Лениво перебирает занятия серий в [start, end] в порядке ленты, пропуская уже созданные
+    (их отдает сама таблица Event). after - ключ курсора: отдаются только занятия после него,
+    limit - сколько занятий нужно вызывающему (страница + 1), столько и разворачивается за раз.
+    Каждая серия - генератор, heapq.merge держит по одному занятию на серию, поэтому страница
+    стоит O(размер страницы * log серий) независимо от длины окна.
+    """
+    if after is not None:
+        start = max(start, after[0])
+    merged = heapq.merge(*(_series_occurrences(item, start, end) for item in series), key=feed_key)
+    if after is not None:
+        merged = (occurrence for occurrence in merged if occurrence.feed_key > after)
+    chunk_size = min(limit, MATERIALIZED_CHECK_CHUNK) if limit else MATERIALIZED_CHECK_CHUNK
+    left = limit
+    while chunk := list(islice(merged, chunk_size)):
+        # Созданные занятия ищем только среди кандидатов пачки - по уникальному индексу (series, series_occurrence)
+        materialized = set(Event.objects.filter(
+            series_id__in={occurrence.series.pk for occurrence in chunk},
+            series_occurrence__range=(chunk[0].dt_start, chunk[-1].dt_start),
+        ).values_list('series_id', 'series_occurrence'))
+        for occurrence in chunk:
+            if (occurrence.series.pk, occurrence.dt_start) in materialized:
+                continue
+            yield occurrence
+            if left is not None:
+                left -= 1
+                if not left:
+                    return
+
+
+def _series_occurrences(series, start, end):
+    for moment in series.occurrences_between(start, end):
+        yield Occurrence(series, moment)
+
+
+def window_end(now, until=None):
+    """Конец окна разворачивания: конец дня until (не дальше SERIES_MAX_WINDOW_DAYS) или окно по умолчанию"""
+    if until is None:
+        return now + timedelta(days=SERIES_WINDOW_DAYS)
+    return min(until, now + timedelta(days=SERIES_MAX_WINDOW_DAYS))
@@ -0,0 +1,204 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .authentication import user_cache
+from .metrics import install_query_timer
+from .models import Event, EventDailyStats, EventSeries, Registration, Tag, User
+from .popular_tags import apply_tag_usage, event_day, invalidate_popular_tags
+from .search import get_search_engine
+from .seat_updates import notify_seats_changed
+from . import calendar_feed, response_cache
+
+EventTags = Event.tags.through
+
+
+@receiver(post_delete, sender=Registration)
+def release_registration_seat(sender, instance, **kwargs):
+    # Срабатывает и при отмене регистрации, и при удалении из админки / каскадом
+    Event.release_seat(instance.event_id)
+
+
+@receiver(post_save, sender=Registration)
+def count_daily_registration(sender, instance, created, **kwargs):
+    if created:
+        EventDailyStats.add(instance.event_id, registrations=1)
+
+
+@receiver(pre_save, sender=Registration)
+def remember_attendance(sender, instance, **kwargs):
+    # Отметку через save() (админка) учитываем так же, как Registration.check_in
+    if instance._state.adding:
+        return
+    previous = Registration.objects.filter(pk=instance.pk).values_list('attended', 'checked_in_at').first()
+    if previous is None or previous[0] == instance.attended:
+        return
+    if instance.attended:
+        instance.checked_in_at = timezone.now()
+        instance._attendance_change = (timezone.localdate(instance.checked_in_at), 1)
+    else:
+        instance.checked_in_at = None
+        instance._attendance_change = (_check_in_day(previous[1]), -1)
+
+
+@receiver(post_save, sender=Registration)
+def count_daily_attendance_change(sender, instance, **kwargs):
+    change = instance.__dict__.pop('_attendance_change', None)
+    if change:
+        day, delta = change
+        EventDailyStats.add(instance.event_id, day=day, check_ins=delta)
+
+
+def _check_in_day(checked_in_at):
+    # Снятая отметка вычитается из того дня, где была учтена (старые отметки без времени - из сегодняшнего)
+    return timezone.localdate(checked_in_at) if checked_in_at else None
+
+
+@receiver(post_delete, sender=Registration)
+def count_daily_cancellation(sender, instance, **kwargs):
+    EventDailyStats.add(instance.event_id, cancellations=1)
+    if instance.attended:
+        EventDailyStats.add(instance.event_id, day=_check_in_day(instance.checked_in_at), check_ins=-1)
+
+
+@receiver(post_save, sender=Registration)
+def publish_seats_on_register(sender, instance, created, **kwargs):
+    if created:
+        notify_seats_changed(instance.event_id)
+
+
+@receiver(post_delete, sender=Registration)
+def publish_seats_on_unregister(sender, instance, **kwargs):
+    notify_seats_changed(instance.event_id)
+
+
+def touch_calendars(**filters):
+    # Новые ETag/Last-Modified календарей .ics этих студентов (api/calendar_feed.py); update() не трогает кэш пользователей
+    User.objects.filter(**filters).update(registrations_changed_at=timezone.now())
+
+
+@receiver(post_save, sender=Registration)
+def touch_calendar_on_register(sender, instance, created, **kwargs):
+    if created:
+        touch_calendars(pk=instance.student_id)
+
+
+@receiver(post_delete, sender=Registration)
+def touch_calendar_on_unregister(sender, instance, **kwargs):
+    touch_calendars(pk=instance.student_id)
+
+
+@receiver(post_save, sender=Event)
+def touch_calendars_on_event_change(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or calendar_feed.EVENT_FIELDS & set(update_fields)):
+        touch_calendars(registrations__event_id=instance.pk)
+
+
+@receiver(post_save, sender=Event)
+def publish_seats_on_capacity_change(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or 'max_participants' in update_fields):
+        notify_seats_changed(instance.pk)
+
+
+def _tag_links(links):
+    """Пары (tag_id, день начала мероприятия) для строк таблицы event_tags"""
+    return [(tag_id, event_day(dt_start)) for tag_id, dt_start in links.values_list('tag_id', 'event__dt_start')]
+
+
+@receiver(m2m_changed, sender=EventTags)
+def track_tag_usage(sender, instance, action, reverse, pk_set, **kwargs):
+    # Работает в обе стороны: event.tags.add(...) и tag.event_set.add(...)
+    owner = {'tag_id': instance.pk} if reverse else {'event_id': instance.pk}
+    other = 'event_id__in' if reverse else 'tag_id__in'
+    if action == 'post_add' and pk_set:
+        apply_tag_usage(_tag_links(sender.objects.filter(**owner, **{other: pk_set})), +1)
+    elif action in ('pre_remove', 'pre_clear'):
+        # Запоминаем реально существующие связи до удаления: pk_set может содержать лишние id
+        links = sender.objects.filter(**owner)
+        if action == 'pre_remove':
+            links = links.filter(**{other: pk_set})
+        instance._removed_tag_links = _tag_links(links)
+    elif action in ('post_remove', 'post_clear'):
+        apply_tag_usage(instance.__dict__.pop('_removed_tag_links', []), -1)
+
+
+@receiver(pre_save, sender=Event)
+def remember_event_day(sender, instance, **kwargs):
+    if instance.pk:
+        old_start = Event.objects.filter(pk=instance.pk).values_list('dt_start', flat=True).first()
+        instance._previous_day = event_day(old_start) if old_start else None
+
+
+@receiver(post_save, sender=Event)
+def move_tag_usage_day(sender, instance, created, **kwargs):
+    # Перенос мероприятия на другой день переносит его теги в другую дневную корзину
+    previous_day = instance.__dict__.pop('_previous_day', None)
+    new_day = event_day(instance.dt_start)
+    if created or previous_day is None or previous_day == new_day:
+        return
+    tag_ids = list(EventTags.objects.filter(event_id=instance.pk).values_list('tag_id', flat=True))
+    apply_tag_usage([(tag_id, previous_day) for tag_id in tag_ids], -1)
+    apply_tag_usage([(tag_id, new_day) for tag_id in tag_ids], +1)
+
+
+@receiver(post_save, sender=Event)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'description', 'location_text'} & set(update_fields):
+        get_search_engine().update_vectors([instance.pk])
+
+
+@receiver(pre_delete, sender=Event)
+def remember_deleted_event_tags(sender, instance, **kwargs):
+    # Каскадное удаление строк event_tags не вызывает m2m_changed
+    instance._removed_tag_links = _tag_links(EventTags.objects.filter(event_id=instance.pk))
+
+
+@receiver(post_delete, sender=Event)
+def release_deleted_event_tags(sender, instance, **kwargs):
+    apply_tag_usage(instance.__dict__.pop('_removed_tag_links', []), -1)
+
+
+@receiver(post_delete, sender=Event)
+def drop_deleted_event_stats(sender, instance, **kwargs):
+    # Каскадное удаление регистраций записывает отмены в статистику уже удаляемого мероприятия
+    # (внешние ключи проверяются при коммите) - убираем эти строки вместе с ним
+    EventDailyStats.objects.filter(event_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    invalidate_popular_tags()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Смена ролей, is_active или пароля должна сразу действовать в этом процессе
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+@receiver(m2m_changed, sender=EventTags)
+@receiver(post_save, sender=EventSeries)
+@receiver(post_delete, sender=EventSeries)
+@receiver(m2m_changed, sender=EventSeries.tags.through)
+def invalidate_feed_cache(sender, **kwargs):
+    # Регистрации меняют spots_left и is_registered в ленте, серии - набор занятий в ней
+    response_cache.invalidate(response_cache.FEED)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_list_cache(sender, **kwargs):
+    response_cache.invalidate(response_cache.FEED, response_cache.TAGS)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # Каждое новое соединение (в том числе выданное пулом) считает запросы и пишет медленные в лог
+    install_query_timer(connection)
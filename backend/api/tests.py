@@ -1,3 +1,1465 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core import signing
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from asgiref.sync import async_to_sync, sync_to_async
+from PIL import Image
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import calendar_feed, checkin_codes, db_metrics, metrics, qr, seat_updates
+from .async_views import AsyncCheckInView, AsyncEventRegisterView, AsyncEventUnregisterView
+from .management.commands.audit_query_plans import find_seq_scans
+from .admin import PopularTagListFilter, RecentOrganizerListFilter
+from .analytics import rebuild_daily_stats
+from .models import User, Event, EventDailyStats, EventSeries, Registration, Tag, WaitlistEntry
+from .serializers import EventSerializer
+from .search import SimpleSearchEngine
+
+
+def make_user(username, is_organizer=False):
+    return User.objects.create_user(username=username, is_organizer=is_organizer)
+
+
+def make_events(organizer, count, **kwargs):
+    start = timezone.now() + timedelta(days=1)
+    return [
+        Event.objects.create(
+            title=f'Событие {i}', dt_start=start + timedelta(hours=i),
+            location_text='Аудитория 101', organizer=organizer, **kwargs
+        )
+        for i in range(count)
+    ]
+
+
+class EventListQueryCountTests(TestCase):
+    """Список событий должен выполнять одинаковое число запросов при любом размере ленты"""
+
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.student = make_user('student')
+        self.other_student = make_user('other')
+        self.tag = Tag.objects.create(name='python')
+        self.client = APIClient()
+
+    def _add_events(self, count):
+        for event in make_events(self.organizer, count, max_participants=10):
+            event.tags.add(self.tag)
+            Registration.objects.create(student=self.other_student, event=event)
+        Registration.objects.create(student=self.student, event=event)
+
+    def _count_list_queries(self, user):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('event-list'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_constant_queries_for_student(self):
+        self._add_events(2)
+        small, _ = self._count_list_queries(self.student)
+        self._add_events(15)
+        large, data = self._count_list_queries(self.student)
+        self.assertEqual(small, large)
+        self.assertEqual(len(data), 17)
+
+    def test_constant_queries_for_organizer(self):
+        self._add_events(2)
+        small, _ = self._count_list_queries(self.organizer)
+        self._add_events(15)
+        large, _ = self._count_list_queries(self.organizer)
+        self.assertEqual(small, large)
+
+    def test_annotated_values_match_registrations(self):
+        self._add_events(3)
+        _, data = self._count_list_queries(self.student)
+        self.assertEqual([item['is_registered'] for item in data], [False, False, True])
+        self.assertEqual([item['spots_left'] for item in data], [9, 9, 8])
+
+
+class EventFeedPaginationTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.student = make_user('student')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_unpaginated_by_default(self):
+        make_events(self.organizer, 3)
+        response = self.client.get(reverse('event-list'))
+        self.assertIsInstance(response.data, list)
+
+    def test_cursor_walks_feed_in_dt_start_id_order(self):
+        events = make_events(self.organizer, 5)
+        # Два события с одинаковым временем начала - порядок определяет id
+        tie = Event.objects.create(title='Дубль', dt_start=events[2].dt_start,
+                                   location_text='Холл', organizer=self.organizer)
+        expected = [events[0].id, events[1].id, events[2].id, tie.id, events[3].id, events[4].id]
+
+        seen, url = [], reverse('event-list') + '?page_size=4'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('event-list') + '?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_sparse_fieldset(self):
+        make_events(self.organizer, 1)
+        response = self.client.get(reverse('event-list') + '?fields=id,title,dt_start,tags')
+        self.assertEqual(set(response.data[0]), {'id', 'title', 'dt_start', 'tags'})
+
+
+class EventSeriesTests(TestCase):
+    """Серии: занятия разворачиваются в ленте на лету, Event создается при первой записи"""
+
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.student = make_user('student')
+        self.tag = Tag.objects.create(name='chess')
+        self.start = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+        self.series = self.make_series('Шахматный клуб')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def make_series(self, title, **kwargs):
+        series = EventSeries.objects.create(
+            title=title, location_text='Клуб', organizer=self.organizer, dt_start=self.start, **kwargs
+        )
+        series.tags.add(self.tag)
+        return series
+
+    def feed(self, url=None):
+        seen, url = [], url or reverse('event-list') + '?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend((item['id'], item['series'], item['dt_start']) for item in response.data['results'])
+            url = response.data['next']
+        return seen
+
+    def register(self, occurrence_start, series=None):
+        url = reverse('series-register', args=[(series or self.series).pk])
+        return self.client.post(url, {'occurrence_start': occurrence_start.isoformat()}, format='json')
+
+    def test_recurrence_rule(self):
+        limited = self.make_series('Курс', frequency=EventSeries.DAILY, interval=2, count=3)
+        occurrences = list(limited.occurrences_between(self.start - timedelta(days=1), self.start + timedelta(days=30)))
+        self.assertEqual(occurrences, [self.start + timedelta(days=days) for days in (0, 2, 4)])
+        self.assertEqual(limited.ends_at, self.start + timedelta(days=4))
+        self.assertTrue(self.series.is_occurrence(self.start + timedelta(weeks=5)))
+        self.assertFalse(self.series.is_occurrence(self.start + timedelta(days=5)))
+        self.assertFalse(limited.is_occurrence(self.start + timedelta(days=6)))
+
+    def test_feed_expands_window_and_paginates_with_events(self):
+        event = make_events(self.organizer, 1)[0]
+        Event.objects.filter(pk=event.pk).update(dt_start=self.start)
+        self.make_series('Кружок', until=self.start + timedelta(weeks=2))
+
+        full = self.client.get(reverse('event-list')).data
+        # 13 недель окна по умолчанию + 3 занятия кружка + разовое событие
+        self.assertEqual(len(full), 13 + 3 + 1)
+        self.assertEqual([item['dt_start'] for item in full], sorted(item['dt_start'] for item in full))
+        first = full[0]
+        self.assertEqual((first['id'], first['series']), (event.pk, None))
+        occurrence = full[1]
+        self.assertIsNone(occurrence['id'])
+        self.assertEqual(occurrence['occurrence_start'], occurrence['dt_start'])
+        self.assertEqual(occurrence['tags'][0]['name'], 'chess')
+        self.assertEqual(occurrence['spots_left'], None)
+
+        pages = self.feed()
+        self.assertEqual(pages, [(item['id'], item['series'], item['dt_start']) for item in full])
+        until = (self.start + timedelta(weeks=1)).date().isoformat()
+        self.assertEqual(len(self.client.get(reverse('event-list') + f'?until={until}').data), 1 + 2 + 2)
+
+    def test_registration_materializes_occurrence_once(self):
+        occurrence = self.start + timedelta(weeks=1)
+        before = self.feed()
+        response = self.register(occurrence)
+        self.assertEqual(response.status_code, 201)
+        event = Event.objects.get(series=self.series)
+        self.assertEqual(response.data['event_id'], event.pk)
+        self.assertEqual((event.dt_start, event.series_occurrence, event.registered_count), (occurrence, occurrence, 1))
+        self.assertEqual(list(event.tags.all()), [self.tag])
+
+        self.client.force_authenticate(make_user('second'))
+        self.assertEqual(self.register(occurrence).status_code, 201)
+        self.assertEqual(Event.objects.filter(series=self.series).count(), 1)
+        self.assertIn('already registered', str(self.register(occurrence).data))
+
+        # Созданное занятие в ленте - обычное событие на месте развернутого
+        after = self.feed()
+        self.assertEqual(len(after), len(before))
+        self.assertIn((event.pk, self.series.pk, after[1][2]), after)
+        self.assertEqual(sum(1 for item_id, _, _ in after if item_id is None), len(before) - 1)
+
+    def test_register_rejects_unknown_or_past_occurrence(self):
+        self.assertEqual(self.register(self.start + timedelta(hours=1)).status_code, 400)
+        self.assertEqual(self.register(self.start - timedelta(weeks=1)).status_code, 400)
+        self.client.force_authenticate(self.organizer)
+        self.assertEqual(self.register(self.start).status_code, 403)
+
+    def test_feed_queries_do_not_grow_with_series(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get(reverse('event-list') + '?page_size=20')
+            return len(ctx.captured_queries)
+        cache.clear()
+        few = count_queries()
+        for i in range(5):
+            self.make_series(f'Серия {i}')
+        cache.clear()
+        self.assertEqual(count_queries(), few)
+
+    def test_organizer_manages_own_series(self):
+        self.client.force_authenticate(self.organizer)
+        response = self.client.post(reverse('series-list'), {
+            'title': 'Йога', 'location_text': 'Зал', 'dt_start': self.start.isoformat(),
+            'frequency': 'weekly', 'count': 4, 'tag_names': ['sport'],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([tag['name'] for tag in response.data['tags']], ['sport'])
+        self.client.force_authenticate(make_user('other', is_organizer=True))
+        self.assertEqual(self.client.delete(reverse('series-detail', args=[response.data['id']])).status_code, 403)
+
+
+class RegistrationCapacityTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.student = make_user('student')
+        self.event = make_events(self.organizer, 1, max_participants=1)[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def register(self, user, event=None):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('event-register', args=[(event or self.event).pk]))
+
+    def test_register_and_unregister_keep_counter(self):
+        self.assertEqual(self.register(self.student).status_code, 201)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 1)
+
+        response = self.client.delete(reverse('event-unregister', args=[self.event.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 0)
+
+    def test_duplicate_registration_rejected(self):
+        unlimited = make_events(self.organizer, 1)[0]
+        self.register(self.student, unlimited)
+        response = self.register(self.student, unlimited)
+        self.assertEqual(response.status_code, 400)
+        unlimited.refresh_from_db()
+        self.assertEqual(unlimited.registered_count, 1)
+
+    def test_full_event_rejected(self):
+        self.register(self.student)
+        response = self.register(make_user('late'))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Event is full.', str(response.data))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'SQLite блокирует таблицу: параллельные записи падают, а не ждут')
+class ConcurrentRegistrationTests(TransactionTestCase):
+    """Параллельные регистрации и отмены не должны переполнять событие"""
+    students_count = 20
+    capacity = 5
+
+    def test_concurrent_registrations_never_overbook(self):
+        organizer = make_user('organizer', is_organizer=True)
+        event = make_events(organizer, 1, max_participants=self.capacity)[0]
+        students = [make_user(f'student{i}') for i in range(self.students_count)]
+        url = reverse('event-register', args=[event.pk])
+        barrier = threading.Barrier(self.students_count)
+        statuses = []
+
+        def register(student):
+            client = APIClient()
+            client.force_authenticate(student)
+            try:
+                barrier.wait()
+                statuses.append(client.post(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=register, args=(student,)) for student in students]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        event.refresh_from_db()
+        self.assertEqual(statuses.count(201), self.capacity)
+        self.assertEqual(statuses.count(400), self.students_count - self.capacity)
+        self.assertEqual(event.registered_count, self.capacity)
+        self.assertEqual(event.registrations.count(), self.capacity)
+
+    def test_concurrent_unregisters_promote_distinct_students(self):
+        organizer = make_user('organizer', is_organizer=True)
+        event = make_events(organizer, 1, max_participants=self.capacity)[0]
+        holders = [make_user(f'holder{i}') for i in range(self.capacity)]
+        waiting = [make_user(f'waiting{i}') for i in range(self.capacity)]
+        for student in holders:
+            Registration.objects.create(student=student, event=event)
+        for student in waiting:
+            WaitlistEntry.objects.create(student=student, event=event)
+        url = reverse('event-unregister', args=[event.pk])
+        barrier = threading.Barrier(self.capacity)
+
+        def unregister(student):
+            client = APIClient()
+            client.force_authenticate(student)
+            try:
+                barrier.wait()
+                client.delete(url)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=unregister, args=(student,)) for student in holders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        event.refresh_from_db()
+        self.assertEqual(event.registered_count, self.capacity)
+        self.assertEqual(set(event.registrations.values_list('student', flat=True)), {s.pk for s in waiting})
+        self.assertFalse(event.waitlist.exists())
+
+
+class WaitlistTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.event = make_events(self.organizer, 1, max_participants=1)[0]
+        self.holder, self.first, self.second = make_user('holder'), make_user('first'), make_user('second')
+        Registration.objects.create(student=self.holder, event=self.event)
+        self.client = APIClient()
+        self.url = reverse('event-waitlist', args=[self.event.pk])
+
+    def join(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(self.url)
+
+    def test_join_requires_full_event(self):
+        free = make_events(self.organizer, 1, max_participants=5)[0]
+        self.client.force_authenticate(self.first)
+        response = self.client.post(reverse('event-waitlist', args=[free.pk]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_join_reports_position_and_rejects_duplicates(self):
+        self.assertEqual(self.join(self.first).data['position'], 1)
+        self.assertEqual(self.join(self.second).data['position'], 2)
+        self.assertEqual(self.join(self.second).status_code, 400)
+
+    def test_leave(self):
+        self.join(self.first)
+        self.assertEqual(self.client.delete(self.url).status_code, 204)
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.assertEqual(self.client.delete(self.url).status_code, 404)
+
+    def test_unregister_promotes_first_in_queue(self):
+        self.join(self.first)
+        self.join(self.second)
+        self.client.force_authenticate(self.holder)
+        response = self.client.delete(reverse('event-unregister', args=[self.event.pk]))
+        self.assertEqual(response.status_code, 204)
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 1)
+        self.assertTrue(Registration.objects.filter(event=self.event, student=self.first).exists())
+        self.assertEqual(list(self.event.waitlist.values_list('student', flat=True)), [self.second.pk])
+
+
+class AsyncViewTests(TestCase):
+    """Асинхронные регистрация/отмена/check-in отвечают так же, как синхронные"""
+
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.student = make_user('student')
+        self.event = make_events(self.organizer, 1, max_participants=1)[0]
+        self.factory = APIRequestFactory()
+
+    def call(self, view_class, method, user, data=None, **kwargs):
+        request = getattr(self.factory, method)('/', data, format='json')
+        force_authenticate(request, user)
+        return async_to_sync(view_class.as_view())(request, **kwargs)
+
+    def test_register_applies_serializer_rules(self):
+        response = self.call(AsyncEventRegisterView, 'post', self.student, event_pk=self.event.pk)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['event_title'], self.event.title)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.registered_count, 1)
+
+        response = self.call(AsyncEventRegisterView, 'post', make_user('late'), event_pk=self.event.pk)
+        self.assertIn('Event is full.', str(response.data))
+        past = make_events(self.organizer, 1)[0]
+        Event.objects.filter(pk=past.pk).update(dt_start=timezone.now() - timedelta(days=1))
+        response = self.call(AsyncEventRegisterView, 'post', self.student, event_pk=past.pk)
+        self.assertIn('Cannot register for past events.', str(response.data))
+        response = self.call(AsyncEventRegisterView, 'post', self.student, event_pk=0)
+        self.assertIn('Event not found.', str(response.data))
+        self.assertEqual(self.call(AsyncEventRegisterView, 'post', self.organizer, event_pk=self.event.pk).status_code, 403)
+
+    def test_duplicate_registration_rejected(self):
+        unlimited = make_events(self.organizer, 1)[0]
+        self.call(AsyncEventRegisterView, 'post', self.student, event_pk=unlimited.pk)
+        response = self.call(AsyncEventRegisterView, 'post', self.student, event_pk=unlimited.pk)
+        self.assertIn('You are already registered for this event.', str(response.data))
+
+    def test_unregister_promotes_waitlist(self):
+        Registration.objects.create(student=self.student, event=self.event)
+        waiting = make_user('waiting')
+        WaitlistEntry.objects.create(student=waiting, event=self.event)
+        response = self.call(AsyncEventUnregisterView, 'delete', self.student, event_pk=self.event.pk)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(list(self.event.registrations.values_list('student', flat=True)), [waiting.pk])
+        response = self.call(AsyncEventUnregisterView, 'delete', self.student, event_pk=self.event.pk)
+        self.assertEqual(response.status_code, 404)
+
+    def test_check_in(self):
+        registration = Registration.objects.create(student=self.student, event=self.event)
+        data = {'registration_id': str(registration.pk)}
+        response = self.call(AsyncCheckInView, 'post', self.organizer, data, pk=self.event.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['registration']['student']['username'], 'student')
+        response = self.call(AsyncCheckInView, 'post', self.organizer, data, pk=self.event.pk)
+        self.assertIn('уже отмечен', str(response.data['error']))
+        another = make_user('another', is_organizer=True)
+        self.assertEqual(self.call(AsyncCheckInView, 'post', another, data, pk=self.event.pk).status_code, 403)
+
+
+class SeatStreamTests(TransactionTestCase):
+    """Поток свободных мест: снимок при подключении и изменения после регистраций"""
+
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.student = make_user('student')
+        self.event = make_events(self.organizer, 1, max_participants=5)[0]
+        self.url = reverse('event-seats-stream')
+
+    @staticmethod
+    def frame_data(frame):
+        return json.loads(frame.split('data: ', 1)[1])
+
+    def test_live_stream_pushes_registrations(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.student)}', 'Accept': 'text/event-stream'}
+        other = make_user('other')
+
+        async def watch():
+            response = await AsyncClient().get(self.url, {'events': self.event.pk}, headers=headers)
+            frames = aiter(response.streaming_content)
+            try:
+                self.assertTrue((await anext(frames)).startswith(b'retry: '))
+                snapshot = (await anext(frames)).decode()
+                await sync_to_async(Registration.objects.create)(student=other, event=self.event)
+                update = (await asyncio.wait_for(anext(frames), 5)).decode()
+            finally:
+                await frames.aclose()
+            return response, snapshot, update
+
+        response, snapshot, update = async_to_sync(watch)()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(self.frame_data(snapshot)['spots_left'], 5)
+        self.assertEqual(self.frame_data(update), {
+            'event_id': self.event.pk, 'max_participants': 5, 'registered_count': 1, 'spots_left': 4,
+        })
+        # Отключившийся клиент снят с подписки - публикация больше не читает базу
+        self.assertFalse(seat_updates.get_broker().has_subscribers(self.event.pk))
+
+    def test_wsgi_returns_snapshot_only(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.get(self.url, {'events': f'{self.event.pk},0'}, HTTP_ACCEPT='text/event-stream')
+        frames = [frame for frame in response.content.decode().split('\n\n') if frame]
+        self.assertEqual(frames[0], f'retry: {seat_updates.RECONNECT_DELAY_MS}')
+        self.assertEqual([self.frame_data(frame)['event_id'] for frame in frames[1:-1]], [self.event.pk])
+        # Живого потока под WSGI нет - клиенту сказано не переподключаться
+        self.assertTrue(frames[-1].startswith('event: end'))
+
+        response = client.get(self.url, {'events': 'x'}, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.content.startswith(b'event: error'))
+        self.assertEqual(APIClient().get(self.url, {'events': self.event.pk}).status_code, 401)
+
+    def test_broker_fans_out_one_publish(self):
+        broker = seat_updates.InProcessBroker()
+
+        async def fan_out():
+            watchers = [broker.subscribe([self.event.pk]) for _ in range(3)]
+            other = broker.subscribe([self.event.pk + 1])
+            # Публикация приходит из потока view (sync), а не из event loop
+            thread = threading.Thread(target=broker.publish, args=[seat_updates.availability(self.event.pk, 5, 2)])
+            thread.start()
+            frames = [await asyncio.wait_for(watcher.queue.get(), 5) for watcher in watchers]
+            thread.join()
+            for subscription in watchers + [other]:
+                broker.unsubscribe(subscription)
+            return frames, other.queue.qsize()
+
+        frames, unrelated = async_to_sync(fan_out)()
+        self.assertEqual(len(set(frames)), 1)
+        self.assertEqual(self.frame_data(frames[0])['spots_left'], 3)
+        self.assertEqual(unrelated, 0)
+        self.assertFalse(broker.has_subscribers(self.event.pk))
+
+
+class CheckInTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.event, self.other_event = make_events(self.organizer, 2)
+        self.students = [make_user(f'student{i}') for i in range(3)]
+        self.registrations = [Registration.objects.create(student=s, event=self.event) for s in self.students]
+        self.foreign = Registration.objects.create(student=self.students[0], event=self.other_event)
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+
+    def check_in(self, registration_id):
+        url = reverse('event-check-in', args=[self.event.pk])
+        return self.client.post(url, {'registration_id': str(registration_id)}, format='json')
+
+    def test_check_in_marks_once(self):
+        registration = self.registrations[0]
+        response = self.check_in(registration.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['registration']['student']['username'], 'student0')
+        registration.refresh_from_db()
+        self.assertTrue(registration.attended)
+        self.assertEqual(self.check_in(registration.pk).status_code, 400)
+
+    def test_check_in_rejects_foreign_and_unknown(self):
+        self.assertIn('другого мероприятия', str(self.check_in(self.foreign.pk).data))
+        self.assertIn('не найдена', str(self.check_in(uuid.uuid4()).data))
+
+    def test_only_event_organizer_can_check_in(self):
+        self.client.force_authenticate(make_user('another', is_organizer=True))
+        self.assertEqual(self.check_in(self.registrations[0].pk).status_code, 403)
+
+    def test_batch_check_in_reports_per_item(self):
+        self.check_in(self.registrations[2].pk)
+        ids = [
+            str(self.registrations[0].pk), str(self.registrations[1].pk), str(self.registrations[0].pk),
+            str(self.registrations[2].pk), str(self.foreign.pk), str(uuid.uuid4()), 'not-a-uuid',
+        ]
+        url = reverse('event-check-in-batch', args=[self.event.pk])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {'registration_ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['checked_in'], 2)
+        self.assertEqual([item['result'] for item in response.data['results']], [
+            'checked_in', 'checked_in', 'already_checked_in', 'already_checked_in',
+            'wrong_event', 'not_found', 'invalid',
+        ])
+        self.assertEqual(Registration.objects.filter(event=self.event, attended=True).count(), 3)
+        self.assertLess(len(ctx.captured_queries), 10)
+
+    def test_participants(self):
+        response = self.client.get(reverse('event-participants', args=[self.event.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+
+
+class AttendanceAnalyticsTests(TestCase):
+    """Дневная статистика посещаемости и аналитика организатора"""
+
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.tag = Tag.objects.create(name='python')
+        self.event, self.upcoming = make_events(self.organizer, 2)
+        self.event.tags.add(self.tag)
+        self.students = [make_user(f'student{i}') for i in range(4)]
+        self.registrations = [Registration.objects.create(student=s, event=self.event) for s in self.students]
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+
+    def stats(self, day=None):
+        return EventDailyStats.objects.filter(event=self.event, day=day or timezone.localdate()).values(
+            'day', 'registrations', 'cancellations', 'check_ins'
+        ).get()
+
+    def check_in(self, *registrations):
+        url = reverse('event-check-in-batch', args=[self.event.pk])
+        ids = [str(registration.pk) for registration in registrations]
+        return self.client.post(url, {'registration_ids': ids}, format='json')
+
+    def test_counters_follow_registrations_and_check_ins(self):
+        self.assertEqual(self.stats()['registrations'], 4)
+        url = reverse('event-check-in', args=[self.event.pk])
+        self.client.post(url, {'registration_id': str(self.registrations[0].pk)}, format='json')
+        self.client.post(url, {'registration_id': str(self.registrations[0].pk)}, format='json')
+        self.check_in(*self.registrations[:3])
+        self.assertEqual(self.stats()['check_ins'], 3)
+
+        for registration in self.registrations[0], self.registrations[3]:
+            registration.refresh_from_db()
+            registration.cancel()
+        self.assertEqual(self.stats(), {
+            'day': timezone.localdate(), 'registrations': 4, 'cancellations': 2, 'check_ins': 2,
+        })
+        registration = self.registrations[1]
+        registration.refresh_from_db()
+        registration.attended = False
+        registration.save()
+        self.assertEqual(self.stats()['check_ins'], 1)
+        self.assertIsNone(registration.checked_in_at)
+
+    def test_rebuild_matches_incremental_counters(self):
+        self.check_in(*self.registrations[:2])
+        self.registrations[3].cancel()
+        before = self.stats()
+        EventDailyStats.objects.update(registrations=0, check_ins=0)
+        rebuild_daily_stats()
+        # Регистрации считаются по оставшимся строкам, отмены сохраняются
+        self.assertEqual(self.stats(), dict(before, registrations=3))
+
+        # Старая отметка без времени относится ко дню начала мероприятия
+        Registration.objects.filter(pk=self.registrations[2].pk).update(attended=True)
+        rebuild_daily_stats()
+        self.assertEqual(self.stats(timezone.localdate(self.event.dt_start))['check_ins'], 1)
+        self.assertEqual(self.stats(), dict(before, registrations=3))
+
+    def test_deleting_event_drops_its_stats(self):
+        Registration.objects.create(student=self.students[0], event=self.upcoming)
+        self.event.delete()
+        self.assertFalse(EventDailyStats.objects.filter(event_id=self.event.pk).exists())
+        # Каскад от организатора: мероприятия и регистрации удаляются вместе с ним
+        self.organizer.delete()
+        self.assertFalse(EventDailyStats.objects.exists())
+
+    def test_analytics_endpoint(self):
+        Event.objects.filter(pk=self.event.pk).update(dt_start=timezone.now() - timedelta(hours=1))
+        self.check_in(*self.registrations[:3])
+        other = make_user('other', is_organizer=True)
+        Registration.objects.create(student=self.students[0], event=make_events(other, 1)[0])
+
+        url = reverse('organizer-analytics')
+        today = timezone.localdate()
+        self.assertEqual(len(self.client.get(url).data['timeline']), 90)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'date_from': today - timedelta(days=6), 'date_to': today + timedelta(days=7)})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        self.assertTrue(all('api_registration' not in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(response.data['timeline'][0]['registrations'], 0)
+        self.assertEqual(len(response.data['timeline']), 14)
+        self.assertEqual(response.data['timeline'][6], {
+            'day': today, 'registrations': 4, 'cancellations': 0, 'check_ins': 3,
+        })
+        past, upcoming = response.data['events']
+        self.assertEqual((past['registered'], past['checked_in'], past['attendance_rate']), (4, 3, 0.75))
+        self.assertIsNone(upcoming['attendance_rate'])
+        self.assertEqual(response.data['tags'], [
+            {'id': self.tag.pk, 'name': 'python', 'registered': 4, 'no_shows': 1, 'no_show_rate': 0.25},
+        ])
+
+        response = self.client.get(url, {'date_from': today + timedelta(days=1), 'date_to': today})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(url, {'date_from': today - timedelta(days=400), 'date_to': today})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Аудит планов читает EXPLAIN (FORMAT JSON) PostgreSQL')
+class QueryPlanAuditTests(TestCase):
+    """Горячие запросы API обслуживаются индексами"""
+
+    def setUp(self):
+        organizer = make_user('org', is_organizer=True)
+        student = make_user('student')
+        events = make_events(organizer, 5, max_participants=10)
+        events[0].tags.add(Tag.objects.create(name='python'))
+        Registration.objects.create(student=student, event=events[0])
+
+    def test_hot_querysets_use_indexes(self):
+        output = io.StringIO()
+        call_command('audit_query_plans', stdout=output)
+        self.assertIn('Все запросы используют индексы', output.getvalue())
+
+    def test_unindexed_filter_is_reported(self):
+        self.assertEqual(find_seq_scans(Event.objects.filter(location_text='Аудитория 1').order_by()), ['api_event'])
+
+
+class SeedAndBenchmarkCommandTests(TestCase):
+    """Генератор синтетических данных и бенчмарк горячих путей"""
+    SEED_OPTIONS = dict(organizers=2, students=30, events=40, tags=8, registrations=300, seed=7)
+
+    def seed(self):
+        call_command('seed_data', stdout=io.StringIO(), **self.SEED_OPTIONS)
+        return self.registrations()
+
+    @staticmethod
+    def registrations():
+        return sorted(Registration.objects.values_list('student__username', 'event__title', 'attended'))
+
+    def test_seed_is_deterministic_and_consistent(self):
+        first = self.seed()
+        self.assertGreater(len(first), 250)
+        self.assertEqual(Event.objects.count(), 40)
+        for event in Event.objects.annotate(actual=Count('registrations')):
+            self.assertEqual(event.registered_count, event.actual)
+            if event.max_participants:
+                self.assertLessEqual(event.actual, event.max_participants)
+        for tag in Tag.objects.annotate(actual=Count('event')):
+            self.assertEqual(tag.usage_count, tag.actual)
+
+        User.objects.all().delete()
+        Tag.objects.all().delete()
+        self.assertEqual(self.seed(), first)
+
+    def test_seed_refuses_to_run_twice(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+
+    def test_benchmark_writes_comparable_results(self):
+        before = self.seed()
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/bench.json'
+            call_command('benchmark_api', iterations=2, warmup=0, output=path, stdout=io.StringIO())
+            with open(path, encoding='utf-8') as results:
+                report = json.load(results)
+            stderr = io.StringIO()
+            call_command('benchmark_api', iterations=2, warmup=0, scenarios=['register'], baseline=path,
+                         stdout=io.StringIO(), stderr=stderr)
+
+        self.assertEqual(report['dataset']['events'], 40)
+        for name in ('feed', 'feed_tag', 'popular_tags', 'my_registrations', 'register', 'unregister', 'check_in'):
+            self.assertIn('p95', report['scenarios'][name]['latency_ms'])
+            self.assertIn('median', report['scenarios'][name]['queries'])
+        self.assertGreater(report['scenarios']['import']['items_per_second'], 0)
+        self.assertIn('register', stderr.getvalue())
+        # Бенчмарк возвращает данные в исходное состояние
+        self.assertEqual(self.registrations(), before)
+        self.assertEqual(Event.objects.count(), 40)
+        for tag in Tag.objects.annotate(actual=Count('event')):
+            self.assertEqual(tag.usage_count, tag.actual)
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Число запросов страницы списка в админке не зависит от числа строк"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password=None)
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.tags = [Tag.objects.create(name=f'tag{i}') for i in range(3)]
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        for event in make_events(self.organizer, count):
+            event.tags.set(self.tags)
+            student = make_user(f'student{uuid.uuid4().hex[:8]}')
+            Registration.objects.create(student=student, event=event)
+            WaitlistEntry.objects.create(student=student, event=make_events(self.organizer, 1)[0])
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelists_use_bounded_queries(self):
+        urls = [reverse(f'admin:api_{model}_changelist') for model in ('tag', 'event', 'registration', 'waitlistentry')]
+        self.add_rows(2)
+        before = [self.count_queries(url) for url in urls]
+        self.add_rows(8)
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+
+    def test_sidebar_filters_are_bounded(self):
+        self.add_rows(2)
+        for i in range(PopularTagListFilter.max_choices + 5):
+            Tag.objects.create(name=f'extra{i}')
+        make_user('idle', is_organizer=True)
+        response = self.client.get(reverse('admin:api_event_changelist'))
+        choices = {spec.title: len(spec.lookup_choices) for spec in response.context['cl'].filter_specs
+                   if hasattr(spec, 'lookup_choices')}
+        self.assertEqual(choices[PopularTagListFilter.title], PopularTagListFilter.max_choices)
+        self.assertEqual(choices[RecentOrganizerListFilter.title], 1)
+
+        tag = self.tags[0]
+        params = {'tag': tag.pk, 'organizer': self.organizer.pk}
+        response = self.client.get(reverse('admin:api_event_changelist'), params)
+        self.assertEqual(response.context['cl'].result_count, Event.objects.filter(tags=tag).count())
+
+    def test_recent_event_filter(self):
+        self.add_rows(2)
+        event = Event.objects.order_by('pk').first()
+        url = reverse('admin:api_registration_changelist')
+        response = self.client.get(url, {'event': event.pk})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class SignedCheckInCodeTests(TestCase):
+    """Подписанные QR-токены: проверка без базы и офлайн-фильтр"""
+
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.event, self.other_event = make_events(self.organizer, 2)
+        self.student = make_user('student')
+        self.registration = Registration.objects.create(student=self.student, event=self.event)
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+        self.url = reverse('event-check-in', args=[self.event.pk])
+
+    def token(self, event=None, expires_at=None):
+        event = event or self.event
+        return checkin_codes.make_token(self.registration.pk, event.pk, expires_at or event.dt_start + timedelta(hours=1))
+
+    def registration_queries(self, code):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, {'registration_id': code}, format='json')
+        return response, [q['sql'] for q in ctx.captured_queries if 'api_registration' in q['sql']]
+
+    def test_my_registrations_expose_token(self):
+        self.client.force_authenticate(self.student)
+        code = self.client.get(reverse('my-registrations')).data[0]['qr_code_data']
+        self.assertLess(len(code), 50)
+        self.assertEqual(checkin_codes.parse_code(code, self.event.pk), self.registration.pk)
+
+    def test_check_in_with_token(self):
+        response, _ = self.registration_queries(self.token())
+        self.assertEqual(response.status_code, 200)
+        self.registration.refresh_from_db()
+        self.assertTrue(self.registration.attended)
+
+    def test_foreign_forged_and_expired_rejected_without_registration_queries(self):
+        token = self.token()
+        forged = token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB')
+        cases = [
+            (forged, 'недействителен'),
+            (self.token(event=self.other_event), 'другого мероприятия'),
+            (self.token(expires_at=timezone.now() - timedelta(minutes=1)), 'истек'),
+        ]
+        for code, message in cases:
+            response, queries = self.registration_queries(code)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(message, str(response.data['error']))
+            self.assertEqual(queries, [])
+
+    @override_settings(CHECKIN_ACCEPT_PLAIN_IDS=False)
+    def test_plain_ids_can_be_disabled(self):
+        response, queries = self.registration_queries(str(self.registration.pk))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(queries, [])
+
+    def test_batch_reports_token_errors(self):
+        url = reverse('event-check-in-batch', args=[self.event.pk])
+        codes = [self.token(), self.token(event=self.other_event), 'garbage']
+        response = self.client.post(url, {'registration_ids': codes}, format='json')
+        self.assertEqual([item['result'] for item in response.data['results']], ['checked_in', 'wrong_event', 'invalid'])
+
+    def test_offline_bloom_filter(self):
+        others = [Registration.objects.create(student=make_user(f's{i}'), event=self.event).pk for i in range(20)]
+        response = self.client.get(reverse('event-offline-codes', args=[self.event.pk]))
+        self.assertEqual(response.data['count'], 21)
+        bits, size, hash_count = base64.b64decode(response.data['bits']), response.data['m'], response.data['k']
+        for registration_id in others + [self.registration.pk]:
+            self.assertTrue(checkin_codes.bloom_contains(bits, size, hash_count, registration_id))
+        # На 21 записи округление m и k дает ~0.4% ложных срабатываний вместо 0.1%; порог с запасом,
+        # чтобы случайные UUID не роняли тест
+        false_positives = sum(checkin_codes.bloom_contains(bits, size, hash_count, uuid.uuid4()) for _ in range(10000))
+        self.assertLess(false_positives, 200)
+
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(reverse('event-offline-codes', args=[self.event.pk])).status_code, 403)
+
+
+class RegistrationQRTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.event = make_events(self.organizer, 1)[0]
+        self.students = [make_user(f'student{i}') for i in range(3)]
+        self.registrations = [Registration.objects.create(student=s, event=self.event) for s in self.students]
+        self.client = APIClient()
+        self.client.force_authenticate(self.students[0])
+        self.url = reverse('registration-qr', args=[self.registrations[0].pk])
+
+    def test_png_is_cached_and_immutable(self):
+        payload = checkin_codes.token_for(self.registrations[0].pk, self.event.pk, self.event.dt_start)
+        response = self.client.get(self.url, {'size': 300, 'v': qr.payload_version(payload)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (256, 256))
+        key = 'qr:' + qr.content_key(payload, 256, 'png')
+        self.assertEqual(cache.get(key), response.content)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_svg_and_access(self):
+        response = self.client.get(self.url, {'qr_format': 'svg'})
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'<svg width="256" height="256"', response.content)
+        self.assertIn(b'width="512"', self.client.get(self.url, {'qr_format': 'svg', 'size': 512}).content)
+        self.assertEqual(self.client.get(self.url, {'qr_format': 'gif'}).status_code, 400)
+        self.client.force_authenticate(self.students[1])
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_authenticate(self.organizer)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_my_registrations_link_to_image(self):
+        url = self.client.get(reverse('my-registrations')).data[0]['qr_code_url']
+        self.assertTrue(url.startswith(self.url + '?v='))
+        self.assertIn('immutable', self.client.get(url)['Cache-Control'])
+        # Без версии (или со старой) картинка перепроверяется по ETag
+        self.assertEqual(self.client.get(self.url)['Cache-Control'], 'private, no-cache')
+
+        # Перенос мероприятия меняет токен в QR - и адрес картинки
+        Event.objects.filter(pk=self.event.pk).update(dt_start=self.event.dt_start + timedelta(days=1))
+        moved = self.client.get(reverse('my-registrations')).data[0]['qr_code_url']
+        self.assertNotEqual(moved, url)
+        self.assertEqual(self.client.get(url)['Cache-Control'], 'private, no-cache')
+
+    def test_participant_sheets(self):
+        self.client.force_authenticate(self.organizer)
+        url = reverse('event-qr-sheet', args=[self.event.pk])
+        response = self.client.get(url, {'sheet_format': 'zip'})
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+        self.assertEqual(sorted(names), sorted(f'{r.student.username}-{r.pk}.png' for r in self.registrations))
+
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_broken_pool_is_replaced(self):
+        # Воркер пула упал (как при OOM) - пул сломан, но рендер должен пройти на новом
+        broken = qr.get_pool()
+        with self.assertRaises(BrokenProcessPool):
+            broken.submit(os._exit, 1).result()
+        images = qr.get_qr_many(['first', 'second'], 128)
+        self.assertEqual([Image.open(io.BytesIO(image)).size for image in images], [(128, 128)] * 2)
+        self.assertIsNot(qr.get_pool(), broken)
+
+
+class RegistrationsCalendarTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.events = make_events(self.organizer, 3)
+        self.student = make_user('student')
+        for event in self.events[:2]:
+            Registration.objects.create(student=self.student, event=event)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = self.client.get(reverse('my-registrations-calendar')).data['url']
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_calendar_lists_registrations(self):
+        self.events[0].title = 'Лекция; вопросы, ответы'
+        self.events[0].description = 'Первая строка\nвторая строка ' + 'очень длинное описание ' * 5
+        self.events[0].save()
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        body = self.read(response)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('SUMMARY:Лекция\\; вопросы\\, ответы\r\n', body)
+        self.assertNotIn(self.events[2].title + '\r\n', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+        unfolded = body.replace('\r\n ', '')
+        self.assertIn('DESCRIPTION:Первая строка\\nвторая строка', unfolded)
+
+    def test_unchanged_calendar_is_not_modified_without_registration_query(self):
+        response = APIClient().get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            not_modified = APIClient().get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('api_registration', queries[0]['sql'])
+        since = APIClient().get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_registration_changes_update_validators(self):
+        etag = APIClient().get(self.url)['ETag']
+        Registration.objects.create(student=self.student, event=self.events[2])
+        response = APIClient().get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read(response).count('BEGIN:VEVENT'), 3)
+
+        etag = response['ETag']
+        Registration.objects.filter(student=self.student, event=self.events[2]).delete()
+        self.assertEqual(APIClient().get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = APIClient().get(self.url)['ETag']
+        self.events[1].location_text = 'Аудитория 202'
+        self.events[1].save()
+        response = APIClient().get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('LOCATION:Аудитория 202', self.read(response))
+
+        # Счетчик мест календаря не касается
+        etag = response['ETag']
+        self.events[1].save(update_fields=['registered_count'])
+        self.assertEqual(APIClient().get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_import_upsert_updates_validators(self):
+        Event.objects.filter(pk=self.events[0].pk).update(external_id='lecture-1')
+        etag = APIClient().get(self.url)['ETag']
+        self.client.force_authenticate(self.organizer)
+        moved = (self.events[0].dt_start + timedelta(days=1)).isoformat()
+        row = {'external_id': 'lecture-1', 'title': 'Перенесено', 'location_text': 'Аудитория 101', 'dt_start': moved}
+        response = self.client.post(reverse('event-bulk-import'), [row], format='json')
+        self.assertEqual(response.data['updated'], 1)
+        response = APIClient().get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('SUMMARY:Перенесено', self.read(response))
+
+    def test_token_access(self):
+        self.assertEqual(APIClient().get(self.url.replace('.ics', 'x.ics')).status_code, 404)
+        organizer_url = reverse('registrations-calendar', args=[calendar_feed.make_token(self.organizer.pk, 0)])
+        self.assertEqual(APIClient().get(organizer_url).status_code, 404)
+        self.client.force_authenticate(self.organizer)
+        self.assertEqual(self.client.get(reverse('my-registrations-calendar')).status_code, 403)
+
+    def test_regenerated_link_revokes_old_one(self):
+        # Ссылки, выданные до версии токена (подписанный id), остаются версией 0
+        legacy_token = signing.Signer(salt=calendar_feed.SIGNING_SALT).sign(str(self.student.pk))
+        legacy = reverse('registrations-calendar', args=[legacy_token])
+        self.assertEqual(APIClient().get(legacy).status_code, 200)
+
+        new_url = self.client.post(reverse('my-registrations-calendar')).data['url']
+        self.assertNotEqual(new_url, self.url)
+        self.assertEqual(self.client.get(reverse('my-registrations-calendar')).data['url'], new_url)
+        self.assertEqual(APIClient().get(new_url).status_code, 200)
+        self.assertEqual(APIClient().get(self.url).status_code, 404)
+        self.assertEqual(APIClient().get(legacy).status_code, 404)
+
+
+class ParticipantExportTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.event = make_events(self.organizer, 1)[0]
+        for i in range(3):
+            student = User.objects.create_user(username=f'student{i}', email=f's{i}@example.com')
+            Registration.objects.create(student=student, event=self.event, attended=i == 0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+        self.url = reverse('event-export', args=[self.event.pk])
+
+    def test_csv_export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'registration_id,name,username,email,registered_at,attended')
+        self.assertEqual(len(lines), 4)
+        self.assertIn(',s0@example.com,', lines[1])
+        self.assertTrue(lines[1].endswith(',True'))
+
+    def test_ndjson_export(self):
+        response = self.client.get(self.url, {'export_format': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['username'] for row in rows], ['student0', 'student1', 'student2'])
+        self.assertEqual(rows[0]['attended'], True)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(self.url, {'export_format': 'xml'}).status_code, 400)
+
+
+class PopularTagsTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.python, self.music, self.sport = (Tag.objects.create(name=n) for n in ('python', 'music', 'sport'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+        self.url = reverse('event-popular-tags')
+
+    def popular(self, **params):
+        return [tag['name'] for tag in self.client.get(self.url, params).data]
+
+    def test_counters_follow_tag_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = make_events(self.organizer, 2)
+            first.tags.set([self.python, self.music])
+            second.tags.add(self.python)
+        self.assertEqual(self.popular(), ['python', 'music'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.tags.remove(self.python, self.sport)  # sport не был привязан
+            second.tags.clear()
+            self.sport.event_set.add(first, second)
+        self.python.refresh_from_db()
+        self.sport.refresh_from_db()
+        self.assertEqual((self.python.usage_count, self.sport.usage_count), (0, 2))
+        self.assertEqual(self.popular(), ['sport', 'music'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.popular(), ['sport'])
+
+    def test_cached_until_invalidated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_events(self.organizer, 1)[0].tags.add(self.music)
+        self.popular()
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_upcoming_window_uses_daily_buckets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            upcoming = make_events(self.organizer, 1)[0]
+            upcoming.tags.add(self.music)
+            past = make_events(self.organizer, 1)[0]
+            past.tags.add(self.python, self.sport)
+            past.dt_start = timezone.now() - timedelta(days=3)
+            past.save()
+        self.assertEqual(self.popular(window='upcoming'), ['music'])
+        self.assertEqual(self.popular(), ['music', 'python', 'sport'])
+        self.assertEqual(self.client.get(self.url, {'window': 'year'}).status_code, 400)
+
+
+class TagResolutionTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        Tag.objects.create(name='Python')
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+
+    def test_tag_names_resolved_in_bulk(self):
+        names = ['python', ' Music ', 'music', ''] + [f'tag{i}' for i in range(15)]
+        tags = EventSerializer.resolve_tag_names(names)
+        self.assertEqual([tag.name for tag in tags], ['Python', 'music'] + [f'tag{i}' for i in range(15)])
+        self.assertEqual(Tag.objects.count(), 17)
+        with self.assertNumQueries(1):
+            EventSerializer.resolve_tag_names(names)
+
+    def test_create_event_with_tag_names(self):
+        payload = {
+            'title': 'Хакатон', 'dt_start': (timezone.now() + timedelta(days=2)).isoformat(),
+            'location_text': 'Коворкинг', 'tag_names': ['PYTHON', 'ai'],
+        }
+        response = self.client.post(reverse('event-list'), payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(tag['name'] for tag in response.data['tags']), ['Python', 'ai'])
+
+    def test_case_insensitive_uniqueness(self):
+        response = self.client.post(reverse('tag-list'), {'name': 'PYTHON'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Tag.objects.create(name='pYthon')
+
+
+class EventImportTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+        self.url = reverse('event-bulk-import')
+        self.start = timezone.now() + timedelta(days=7)
+
+    def row(self, number, **extra):
+        row = {
+            'external_id': f'row-{number}', 'title': f'Лекция {number}', 'location_text': 'Аудитория 1',
+            'dt_start': (self.start + timedelta(days=number)).isoformat(), 'tag_names': ['лекция', f'курс{number % 3}'],
+        }
+        row.update(extra)
+        return row
+
+    def test_json_import_and_upsert(self):
+        response = self.client.post(self.url, [self.row(1), self.row(2)], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['updated']), (2, 0))
+        self.assertEqual(Tag.objects.get(name='лекция').usage_count, 2)
+
+        response = self.client.post(self.url, [self.row(1, title='Перенесено', tag_names=['семинар'])], format='json')
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 1))
+        event = Event.objects.get(external_id='row-1')
+        self.assertEqual(event.title, 'Перенесено')
+        self.assertEqual(event.get_tag_names(), ['семинар'])
+        self.assertEqual(Tag.objects.get(name='лекция').usage_count, 1)
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_upsert_publishes_seats(self):
+        self.client.post(self.url, [self.row(1, max_participants=10), self.row(2)], format='json')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(self.url, [self.row(1, max_participants=5), self.row(3)], format='json')
+        published = [
+            callback.args for callback in callbacks
+            if getattr(callback, 'func', None) is seat_updates.publish_availability
+        ]
+        self.assertEqual(published, [(Event.objects.get(external_id='row-1').pk,)])
+
+    def test_csv_import(self):
+        content = (
+            'external_id,title,dt_start,location_text,max_participants,tags\n'
+            f'a,Кино,{self.start.isoformat()},Актовый зал,50,кино;досуг\n'
+            f',Без ключа,{self.start.isoformat()},Холл,,\n'
+        )
+        upload = SimpleUploadedFile('events.csv', content.encode(), content_type='text/csv')
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Event.objects.get(external_id='a').max_participants, 50)
+        self.assertEqual(sorted(Event.objects.get(external_id='a').get_tag_names()), ['досуг', 'кино'])
+        self.assertIsNone(Event.objects.get(title='Без ключа').max_participants)
+
+    def test_rejects_non_utf8_csv(self):
+        content = f'external_id,title,dt_start,location_text\na,Кино,{self.start.isoformat()},Актовый зал\n'
+        upload = SimpleUploadedFile('events.csv', content.encode('cp1251'), content_type='text/csv')
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'detail': 'CSV должен быть в UTF-8'})
+        self.assertFalse(Event.objects.exists())
+
+    def test_rejects_whole_import_with_row_errors(self):
+        rows = [self.row(1), self.row(2, dt_start='завтра'), self.row(3, external_id='row-1')]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertFalse(Event.objects.exists())
+
+    def test_blank_external_ids_create_separate_events(self):
+        rows = [self.row(1, external_id=''), self.row(2, external_id='  ')]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(len({event['id'] for event in response.data['events']}), 2)
+        self.assertEqual(Event.objects.filter(external_id=None).count(), 2)
+
+        response = self.client.post(self.url, [self.row(3, external_id='')], format='json')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(Event.objects.count(), 3)
+
+    def test_malformed_external_ids_are_row_errors(self):
+        rows = [
+            self.row(1, external_id=['a']), self.row(2, external_id={'id': 1}),
+            self.row(3, external_id=' row-4'), self.row(4),
+        ]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 2, 4])
+        self.assertFalse(Event.objects.exists())
+
+    def test_students_cannot_import(self):
+        self.client.force_authenticate(make_user('student'))
+        self.assertEqual(self.client.post(self.url, [self.row(1)], format='json').status_code, 403)
+
+    def test_import_query_count(self):
+        rows = [self.row(number) for number in range(1000)]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Event.objects.count(), 1000)
+        # Число запросов определяется числом пачек, а не строк: 18 на PostgreSQL; на SQLite пачки
+        # меньше из-за лимита переменных в запросе - 33. Запас - пара запросов
+        self.assertLessEqual(len(ctx.captured_queries), 36 if connection.vendor == 'sqlite' else 21)
+
+
+class EventSearchTests(TestCase):
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.student = make_user('student')
+        first, second, third = make_events(self.organizer, 3)
+        first.title, first.description = 'Вечер поэзии', 'Стихи про программирование и любовь'
+        second.title, second.description = 'Программирование на Python', 'Интенсив для первокурсников'
+        third.title, third.description = 'Футбол', 'Товарищеский матч'
+        for event in (first, second, third):
+            event.save()
+        self.first, self.second, self.third = first, second, third
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def search(self, text):
+        response = self.client.get(reverse('event-list'), {'q': text, 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+
+    def test_title_match_ranks_first(self):
+        self.assertEqual(self.search('программирование'), [self.second.pk, self.first.pk])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search('программирование python'), [self.second.pk])
+        self.assertEqual(self.search('шахматы'), [])
+
+    def test_vector_follows_updates(self):
+        self.first.title = 'Шахматный турнир'
+        self.first.save()
+        self.assertEqual(self.search('шахматный'), [self.first.pk])
+
+    def test_simple_engine_fallback(self):
+        later = make_events(self.organizer, 1)[0]
+        later.description = 'После пар - Футбол'
+        later.save()
+        results = SimpleSearchEngine().search(Event.objects.all(), 'Футбол')
+        self.assertEqual(list(results.values_list('pk', flat=True)), [self.third.pk, later.pk])
+        self.assertFalse(SimpleSearchEngine().search(Event.objects.all(), 'Футбол шахматы').exists())
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='secret-pass-123', email='s@example.com')
+        response = self.client.post(reverse('token_obtain_pair'), {'username': 'student', 'password': 'secret-pass-123'})
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {response.data['access']}"}
+
+    def test_user_served_from_cache(self):
+        self.assertEqual(self.client.get(reverse('me'), **self.auth).data['email'], 's@example.com')
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('me'), **self.auth)
+        self.assertEqual(response.data['username'], 'student')
+
+    def test_save_invalidates_cached_roles(self):
+        self.client.get(reverse('me'), **self.auth)
+        self.user.is_organizer = True
+        self.user.save()
+        response = self.client.get(reverse('me'), **self.auth)
+        self.assertTrue(response.data['is_organizer'])
+        self.assertEqual(self.client.get(reverse('my-registrations'), **self.auth).status_code, 403)
+
+    def test_deactivated_user_rejected(self):
+        self.client.get(reverse('me'), **self.auth)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(reverse('me'), **self.auth).status_code, 401)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.organizer = make_user('organizer', is_organizer=True)
+        self.student, self.other = make_user('student'), make_user('other')
+        self.event = make_events(self.organizer, 1, max_participants=5)[0]
+        Registration.objects.create(student=self.other, event=self.event)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = reverse('event-list')
+
+    def test_feed_served_from_cache_with_personal_overlay(self):
+        self.client.get(self.url)
+        self.client.force_authenticate(self.other)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertTrue(response.data[0]['is_registered'])
+        self.assertEqual(response.data[0]['spots_left'], 4)
+
+    def test_etag_returns_not_modified_without_queries(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_registration_invalidates_feed(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(reverse('event-register', args=[self.event.pk]))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['spots_left'], 3)
+        self.assertTrue(response.data[0]['is_registered'])
+
+    def test_tag_list_invalidated_by_tag_names(self):
+        self.assertEqual(self.client.get(reverse('tag-list')).data, [])
+        EventSerializer.resolve_tag_names(['новый'])
+        self.assertEqual([tag['name'] for tag in self.client.get(reverse('tag-list')).data], ['новый'])
+
+    def test_organizer_feed_not_cached(self):
+        self.client.force_authenticate(self.organizer)
+        self.assertNotIn('ETag', self.client.get(self.url))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Замер выдачи соединений встроен в PostgreSQL-бэкенд')
+class DatabaseConnectionMetricsTests(TransactionTestCase):
+    """Хук метрик получает число выдач соединения и время ожидания за запрос"""
+
+    def test_hook_reports_checkouts_per_request(self):
+        student = make_user('student')
+        client = APIClient()
+        client.force_authenticate(student)
+        reported = []
+        hook = db_metrics.register_hook(lambda request, response, stats: reported.append(stats.as_dict()))
+        self.addCleanup(db_metrics.unregister_hook, hook)
+
+        connection.close()
+        client.get(reverse('event-list'))
+        client.get(reverse('event-list'))
+
+        # Первый запрос берет соединение, второй переиспользует уже открытое в потоке
+        self.assertEqual([item['checkouts'] for item in reported], [1, 0])
+        self.assertGreaterEqual(reported[0]['wait_ms'], 0)
+
+
+class MetricsTests(TestCase):
+    """Per-view метрики, отладочные заголовки и лог медленных запросов"""
+
+    def setUp(self):
+        self.organizer = make_user('organizer', is_organizer=True)
+        make_events(self.organizer, 3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.organizer)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_debug_headers_report_request_numbers(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('event-list'), HTTP_X_DEBUG_METRICS='secret')
+        self.assertEqual(int(response['X-DB-Query-Count']), len(ctx.captured_queries))
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_debug_headers_only_on_request(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('event-list')))
+        self.assertNotIn('Server-Timing', self.client.get(reverse('event-list'), HTTP_X_DEBUG_METRICS='wrong'))
+        with self.settings(METRICS_TOKEN='', DEBUG=False):
+            self.assertNotIn('Server-Timing', self.client.get(reverse('event-list'), HTTP_X_DEBUG_METRICS='1'))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_exposes_histograms(self):
+        self.client.get(reverse('event-list'))
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('api_requests_total{view="event-list",method="GET",status="200"}', body)
+        self.assertIn('api_db_queries_bucket{view="event-list",le="+Inf"}', body)
+        self.assertIn('api_serializer_duration_seconds_count{view="event-list"}', body)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_metrics_endpoint_hidden_without_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(SLOW_QUERY_MS=0.000001)
+    def test_slow_queries_logged(self):
+        with self.assertLogs('api.db.slow', 'WARNING') as logs:
+            self.client.get(reverse('event-list'))
+        self.assertTrue(any('api_event' in line for line in logs.output))
+
+    def test_histogram_rendering(self):
+        histogram = metrics.Histogram('test_seconds', 'Тест.', (0.1, 1))
+        histogram.observe((('view', 'a"b'),), 0.5)
+        lines = histogram.render()
+        self.assertIn('test_seconds_bucket{view="a\\"b",le="0.1"} 0', lines)
+        self.assertIn('test_seconds_bucket{view="a\\"b",le="1.0"} 1', lines)
+        self.assertIn('test_seconds_count{view="a\\"b"} 1', lines)
@@ -1,15 +1,20 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     RegisterView, MeView, EventViewSet, MyRegistrationsListView,
-    EventRegisterView, EventUnregisterView, TagViewSet
+    EventRegisterView, EventUnregisterView, EventWaitlistView, TagViewSet, RegistrationQRView, OrganizerAnalyticsView,
+    EventSeriesViewSet, MyRegistrationsCalendarLinkView, RegistrationsCalendarView
 )
+from .async_views import AsyncCheckInView, AsyncEventRegisterView, AsyncEventUnregisterView, SeatAvailabilityStreamView
 
 router = DefaultRouter()
 # Регистрируем ViewSet для мероприятий. Базовый URL: /api/events/
 # Доступные пути: /api/events/, /api/events/{pk}/, /api/events/{pk}/participants/, /api/events/{pk}/check_in/
 router.register(r'events', EventViewSet, basename='event')
 router.register(r'tags', TagViewSet, basename='tag')
+# Повторяющиеся мероприятия: /api/series/, запись на занятие - /api/series/{pk}/register/
+router.register(r'series', EventSeriesViewSet, basename='series')
 
 urlpatterns = [
     # Аутентификация и данные пользователя
@@ -18,9 +23,32 @@ urlpatterns = [
 
     # Регистрации студента
     path('my-registrations/', MyRegistrationsListView.as_view(), name='my-registrations'),
-    path('events/<int:event_pk>/register/', EventRegisterView.as_view(), name='event-register'),
-    path('events/<int:event_pk>/unregister/', EventUnregisterView.as_view(), name='event-unregister'),
+    # Календарь .ics для подписки: ссылка выдается студенту, сам календарь доступен по токену без авторизации
+    path('my-registrations/calendar/', MyRegistrationsCalendarLinkView.as_view(), name='my-registrations-calendar'),
+    path('calendar/<str:token>.ics', RegistrationsCalendarView.as_view(), name='registrations-calendar'),
+    path('registrations/<uuid:pk>/qr/', RegistrationQRView.as_view(), name='registration-qr'),
+    path('events/<int:event_pk>/waitlist/', EventWaitlistView.as_view(), name='event-waitlist'),
+    # Аналитика посещаемости организатора
+    path('analytics/', OrganizerAnalyticsView.as_view(), name='organizer-analytics'),
+    # Свободные места потоком SSE (живой поток - под ASGI); раньше URL роутера, как и check_in
+    path('events/seats/stream/', SeatAvailabilityStreamView.as_view(), name='event-seats-stream'),
+]
 
+# Пиковые сценарии (запись на мероприятие, сканирование на входе) - асинхронные версии под ASGI
+if settings.ASYNC_VIEWS:
+    urlpatterns += [
+        path('events/<int:event_pk>/register/', AsyncEventRegisterView.as_view(), name='event-register'),
+        path('events/<int:event_pk>/unregister/', AsyncEventUnregisterView.as_view(), name='event-unregister'),
+        # Перекрывает действие check_in из EventViewSet, поэтому стоит раньше URL роутера
+        path('events/<int:pk>/check_in/', AsyncCheckInView.as_view(), name='event-check-in'),
+    ]
+else:
+    urlpatterns += [
+        path('events/<int:event_pk>/register/', EventRegisterView.as_view(), name='event-register'),
+        path('events/<int:event_pk>/unregister/', EventUnregisterView.as_view(), name='event-unregister'),
+    ]
+
+urlpatterns += [
     # Включаем URL, сгенерированные роутером
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,19 +1,39 @@
-from rest_framework import generics, viewsets, status, permissions
+import base64
+import csv
+
+from rest_framework import generics, viewsets, status, permissions, serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import F, Q, Exists, OuterRef
 
-from .models import Event, Registration, Tag
+from .models import Event, EventSeries, Registration, Tag, WaitlistEntry
 from .serializers import TagSerializer
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 from .serializers import (
     UserSerializer, RegisterSerializer, EventSerializer, RegistrationSerializer,
-    EventRegistrationCreateSerializer, CheckInSerializer, MyRegistrationSerializer
+    EventRegistrationCreateSerializer, CheckInSerializer, MyRegistrationSerializer,
+    EventWaitlistCreateSerializer, WaitlistEntrySerializer, CheckInBatchSerializer, EventImportRowSerializer,
+    AnalyticsPeriodSerializer, EventSeriesSerializer, SeriesOccurrenceRegisterSerializer
 )
 from .permissions import IsOrganizer, IsStudent, IsEventOrganizer
+from .pagination import EventCursorPagination
+from .exports import EXPORT_FORMATS
+from .popular_tags import WINDOWS as POPULAR_TAGS_WINDOWS, get_popular_tags
+from .search import SEARCH_RESULTS_LIMIT, get_search_engine
+from .response_cache import FEED, TAGS, CachedListMixin
+from .importers import MAX_IMPORT_ROWS, duplicate_key_errors, import_events, read_csv_rows
+from . import calendar_feed, qr
+from .checkin_codes import build_bloom_filter, token_for
+from .analytics import organizer_analytics
+from .series import series_in_window, upcoming_occurrences, window_end
 
 User = get_user_model()
 
@@ -31,8 +51,9 @@ class MeView(generics.RetrieveAPIView):
      def get_object(self):
          return self.request.user
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CachedListMixin, viewsets.ModelViewSet):
     """API для управления тегами"""
+    cache_namespace = TAGS
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [permissions.AllowAny]
@@ -46,14 +67,35 @@ class TagViewSet(viewsets.ModelViewSet):
             self.permission_classes = [permissions.AllowAny, IsOrganizer]
         return super().get_permissions()
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(CachedListMixin, viewsets.ModelViewSet):
     """Обновленный API для мероприятий с поддержкой фильтрации по тегам"""
     serializer_class = EventSerializer
+    pagination_class = EventCursorPagination
+    cache_namespace = FEED
+
+    def use_response_cache(self, request):
+        # Лента студентов и анонимов общая; организатор видит еще и свои прошедшие события
+        return not (request.user.is_authenticated and request.user.is_organizer)
+
+    def personalize(self, request, data):
+        """В закэшированную ленту подставляем is_registered текущего студента одним запросом"""
+        user = request.user
+        items = data['results'] if isinstance(data, dict) else data
+        if not (user.is_authenticated and user.is_student) or not items or 'is_registered' not in items[0]:
+            return data
+        # У незанятых занятий серий id нет - на них студент точно не записан
+        registered = set(Registration.objects.filter(
+            student=user, event_id__in=[item['id'] for item in items if item['id'] is not None]
+        ).values_list('event_id', flat=True))
+        for item in items:
+            item['is_registered'] = item['id'] in registered
+        return data
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Event.objects.prefetch_related('tags')  # Оптимизация запросов
-        
+        queryset = Event.objects.select_related('organizer').prefetch_related('tags').defer('search_vector')  # Оптимизация запросов
+        queryset = self._annotate_registrations(queryset, user)
+
         if user.is_authenticated and user.is_organizer:
             queryset = queryset.filter(
                 Q(organizer=user) | Q(dt_start__gte=timezone.now())
@@ -62,6 +104,18 @@ class EventViewSet(viewsets.ModelViewSet):
             # Студенты и анонимы видят только будущие события
             queryset = queryset.filter(dt_start__gte=timezone.now())
 
+        queryset = self._filter_by_tags(queryset)
+        if self.feed_until is not None:
+            queryset = queryset.filter(dt_start__lte=self.feed_until)
+
+        # Полнотекстовый поиск: ?q=... - результаты по убыванию релевантности
+        if self.search_text:
+            return get_search_engine().search(queryset, self.search_text)[:SEARCH_RESULTS_LIMIT]
+
+        return queryset.order_by('dt_start', 'id')
+
+    def _filter_by_tags(self, queryset):
+        """Фильтры ?tags= и ?tag_names= - общие для событий и серий"""
         # Фильтрация по тегам
         tag_filter = self.request.query_params.get('tags', None)
         if tag_filter:
@@ -77,22 +131,260 @@ class EventViewSet(viewsets.ModelViewSet):
         if tag_names_filter:
             tag_names = [name.strip().lower() for name in tag_names_filter.split(',')]
             queryset = queryset.filter(tags__name__in=tag_names).distinct()
+        return queryset
+
+    @property
+    def feed_until(self):
+        """?until=ГГГГ-ММ-ДД - конец окна ленты (включительно); неверный формат игнорируется"""
+        until = parse_date(self.request.query_params.get('until', '')) if self.action == 'list' else None
+        if until is None:
+            return None
+        return timezone.make_aware(datetime.combine(until, time.max))
+
+    def series_occurrences(self, after=None, limit=None):
+        """
+        Незанятые занятия серий в окне ленты (от текущего момента до ?until= или SERIES_WINDOW_DAYS):
+        EventCursorPagination вставляет их между событиями. При поиске (?q=) серии не участвуют.
+        """
+        if self.search_text:
+            return iter(())
+        now = timezone.now()
+        end = window_end(now, self.feed_until)
+        return upcoming_occurrences(self._filter_by_tags(series_in_window(now, end)), now, end, after, limit)
 
-        return queryset.order_by('dt_start')
+    @property
+    def search_text(self):
+        if self.action != 'list':
+            return ''
+        return self.request.query_params.get('q', '').strip()
+
+    def paginate_queryset(self, queryset):
+        # Поиск отдает SEARCH_RESULTS_LIMIT лучших совпадений без курсора: keyset по (dt_start, id) не сохраняет ранжирование
+        if self.search_text:
+            return None
+        return super().paginate_queryset(queryset)
+
+    @staticmethod
+    def _annotate_registrations(queryset, user):
+        """
+        Добавляет к каждому событию флаг регистрации текущего студента,
+        чтобы EventSerializer не делал запрос на каждое событие (число мест берется из registered_count).
+        """
+        if user.is_authenticated and user.is_student:
+            queryset = queryset.annotate(
+                is_registered_flag=Exists(Registration.objects.filter(event=OuterRef('pk'), student=user))
+            )
+        return queryset
 
     @action(detail=False, methods=['get'], url_path='popular-tags')
     def popular_tags(self, request):
-        """Получить популярные теги (используемые в событиях)"""
-        from django.db.models import Count
-        
-        # Получаем теги, отсортированные по количеству использований
-        popular_tags = Tag.objects.annotate(
-            usage_count=Count('event')
-        ).filter(usage_count__gt=0).order_by('-usage_count')[:10]
-        
-        serializer = TagSerializer(popular_tags, many=True)
+        """
+        Получить популярные теги (используемые в событиях).
+        ?window=upcoming - только по предстоящим мероприятиям. Считается по поддерживаемым
+        счетчикам Tag.usage_count / TagDailyUsage и кэшируется до следующего изменения.
+        """
+        window = request.query_params.get('window', 'all')
+        if window not in POPULAR_TAGS_WINDOWS:
+            return Response({'detail': f'Неизвестное окно: {window}.'}, status=status.HTTP_400_BAD_REQUEST)
+        data = get_popular_tags(window, lambda tags: TagSerializer(tags, many=True).data)
+        return Response(data)
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAuthenticated, IsOrganizer])
+    def bulk_import(self, request):
+        """
+        Массовый импорт мероприятий текущего организатора: JSON-массив строк или CSV-файл в поле file.
+        Строки с уже импортированным external_id обновляются. Сначала проверяются все строки -
+        при любой ошибке ничего не записывается, а в ответе перечислены ошибки по номерам строк.
+        """
+        if 'file' in request.FILES:
+            try:
+                rows = read_csv_rows(request.FILES['file'])
+            except (UnicodeDecodeError, csv.Error):
+                # Excel по умолчанию сохраняет CSV в cp1251
+                return Response({'detail': 'CSV должен быть в UTF-8'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({'detail': 'Ожидается непустой список мероприятий или CSV-файл.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > MAX_IMPORT_ROWS:
+            return Response({'detail': f'Не более {MAX_IMPORT_ROWS} строк за один импорт.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = EventImportRowSerializer(data=rows, many=True)
+        errors = duplicate_key_errors(rows)
+        if not serializer.is_valid():
+            errors += [{'row': number, 'errors': row_errors}
+                       for number, row_errors in enumerate(serializer.errors, start=1) if row_errors]
+        if errors:
+            errors.sort(key=lambda error: error['row'])
+            return Response({'detail': 'Импорт отклонен, исправьте ошибки.', 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = import_events(request.user, serializer.validated_data)
+        created = sum(1 for result in results if result['status'] == 'created')
+        return Response(
+            {'created': created, 'updated': len(results) - created, 'events': results},
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated, IsOrganizer, IsEventOrganizer])
+    def participants(self, request, pk=None):
+        """Список участников мероприятия (только для его организатора)"""
+        event = self.get_object()
+        registrations = Registration.objects.filter(event=event).select_related(
+            'student', 'event__organizer'
+        ).prefetch_related('event__tags')
+        serializer = RegistrationSerializer(registrations, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
+    # Колонки выгрузки участников и соответствующие им поля для values_list
+    EXPORT_COLUMNS = (
+        ('registration_id', 'id'),
+        ('name', 'student__name'),
+        ('username', 'student__username'),
+        ('email', 'student__email'),
+        ('registered_at', 'registered_at'),
+        ('attended', 'attended'),
+    )
+    EXPORT_CHUNK_SIZE = 2000
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated, IsOrganizer, IsEventOrganizer])
+    def export(self, request, pk=None):
+        """
+        Потоковая выгрузка участников (?export_format=csv|ndjson).
+        Строки читаются курсором порциями по EXPORT_CHUNK_SIZE, поэтому память не зависит от размера события.
+        """
+        event = self.get_object()
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({'detail': f'Неизвестный формат: {export_format}.'}, status=status.HTTP_400_BAD_REQUEST)
+        stream, content_type = EXPORT_FORMATS[export_format]
+
+        columns = [column for column, _ in self.EXPORT_COLUMNS]
+        rows = Registration.objects.filter(event=event).order_by('registered_at').values_list(
+            *(field for _, field in self.EXPORT_COLUMNS)
+        ).iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+
+        response = StreamingHttpResponse(stream(columns, rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="event-{event.pk}-participants.{export_format}"'
+        return response
+
+    QR_SHEET_FORMATS = {
+        'pdf': 'application/pdf',
+        'zip': 'application/zip',
+    }
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated, IsOrganizer, IsEventOrganizer])
+    def qr_sheet(self, request, pk=None):
+        """
+        QR-коды всех участников для печати: PDF-листы (?sheet_format=pdf) или ZIP с PNG (?sheet_format=zip).
+        Картинки берутся из кэша, недостающие рендерятся в пуле процессов (api/qr.py).
+        """
+        event = self.get_object()
+        sheet_format = request.query_params.get('sheet_format', 'pdf')
+        if sheet_format not in self.QR_SHEET_FORMATS:
+            raise serializers.ValidationError({'sheet_format': f"Допустимые значения: {', '.join(self.QR_SHEET_FORMATS)}."})
+
+        participants = list(
+            Registration.objects.filter(event=event).order_by('student__username').values_list('id', 'student__username')
+        )
+        images = qr.get_qr_many(
+            [token_for(registration_id, event.pk, event.dt_start) for registration_id, _ in participants], qr.SHEET_QR_SIZE
+        )
+        if sheet_format == 'zip':
+            content = qr.build_zip([
+                (f'{username}-{registration_id}.png', image)
+                for (registration_id, username), image in zip(participants, images)
+            ])
+        else:
+            content = qr.build_pdf([(username, image) for (_, username), image in zip(participants, images)])
+
+        response = HttpResponse(content, content_type=self.QR_SHEET_FORMATS[sheet_format])
+        response['Content-Disposition'] = f'attachment; filename="event-{event.pk}-qr.{sheet_format}"'
+        return response
+
+    OFFLINE_FALSE_POSITIVE_RATE = 0.001
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated, IsOrganizer, IsEventOrganizer])
+    def offline_codes(self, request, pk=None):
+        """
+        Bloom-фильтр действительных регистраций мероприятия для сканера без сети.
+        Устройство читает из токена QR id регистрации, мероприятие и срок (они не зашифрованы)
+        и проверяет id по фильтру; схема хеширования - api/checkin_codes.py (bloom_positions).
+        """
+        event = self.get_object()
+        registration_ids = list(Registration.objects.filter(event=event).values_list('id', flat=True))
+        bits, size, hash_count = build_bloom_filter(registration_ids, self.OFFLINE_FALSE_POSITIVE_RATE)
+        return Response({
+            'event_id': event.pk,
+            'count': len(registration_ids),
+            'false_positive_rate': self.OFFLINE_FALSE_POSITIVE_RATE,
+            'hash': 'sha256-double',
+            'm': size,
+            'k': hash_count,
+            'bits': base64.b64encode(bits).decode(),
+            'generated_at': timezone.now(),
+        })
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsOrganizer, IsEventOrganizer])
+    def check_in(self, request, pk=None):
+        """Отметка посещения по отсканированному QR (registration_id)"""
+        event = self.get_object()
+        serializer = CheckInSerializer(data=request.data, context={'event': event, 'request': request})
+        serializer.is_valid(raise_exception=True)
+        registration = serializer.save()
+        return Response({
+            'message': 'Посещение отмечено.',
+            'registration': {
+                'id': registration.id,
+                'student': {'name': registration.student.name, 'username': registration.student.username},
+                'attended': registration.attended,
+            },
+        })
+
+    @action(detail=True, methods=['post'], url_path='check_in/batch',
+            permission_classes=[permissions.IsAuthenticated, IsOrganizer, IsEventOrganizer])
+    def check_in_batch(self, request, pk=None):
+        """Пакетная отметка посещения - для сканов, накопленных без сети"""
+        event = self.get_object()
+        serializer = CheckInBatchSerializer(data=request.data, context={'event': event, 'request': request})
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        checked_in = sum(1 for item in results if item['result'] == CheckInBatchSerializer.CHECKED_IN)
+        return Response({'checked_in': checked_in, 'results': results})
+
+
+class EventSeriesViewSet(viewsets.ModelViewSet):
+    """
+    Серии повторяющихся мероприятий. Занятия отдельно не хранятся: лента (/api/events/) разворачивает их
+    из правила повторения, а запись на занятие (register) создает его Event.
+    """
+    serializer_class = EventSeriesSerializer
+    queryset = EventSeries.objects.select_related('organizer').prefetch_related('tags')
+
+    def get_permissions(self):
+        if self.action in ('create', 'update', 'partial_update', 'destroy'):
+            self.permission_classes = [permissions.IsAuthenticated, IsOrganizer, IsEventOrganizer]
+        elif self.action == 'register':
+            self.permission_classes = [permissions.IsAuthenticated, IsStudent]
+        return super().get_permissions()
+
+    @action(detail=True, methods=['post'], serializer_class=SeriesOccurrenceRegisterSerializer)
+    def register(self, request, pk=None):
+        """Запись на занятие серии по occurrence_start из ленты"""
+        series = self.get_object()
+        serializer = SeriesOccurrenceRegisterSerializer(
+            data=request.data, context={'request': request, 'series': series}
+        )
+        serializer.is_valid(raise_exception=True)
+        registration = serializer.save()
+        return Response(MyRegistrationSerializer(registration).data, status=status.HTTP_201_CREATED)
+
+
+def student_registrations(student_id, since):
+    """Регистрации студента на мероприятия, начинающиеся не раньше since - и для списка, и для календаря .ics"""
+    return Registration.objects.filter(
+        student_id=student_id,
+        event__dt_start__gte=since
+    ).select_related('event').order_by('-event__dt_start')
 
 class MyRegistrationsListView(generics.ListAPIView):
     """Получение списка регистраций текущего студента"""
@@ -101,11 +393,97 @@ class MyRegistrationsListView(generics.ListAPIView):
 
     def get_queryset(self):
         # Показываем регистрации на будущие и недавние (например, за посл. неделю) события
-        past_limit = timezone.now() - timedelta(days=7)
-        return Registration.objects.filter(
-            student=self.request.user,
-            event__dt_start__gte=past_limit
-        ).select_related('event').order_by('-event__dt_start')
+        past_limit = timezone.now() - timedelta(days=calendar_feed.PAST_DAYS)
+        return student_registrations(self.request.user.pk, past_limit)
+
+class MyRegistrationsCalendarLinkView(generics.GenericAPIView):
+    """
+    Ссылка на календарь .ics с регистрациями текущего студента - для подписки в приложении календаря.
+    POST выдает новую ссылку, старая перестает открываться (если ссылка утекла).
+    """
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+
+    def get(self, request):
+        return Response({'url': self.calendar_url(request)})
+
+    def post(self, request):
+        User.objects.filter(pk=request.user.pk).update(calendar_token_version=F('calendar_token_version') + 1)
+        return Response({'url': self.calendar_url(request)})
+
+    @staticmethod
+    def calendar_url(request):
+        # Версию читаем из базы: request.user может быть из кэша пользователей (api/authentication.py)
+        version = User.objects.filter(pk=request.user.pk).values_list('calendar_token_version', flat=True).get()
+        path = reverse('registrations-calendar', args=[calendar_feed.make_token(request.user.pk, version)])
+        return request.build_absolute_uri(path)
+
+class RegistrationsCalendarView(generics.GenericAPIView):
+    """
+    Регистрации студента в формате iCalendar: GET /api/calendar/<token>.ics, токен вместо авторизации.
+    Календари опрашивают ссылку каждые несколько минут, поэтому ETag и Last-Modified считаются
+    по User.registrations_changed_at: неизмененный календарь отдается 304 после одного запроса
+    к строке пользователя, без выборки регистраций. Сам календарь собирается потоком.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, token):
+        token_data = calendar_feed.read_token(token)
+        if token_data is None:
+            raise Http404
+        user_id, version = token_data
+        student = User.objects.filter(
+            pk=user_id, calendar_token_version=version, is_active=True, is_student=True
+        ).values('registrations_changed_at').first()
+        if student is None:
+            raise Http404
+
+        since = calendar_feed.window_start()
+        etag, last_modified = calendar_feed.validators(user_id, student['registrations_changed_at'], since)
+        response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if response is None:
+            rows = student_registrations(user_id, since).values_list(*calendar_feed.COLUMNS).iterator()
+            response = StreamingHttpResponse(calendar_feed.stream_calendar(rows), content_type=calendar_feed.CONTENT_TYPE)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+class RegistrationQRView(generics.GenericAPIView):
+    """
+    QR-код регистрации картинкой: ?qr_format=png|svg, ?size=128|256|512|1024.
+    Доступен студенту-владельцу и организатору мероприятия. Картинка кэшируется по содержимому;
+    immutable Cache-Control - только по адресу с текущей версией (?v=, см. qr_code_url),
+    иначе браузер перепроверяет ее по ETag: после переноса мероприятия меняется токен в QR.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        registration = Registration.objects.filter(pk=pk).values(
+            'student_id', 'event_id', 'event__organizer_id', 'event__dt_start'
+        ).first()
+        # Чужим - 404, чтобы не раскрывать существование регистрации
+        if registration is None or request.user.pk not in (registration['student_id'], registration['event__organizer_id']):
+            raise Http404
+
+        image_format = request.query_params.get('qr_format', 'png')
+        if image_format not in qr.QR_FORMATS:
+            raise serializers.ValidationError({'qr_format': f"Допустимые значения: {', '.join(qr.QR_FORMATS)}."})
+        size = qr.normalize_size(request.query_params.get('size', qr.DEFAULT_QR_SIZE))
+        # То же, что MyRegistrationSerializer.qr_code_data
+        payload = token_for(pk, registration['event_id'], registration['event__dt_start'])
+
+        etag = f'"{qr.content_key(payload, size, image_format)}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(qr.get_qr(payload, size, image_format), content_type=qr.QR_FORMATS[image_format])
+        response['ETag'] = etag
+        if request.query_params.get('v') == qr.payload_version(payload):
+            response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = 'private, no-cache'
+        return response
 
 class EventRegisterView(generics.GenericAPIView):
     """Регистрация текущего студента на мероприятие по ID события"""
@@ -115,10 +493,9 @@ class EventRegisterView(generics.GenericAPIView):
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        event = serializer.context['event'] # Получаем событие из контекста сериализатора
 
-        # Создаем регистрацию
-        registration = Registration.objects.create(student=request.user, event=event)
+        # Создаем регистрацию (атомарно резервирует место, см. EventRegistrationCreateSerializer.create)
+        registration = serializer.save()
         output_serializer = MyRegistrationSerializer(registration) # Возвращаем данные о созданной регистрации
         return Response(output_serializer.data, status=status.HTTP_201_CREATED)
 
@@ -137,4 +514,36 @@ class EventUnregisterView(generics.DestroyAPIView):
          # Дополнительная проверка: нельзя отменить регистрацию на уже прошедшее событие
         if instance.event.dt_start < timezone.now():
              raise serializers.ValidationError({"detail": "Нельзя отменить регистрацию на прошедшее событие."})
-        super().perform_destroy(instance)
\ No newline at end of file
+        # Освободившееся место сразу отдаем первому из листа ожидания (Registration.cancel),
+        # чтобы его не успел занять обычный запрос на регистрацию
+        instance.cancel()
+
+
+class EventWaitlistView(generics.GenericAPIView):
+    """Постановка в лист ожидания (POST) и выход из него (DELETE) для текущего студента"""
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+    serializer_class = EventWaitlistCreateSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        entry = serializer.save()
+        return Response(WaitlistEntrySerializer(entry).data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, *args, **kwargs):
+        entry = get_object_or_404(WaitlistEntry, event_id=kwargs['event_pk'], student=request.user)
+        entry.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class OrganizerAnalyticsView(generics.GenericAPIView):
+    """
+    Аналитика мероприятий текущего организатора за период: регистрации, отмены и отметки по дням,
+    доля пришедших по мероприятиям и неявки по тегам. Читает дневную статистику, а не регистрации.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsOrganizer]
+    serializer_class = AnalyticsPeriodSerializer
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(organizer_analytics(request.user, **serializer.validated_data))
@@ -49,7 +49,8 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication с LRU+TTL кэшем пользователей (без запроса к api_user на каждый вызов)
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -58,6 +59,10 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema', # <--- ДОБАВЬТЕ ЭТУ СТРОКУ
 }
 
+# Асинхронные регистрация, отмена и check-in (api/async_views.py) вместо синхронных.
+# По умолчанию включены в ASGI-режиме (SERVER_MODE=asgi, см. gunicorn.conf.py)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', str(os.getenv('SERVER_MODE') == 'asgi')).lower() in ('true', '1', 't')
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'СтудАфишка API',
     'DESCRIPTION': 'API для платформы студенческих мероприятий "СтудАфишка"',
@@ -73,9 +78,19 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
+# Кэш пользователей для api.authentication.CachedJWTAuthentication (в памяти каждого процесса)
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '60')) # секунд
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '10000'))
+
 MIDDLEWARE = [
+    # Первым - чтобы учитывать соединения, взятые любым другим middleware (например, аутентификацией)
+    'api.db_metrics.DatabaseMetricsMiddleware',
+    # Per-view метрики (SQL, сериализация, задержка) для /metrics - см. api/metrics.py
+    'api.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Раздача статики (админка, Swagger) прямо из gunicorn/uvicorn, со сжатием и кэш-заголовками
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -110,15 +125,38 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # Стандартный postgresql-бэкенд + замер выдачи соединений (api/db_metrics.py)
+        'ENGINE': 'api.db_backend',
         'NAME': os.getenv('POSTGRES_DB'),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST', 'localhost'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        # Проверка соединения перед повторным использованием (и в пуле, и без него)
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() in ('true', '1', 't'),
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
+        },
     }
 }
 
+# Пул соединений psycopg (нужен пакет psycopg[pool]). Размер пула - на процесс:
+# для gunicorn gthread max_size должен быть не меньше числа потоков воркера.
+DB_POOL = os.getenv('DB_POOL', 'True').lower() in ('true', '1', 't')
+if DB_POOL:
+    DATABASES['default']['CONN_MAX_AGE'] = 0 # С пулом Django требует 0, соединения живут в пуле
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')), # Сколько ждать свободного соединения, сек
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', '1800')),
+    }
+else:
+    # Без пула - постоянные соединения на поток (None - без ограничения времени)
+    conn_max_age = os.getenv('DB_CONN_MAX_AGE', '60')
+    DATABASES['default']['CONN_MAX_AGE'] = None if conn_max_age.lower() == 'none' else int(conn_max_age)
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.sqlite3',
@@ -127,6 +165,55 @@ DATABASES = {
 # }
 
 
+# Метрики и диагностика (api/metrics.py)
+# /metrics доступен с заголовком "Authorization: Bearer <METRICS_TOKEN>"; без токена - только при DEBUG.
+# Server-Timing и X-DB-Query-Count - в ответе на запрос с заголовком "X-Debug-Metrics: <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# SQL-запросы дольше порога пишутся в лог api.db.slow (0 - выключено)
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+
+
+# QR-коды регистраций - подписанные токены (api/checkin_codes.py)
+# Сколько часов после начала мероприятия токен принимается на входе
+CHECKIN_CODE_TTL_HOURS = int(os.getenv('CHECKIN_CODE_TTL_HOURS', '24'))
+# Принимать старые QR с голым UUID регистрации (проверяются только по базе)
+CHECKIN_ACCEPT_PLAIN_IDS = os.getenv('CHECKIN_ACCEPT_PLAIN_IDS', 'True').lower() in ('true', '1', 't')
+
+# Процессы для пакетного рендера QR-кодов (api/qr.py), на каждый воркер приложения
+QR_RENDER_WORKERS = int(os.getenv('QR_RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# По умолчанию - память процесса; при заданном REDIS_URL - общий Redis (нужен пакет redis).
+# Память процесса годится только для одного процесса: сброс кэша ответов API не дойдет до других воркеров
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+            'KEY_PREFIX': 'studafishka',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'studafishka',
+            # По умолчанию 300 записей - меньше, чем QR-кодов одного крупного мероприятия
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Поток свободных мест (api/seat_updates.py). С брокером Redis (по умолчанию REDIS_URL) изменения
+# доходят до подписчиков во всех воркерах; без него - только до подписчиков того же процесса
+SEATS_BROKER_URL = os.getenv('SEATS_BROKER_URL', os.getenv('REDIS_URL', ''))
+# Комментарий-пинг в потоке, чтобы прокси не закрывали простаивающее соединение
+SEATS_STREAM_HEARTBEAT = int(os.getenv('SEATS_STREAM_HEARTBEAT', 15))
+SEATS_STREAM_MAX_EVENTS = 50
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -164,6 +251,23 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles' # Сюда collectstatic собирает файлы для production-режима
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        # В production-режимах (entrypoint.sh выполняет collectstatic) - имена с хешем содержимого
+        # + gzip/brotli, WhiteNoise отдает их с "вечным" Cache-Control.
+        # Для runserver и тестов манифеста нет - обычное хранилище
+        'BACKEND': (
+            'whitenoise.storage.CompressedManifestStaticFilesStorage'
+            if os.getenv('SERVER_MODE') in ('wsgi', 'asgi')
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -8,10 +8,14 @@ from rest_framework_simplejwt.views import (
 )
 # Импорты для drf-spectacular
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from api.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
+    # Метрики в формате Prometheus (доступ - см. METRICS_TOKEN в settings.py)
+    path('metrics', metrics_view, name='metrics'),
+
     # API эндпоинты вашего приложения
     path('api/', include('api.urls')), # Основные эндпоинты API
 
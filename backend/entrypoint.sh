@@ -14,9 +14,17 @@ echo "PostgreSQL started"
 echo "Applying database migrations..."
 python manage.py migrate --noinput
 
-# Сбор статики (если используется Django для статики админки и т.д.)
-# echo "Collecting static files..."
-# python manage.py collectstatic --noinput --clear
+# Режим сервера: dev - команда из Dockerfile/docker-compose (runserver),
+# wsgi/asgi - production-профиль gunicorn (см. gunicorn.conf.py)
+case "${SERVER_MODE:-dev}" in
+  wsgi|asgi)
+    # Статику отдает WhiteNoise, поэтому собираем ее перед стартом
+    echo "Collecting static files..."
+    python manage.py collectstatic --noinput --clear
+    echo "Starting gunicorn ($SERVER_MODE)..."
+    exec gunicorn --config gunicorn.conf.py
+    ;;
+esac
 
 # Запуск основного процесса (команды, переданной после entrypoint в Dockerfile или docker-compose)
 echo "Starting server..."
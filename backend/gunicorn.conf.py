@@ -0,0 +1,45 @@
+# backend/gunicorn.conf.py
+# Конфигурация production-сервера. Режим выбирается переменной SERVER_MODE (см. entrypoint.sh):
+#   wsgi - gunicorn + потоки (gthread) поверх config/wsgi.py
+#   asgi - gunicorn + uvicorn-воркеры поверх config/asgi.py
+# Все значения можно переопределить переменными окружения.
+import multiprocessing
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+CPU_COUNT = multiprocessing.cpu_count()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    # Асинхронный воркер сам обслуживает много соединений - достаточно процесса на ядро
+    workers = int(os.getenv('WEB_CONCURRENCY', CPU_COUNT))
+else:
+    wsgi_app = 'config.wsgi:application'
+    worker_class = 'gthread'
+    # Классическая формула 2 * ядра + 1; потоки покрывают ожидание базы
+    workers = int(os.getenv('WEB_CONCURRENCY', CPU_COUNT * 2 + 1))
+    threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+# Кэш ответов API (api/response_cache.py) сбрасывается сменой версии в кэше. С кэшем в памяти процесса
+# (без REDIS_URL) смену увидит только один воркер, остальные до RESPONSE_CACHE_TIMEOUT отдают старую ленту
+if workers > 1 and not os.getenv('REDIS_URL'):
+    raise RuntimeError(
+        f'{workers} воркеров без общего кэша: задайте REDIS_URL или WEB_CONCURRENCY=1 '
+        '(кэш в памяти процесса не сбрасывается в других воркерах)'
+    )
+
+# Перезапуск воркеров ограничивает рост памяти; jitter - чтобы не перезапускались одновременно
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+# Код загружается до форка - воркеры делят память и стартуют быстрее
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('true', '1', 't')
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
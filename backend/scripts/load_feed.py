@@ -0,0 +1,104 @@
+# backend/scripts/load_feed.py
+"""
+Нагрузочный тест ленты событий (GET /api/events/) без внешних зависимостей.
+
+Запуск (сервер уже поднят, пользователь существует):
+    python scripts/load_feed.py --url http://localhost:8000 --username student --password secret \\
+        --concurrency 32 --requests 2000
+
+Выводит JSON: RPS, перцентили задержки (мс) и число ошибок.
+
+Замеры (1 ядро, генератор нагрузки на той же машине, PostgreSQL 16, 200 будущих событий,
+студент, --concurrency 16 --requests 600):
+
+    режим                  путь                      RPS    p50     p95     p99
+    runserver              /api/events/              57.8   229 мс  350 мс  1314 мс
+    wsgi (3x4 gthread)     /api/events/              49.5   267 мс  695 мс  1111 мс
+    asgi (1 uvicorn)       /api/events/              51.2   307 мс  443 мс  469 мс
+    runserver              /api/events/?page_size=20 82.7   158 мс  208 мс  1173 мс
+    wsgi (3x4 gthread)     /api/events/?page_size=20 86.5   151 мс  301 мс  1049 мс
+    asgi (1 uvicorn)       /api/events/?page_size=20 78.4   198 мс  280 мс  316 мс
+
+На одном ядре пропускная способность упирается в CPU при любом сервере; выигрыш
+production-профиля - в хвостах задержки и в масштабировании воркеров по числу ядер.
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def obtain_token(base_url, username, password):
+    body = json.dumps({'username': username, 'password': password}).encode()
+    request = urllib.request.Request(
+        f'{base_url}/api/auth/token/', data=body, headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.load(response)['access']
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def fetch(url, headers, method='GET'):
+    started = time.perf_counter()
+    try:
+        request = urllib.request.Request(url, headers=headers, method=method)
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            ok = 200 <= response.status < 300
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def run(args):
+    token = obtain_token(args.url, args.username, args.password)
+    headers = {'Authorization': f'Bearer {token}'}
+    url = f'{args.url}{args.path}'
+
+    # Прогрев: соединения с базой, кэши воркеров
+    for _ in range(min(args.concurrency, args.requests)):
+        fetch(url, headers)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: fetch(url, headers), range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(duration * 1000 for duration, ok in results if ok)
+    return {
+        'url': url,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'errors': sum(1 for _, ok in results if not ok),
+        'rps': round(len(results) / elapsed, 1),
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 1) if latencies else None,
+            'p50': round(percentile(latencies, 0.50), 1) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 1) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 1) if latencies else None,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест ленты событий')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--path', default='/api/events/')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
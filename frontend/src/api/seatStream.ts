@@ -0,0 +1,67 @@
+// src/api/seatStream.ts
+import { useAuthStore } from '../store/authStore';
+import type { SeatAvailability } from '../types/entities';
+
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://127.0.0.1:8000/api';
+
+/**
+ * Подписка на свободные места мероприятий (Server-Sent Events, /events/seats/stream/).
+ * EventSource не умеет передавать заголовок Authorization, поэтому поток читается через fetch.
+ * После обрыва переподключается через интервал retry, присланный сервером. Кадр end (сервер без живого
+ * потока, WSGI) означает, что изменений не будет: после снимка подписка завершается. Возвращает функцию отписки.
+ */
+export function subscribeToSeats(eventIds: number[], onUpdate: (update: SeatAvailability) => void): () => void {
+    const controller = new AbortController();
+    let retryMs = 5000;
+    let ended = false;
+
+    const handleFrame = (frame: string) => {
+        let eventName = 'message';
+        const data: string[] = [];
+        for (const line of frame.split('\n')) {
+            if (line.startsWith('retry:')) retryMs = Number(line.slice(6)) || retryMs;
+            else if (line.startsWith('event:')) eventName = line.slice(6).trim();
+            else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+        }
+        if (eventName === 'seats' && data.length) {
+            onUpdate(JSON.parse(data.join('\n')));
+        } else if (eventName === 'end') {
+            ended = true;
+        }
+    };
+
+    const run = async () => {
+        while (!controller.signal.aborted) {
+            try {
+                const token = useAuthStore.getState().accessToken;
+                const response = await fetch(`${API_BASE_URL}/events/seats/stream/?events=${eventIds.join(',')}`, {
+                    headers: { Accept: 'text/event-stream', ...(token ? { Authorization: `Bearer ${token}` } : {}) },
+                    signal: controller.signal,
+                });
+                if (!response.ok || !response.body) {
+                    throw new Error(`Seat stream responded with ${response.status}`);
+                }
+                const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                let buffer = '';
+                for (;;) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += value;
+                    let boundary;
+                    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                        handleFrame(buffer.slice(0, boundary));
+                        buffer = buffer.slice(boundary + 2);
+                    }
+                }
+                if (ended) return;
+            } catch (err) {
+                if (controller.signal.aborted) return;
+                console.error('Seat stream error:', err);
+            }
+            await new Promise((resolve) => setTimeout(resolve, retryMs));
+        }
+    };
+
+    run();
+    return () => controller.abort();
+}
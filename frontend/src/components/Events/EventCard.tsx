@@ -1,21 +1,60 @@
-import React from 'react';
-import { Link } from 'react-router-dom';
+import React, { useState } from 'react';
+import { Link, useNavigate } from 'react-router-dom';
 import { format } from 'date-fns';
 import { ru } from 'date-fns/locale';
+import axiosInstance from '../../api/axiosInstance';
+import { useAuthStore } from '../../store/authStore';
+import ErrorMessage from '../Common/ErrorMessage';
 import type { Event } from '../../types/entities';
 
 interface EventCardProps {
     event: Event;
 }
 
+// Карточка ведет на страницу мероприятия; у незанятого занятия серии страницы еще нет - карточка не ссылка,
+// записаться можно только кнопкой
+const CardLink: React.FC<{ event: Event; children: React.ReactNode }> = ({ event, children }) => event.id === null
+    ? <div className="block group">{children}</div>
+    : <Link to={`/events/${event.id}`} className="block group">{children}</Link>;
+
+// Текст ошибки DRF: detail, ошибка поля или общая
+const registrationError = (err: any): string => {
+    const data = err.response?.data;
+    if (!data) return "Не удалось записаться. Проверьте соединение.";
+    if (data.detail) return data.detail;
+    const first = Object.values(data)[0];
+    return (Array.isArray(first) ? first[0] : first) as string || "Не удалось записаться.";
+};
+
 const EventCard: React.FC<EventCardProps> = ({ event }) => {
     const formattedDate = format(new Date(event.dt_start), 'd MMMM yyyy, HH:mm', { locale: ru });
     const spotsAvailable = event.max_participants !== null
         ? event.spots_left !== null ? `${event.spots_left} мест свободно` : 'Мест нет'
         : 'Участие свободное';
+    const navigate = useNavigate();
+    const { user, isAuthenticated } = useAuthStore();
+    const [isRegistering, setIsRegistering] = useState(false);
+    const [registerError, setRegisterError] = useState<string | null>(null);
+
+    // Мероприятие занятия создается при первой записи, затем открываем его страницу
+    const registerForOccurrence = async () => {
+        if (isRegistering) return;
+        setIsRegistering(true);
+        setRegisterError(null);
+        try {
+            const response = await axiosInstance.post(`/series/${event.series}/register/`, {
+                occurrence_start: event.occurrence_start ?? event.dt_start,
+            });
+            navigate(`/events/${response.data.event_id}`);
+        } catch (err: any) {
+            console.error("Registration error:", err.response?.data);
+            setRegisterError(registrationError(err));
+            setIsRegistering(false);
+        }
+    };
 
     return (
-        <Link to={`/events/${event.id}`} className="block group">
+        <CardLink event={event}>
             <div className="bg-gray-900 text-white rounded-xl overflow-hidden hover:shadow-xl transition-all duration-300 transform hover:-translate-y-1 relative">
                 {/* Background image */}
                 <div className="relative h-48 bg-gradient-to-br from-gray-800 to-gray-900">
@@ -175,13 +214,34 @@ const EventCard: React.FC<EventCardProps> = ({ event }) => {
 
                     {/* Registration button */}
                     <div className="mt-4">
-                        <div className="w-full bg-indigo-600 hover:bg-indigo-700 text-white py-3 px-4 rounded-lg text-center font-semibold transition-colors duration-200 group-hover:bg-indigo-500">
-                            ЗАПИСАТЬСЯ
-                        </div>
+                        {event.id !== null ? (
+                            <div className="w-full bg-indigo-600 hover:bg-indigo-700 text-white py-3 px-4 rounded-lg text-center font-semibold transition-colors duration-200 group-hover:bg-indigo-500">
+                                ЗАПИСАТЬСЯ
+                            </div>
+                        ) : !isAuthenticated ? (
+                            <Link
+                                to="/login"
+                                className="block w-full bg-gray-700 hover:bg-gray-600 text-white py-3 px-4 rounded-lg text-center font-semibold transition-colors duration-200"
+                            >
+                                ВОЙДИТЕ, ЧТОБЫ ЗАПИСАТЬСЯ
+                            </Link>
+                        ) : user?.is_organizer ? (
+                            <p className="text-center text-sm text-gray-400">Записываться могут только студенты</p>
+                        ) : (
+                            <button
+                                type="button"
+                                onClick={registerForOccurrence}
+                                disabled={isRegistering}
+                                className="w-full bg-indigo-600 hover:bg-indigo-700 disabled:opacity-60 text-white py-3 px-4 rounded-lg text-center font-semibold transition-colors duration-200"
+                            >
+                                {isRegistering ? 'ЗАПИСЫВАЕМ...' : 'ЗАПИСАТЬСЯ'}
+                            </button>
+                        )}
+                        <ErrorMessage title="Запись не удалась" message={registerError} />
                     </div>
                 </div>
             </div>
-        </Link>
+        </CardLink>
     );
 };
 
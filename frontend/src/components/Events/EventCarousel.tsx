@@ -11,9 +11,9 @@ interface EventCarouselProps {
 const EventCarousel: React.FC<EventCarouselProps> = ({ events }) => {
     const [currentIndex, setCurrentIndex] = useState(0);
     
-    // Получаем 3 ближайших события, отсортированные по дате
+    // Получаем 3 ближайших события (без незанятых занятий серий - у них нет страницы), отсортированные по дате
     const upcomingEvents = events
-        ?.filter(event => new Date(event.dt_start) >= new Date())
+        ?.filter(event => event.id !== null && new Date(event.dt_start) >= new Date())
         .sort((a, b) => new Date(a.dt_start).getTime() - new Date(b.dt_start).getTime())
         .slice(0, 3) || [];
 
@@ -73,7 +73,7 @@ const EventList: React.FC<EventListProps> = ({
             
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
                 {events.map((event) => (
-                    <EventCard key={event.id} event={event} />
+                    <EventCard key={event.id ?? `s${event.series}-${event.dt_start}`} event={event} />
                 ))}
             </div>
         </div>
@@ -24,7 +24,7 @@ const MyEventCard: React.FC<MyEventCardProps> = ({ registration, onUnregister, i
                      <div className="flex-shrink-0 text-center md:text-left">
                          <div className="p-2 bg-white inline-block border rounded">
                              <QRCodeSVG
-                                 value={registration.qr_code_data} // UUID регистрации
+                                 value={registration.qr_code_data} // Подписанный токен регистрации
                                  size={128}
                                  level={"M"}
                                  includeMargin={false}
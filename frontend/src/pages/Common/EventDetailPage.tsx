@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, useNavigate, Link } from 'react-router-dom';
 import axiosInstance from '../../api/axiosInstance';
+import { subscribeToSeats } from '../../api/seatStream';
 import type { Event as EventType } from '../../types/entities'; // Переименовали, чтобы не конфликтовать с DOM Event
 import { useAuthStore } from '../../store/authStore';
 import LoadingSpinner from '../../components/Common/LoadingSpinner';
@@ -46,6 +47,16 @@ const EventDetailPage: React.FC = () => {
         }
     }, [eventId, fetchEventDetails]);
 
+    // Свободные места обновляются потоком с сервера - без перезагрузки страницы
+    useEffect(() => {
+        if (!eventId || !isAuthenticated) return;
+        return subscribeToSeats([Number(eventId)], (update) => {
+            setEvent((current) => current && current.id === update.event_id
+                ? { ...current, spots_left: update.spots_left, max_participants: update.max_participants }
+                : current);
+        });
+    }, [eventId, isAuthenticated]);
+
     const handleRegister = async () => {
         if (!eventId) return;
         setIsActionLoading(true);
@@ -62,11 +62,12 @@ const CheckInPage: React.FC = () => {
             clearTimeout(processingTimeoutRef.current);
         }
 
-         // Извлекаем UUID регистрации (предполагаем, что QR содержит только UUID)
+         // QR содержит подписанный токен регистрации (или UUID у старых кодов) - проверяет сервер
         const registrationId = decodedText.trim(); // Убираем пробелы
-        // Простая проверка на формат UUID (опционально)
+        // Простая проверка формата: UUID или base64url-токен
          const uuidRegex = /^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$/;
-         if (!uuidRegex.test(registrationId)) {
+         const tokenRegex = /^[A-Za-z0-9_-]{40,64}$/;
+         if (!uuidRegex.test(registrationId) && !tokenRegex.test(registrationId)) {
             setLastResult({ type: 'error', message: 'Ошибка: Неверный формат QR-кода.' });
             setIsProcessing(false);
              // Устанавливаем таймер для очистки сообщения
@@ -22,7 +22,8 @@ const OrganizerDashboardPage: React.FC = () => {
                 // Фильтруем на клиенте, если бэкенд не отфильтровал (лучше фильтровать на бэке!)
                 // const userId = useAuthStore.getState().user?.id;
                 // setMyEvents(response.data.filter(event => event.organizer.id === userId));
-                setMyEvents(response.data); // Предполагаем, что бэк уже отфильтровал
+                // Лента содержит и еще не созданные занятия серий (id: null) - ни страницы, ни участников у них нет
+                setMyEvents(response.data.filter(event => event.id !== null)); // Предполагаем, что бэк уже отфильтровал
             } catch (err: any) {
                 console.error("Error fetching organizer events:", err);
                 setError(err.response?.data?.detail || "Не удалось загрузить ваши мероприятия.");
@@ -10,6 +10,8 @@ const MyEventsPage: React.FC = () => {
     const [isLoading, setIsLoading] = useState(true);
     const [error, setError] = useState<string | null>(null);
     const [unregisteringId, setUnregisteringId] = useState<number | null>(null); // ID события для отмены
+    const [calendarUrl, setCalendarUrl] = useState<string | null>(null); // Ссылка на календарь .ics для подписки
+    const [calendarError, setCalendarError] = useState<string | null>(null);
 
     const fetchRegistrations = useCallback(async () => {
         setIsLoading(true);
@@ -29,6 +31,25 @@ const MyEventsPage: React.FC = () => {
         fetchRegistrations();
     }, [fetchRegistrations]);
 
+    useEffect(() => {
+        axiosInstance.get<{ url: string }>('/my-registrations/calendar/')
+            .then((response) => setCalendarUrl(response.data.url))
+            .catch((err) => console.error("Error fetching calendar link:", err));
+    }, []);
+
+    // Новая ссылка на календарь: старая (например, утекшая) перестает открываться
+    const handleRegenerateCalendarUrl = async () => {
+        if (!window.confirm("Старая ссылка перестанет работать - календари, подписанные на нее, нужно будет подписать заново. Продолжить?")) return;
+        setCalendarError(null);
+        try {
+            const response = await axiosInstance.post<{ url: string }>('/my-registrations/calendar/');
+            setCalendarUrl(response.data.url);
+        } catch (err: any) {
+            console.error("Error regenerating calendar link:", err.response?.data);
+            setCalendarError(err.response?.data?.detail || "Не удалось сменить ссылку на календарь.");
+        }
+    };
+
     const handleUnregister = async (eventId: number) => {
         setUnregisteringId(eventId); // Показываем лоадер для конкретной карточки
         setError(null); // Сбрасываем общую ошибку
@@ -97,6 +118,16 @@ const MyEventsPage: React.FC = () => {
     return (
         <div>
             <h1 className="text-3xl font-bold text-gray-800 mb-6">Мои События</h1>
+            {calendarUrl && (
+                <p className="text-sm text-gray-600 mb-6">
+                    Подписка в календаре (Google, Apple, Outlook):{' '}
+                    <a href={calendarUrl} className="text-indigo-600 hover:underline break-all">{calendarUrl}</a>{' '}
+                    <button type="button" onClick={handleRegenerateCalendarUrl} className="text-gray-500 hover:text-gray-700 underline">
+                        Сменить ссылку
+                    </button>
+                </p>
+            )}
+            <ErrorMessage message={calendarError} />
             {renderContent()}
         </div>
     );
@@ -17,7 +17,9 @@ export interface Tag {
 
 
 export interface Event {
-  id: number;
+  id: number | null; // null - занятие серии, на которое еще никто не записан
+  series?: number | null;
+  occurrence_start?: string | null; // ISO 8601 date string; начало занятия серии
   title: string;
   description: string;
   dt_start: string; // ISO 8601 date string
@@ -31,13 +33,22 @@ export interface Event {
   is_organizer: boolean;
 }
 
+// Кадр потока свободных мест (/events/seats/stream/)
+export interface SeatAvailability {
+  event_id: number;
+  max_participants: number | null;
+  registered_count: number;
+  spots_left: number | null;
+}
+
 export interface RegistrationShort {
   id: string; // UUID
   event_title: string;
   event_dt_start: string; // ISO 8601
   event_location: string;
   attended: boolean;
-  qr_code_data: string; // UUID as string
+  qr_code_data: string; // Signed check-in token
+  qr_code_url: string; // Server-rendered QR image
 }
 
 export interface RegistrationFull {